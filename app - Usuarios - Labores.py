@@ -0,0 +1,268 @@
+# =========================
+# RLD – 2025 – App de Usuario (una sola para todos los funcionarios) – con Google Sheets
+# =========================
+import os, time, hashlib
+from datetime import datetime, date
+from typing import Dict
+import streamlit as st
+import pandas as pd
+
+# Google Sheets
+import gspread
+from gspread.exceptions import APIError
+from google.oauth2.service_account import Credentials
+
+import rld_sheets as rs
+import rld_cuota as rq
+import rld_traza as rt
+import rld_archivo as ra
+from rld_sheets import SHEET_USUARIOS, SHEET_TAREAS, SHEET_RESPUESTAS, SHEET_LOGS, SHEET_PARTICIONES
+
+st.set_page_config(page_title="RLD – Usuario", layout="wide")
+APP_TITLE = "RLD – Registro de Labores (Usuario)"
+
+SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1LiHP1V5PMzt13yX_zgSeVFmZ7r-HM6PPEI5Ej46ziPk/edit?usp=sharing"
+
+TRABAJOS_CATALOGO = [
+    "Patrullaje Preventivo","Atención de Incidencias","Charlas Comunitarias",
+    "Reunión Interinstitucional","Operativo Focalizado","Apoyo a Otras Unidades",
+    "Control de Vías","Tareas Administrativas"
+]
+
+# hojas que pinta cada vista: rs.precargar las trae juntas en una sola ida a la API
+HOJAS_VISTA = {
+    "Mis Tareas":      [SHEET_TAREAS],
+    "Registrar Labor": [SHEET_TAREAS],
+    "Mis Labores":     [SHEET_RESPUESTAS, SHEET_PARTICIONES],
+    "Mi Perfil":       [SHEET_USUARIOS],
+}
+
+def iso_now(): return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def hash_password(p): return hashlib.sha256(p.encode("utf-8")).hexdigest()
+def _as_bool(x): return str(x).strip().lower() in ("true","1","yes","si","sí")
+
+@st.cache_resource(show_spinner=False)
+def get_gspread_client():
+    if "gcp_service_account" not in st.secrets:
+        st.error("Faltan credenciales en st.secrets['gcp_service_account']."); st.stop()
+    info=dict(st.secrets["gcp_service_account"])
+    if isinstance(info.get("private_key"), str):
+        info["private_key"]=info["private_key"].replace("\\n","\n").replace("\r\n","\n")
+    st.session_state["_svc_email"]=info.get("client_email","desconocido")
+    creds=Credentials.from_service_account_info(info, scopes=["https://www.googleapis.com/auth/spreadsheets","https://www.googleapis.com/auth/drive"])
+    return gspread.authorize(creds)
+
+def _hoja_remota():
+    gc=get_gspread_client()
+    key=SPREADSHEET_URL.split("/d/")[1].split("/")[0]
+    try: sh=gc.open_by_key(key)
+    except APIError: sh=gc.open_by_url(SPREADSHEET_URL)
+    return rq.programar(sh)  # cuota, reintentos y lecturas compartidas entre sesiones
+
+@rt.medido("conexion")
+@st.cache_resource(show_spinner=False)
+def get_spreadsheet():
+    if os.environ.get("RLD_BACKEND")=="local":  # hoja en memoria (rld_fake), sin credenciales
+        import rld_fake
+        return rq.programar(rld_fake.spreadsheet_local())
+    if os.environ.get("RLD_BACKEND")=="sqlite":  # SQLite como almacén principal; la hoja, por lotes
+        import rld_sqlite
+        remoto=None if os.environ.get("RLD_SYNC")=="0" else _hoja_remota()
+        return rld_sqlite.abrir(remoto=remoto, al_traer=lambda sh, hojas: rs.registrar_cambio(sh, *hojas))
+    return _hoja_remota()
+
+def ws_usuarios():   return rs.get_ws(get_spreadsheet(), SHEET_USUARIOS)
+def ws_tareas():     return rs.get_ws(get_spreadsheet(), SHEET_TAREAS)
+def ws_respuestas(): return rs.get_ws(get_spreadsheet(), SHEET_RESPUESTAS)
+def ws_logs():       return rs.get_ws(get_spreadsheet(), SHEET_LOGS)
+
+def df_usuarios():   return rs.df_usuarios(get_spreadsheet())
+def df_tareas():     return rs.df_tareas(get_spreadsheet())
+def df_respuestas(): return rs.df_respuestas(get_spreadsheet())
+
+def log(e,q,d): rs.log_evento(get_spreadsheet(),e,q,d,iso_now())
+
+def portada():
+    st.title(APP_TITLE)
+    st.info("Aquí cada funcionario ve **sus tareas**, registra **labores** y cambia su **usuario/contraseña**.")
+
+def do_login():
+    st.subheader("Ingreso")
+    st.caption("Usa tu usuario y contraseña asignados por la administradora.")
+    usuario=st.text_input("Usuario"); pwd=st.text_input("Contraseña", type="password")
+    if st.button("Entrar", use_container_width=True):
+        sh=get_spreadsheet(); info=rs.buscar_usuario(sh, usuario)  # índice en memoria: sin find ni escaneo
+        if info is None: st.error("Usuario no encontrado."); return
+        if info["rol"]!="user": st.error("Solo usuarios tipo 'user'."); return
+        if not info["activo"]: st.error("Tu usuario está INACTIVO. Contacta a la administradora."); return
+        if hash_password(pwd) != info["hash"]: st.error("Contraseña incorrecta."); return
+        st.session_state.auth={"id":info["id"],"nombre":info["nombre"],"usuario":info["usuario"],"rol":info["rol"]}
+        rs.registrar_acceso(sh, info["fila"], iso_now())  # ultimo_acceso se escribe en segundo plano
+        log("login_user",info["usuario"],"OK"); st.rerun()
+
+def logout_btn():
+    with st.sidebar:
+        st.caption(f"Conectado como **{st.session_state['auth']['nombre']}**")
+        if st.button("Cerrar sesión", use_container_width=True):
+            rs.flush_logs(get_spreadsheet())
+            st.session_state.pop("auth",None); st.rerun()
+
+TAM_PAGINA = [25, 50, 100, 200]
+
+def _mover_pagina(clave, paso): st.session_state[f"{clave}_pag"]=st.session_state.get(f"{clave}_pag",0)+paso
+
+def _paginar(df, clave, firma=None):
+    """Devuelve solo la página actual de df. El cursor vive en session_state y vuelve a 0 si cambian los filtros."""
+    if st.session_state.get(f"{clave}_firma")!=firma:
+        st.session_state[f"{clave}_firma"]=firma; st.session_state[f"{clave}_pag"]=0
+    c1,c2,c3,c4=st.columns([1,1,3,2])
+    tam=c4.selectbox("Por página", TAM_PAGINA, key=f"{clave}_tam", label_visibility="collapsed")
+    paginas=max(1,-(-len(df)//tam))
+    pag=min(max(st.session_state.get(f"{clave}_pag",0),0),paginas-1); st.session_state[f"{clave}_pag"]=pag
+    c1.button("◀", key=f"{clave}_ant", disabled=pag==0, on_click=_mover_pagina, args=(clave,-1))
+    c2.button("▶", key=f"{clave}_sig", disabled=pag>=paginas-1, on_click=_mover_pagina, args=(clave,1))
+    c3.caption(f"Página {pag+1} de {paginas} · {len(df)} fila(s)")
+    return df.iloc[pag*tam:(pag+1)*tam]
+
+def _tag_prioridad(p):
+    p=("" if pd.isna(p) else str(p)).strip().title()  # categórica: la celda vacía llega como NaN
+    color="#22c55e"
+    if p=="Alta": color="#f59e0b"
+    elif p=="Media": color="#ef4444"
+    return f"<span style='background:{color};color:white;padding:2px 8px;border-radius:999px;font-size:12px'>{p}</span>"
+
+def view_mis_tareas(user: Dict):
+    st.subheader("Mis Tareas")
+    mias=rs.tareas_de(get_spreadsheet(), user["id"])  # ya ordenadas por tarea_id_num
+    if mias.empty:
+        st.warning("Aún no te han asignado tareas."); return
+
+    mias["prioridad_tag"]=mias["prioridad"].map(_tag_prioridad)
+    st.write(mias[["tarea_id","titulo","prioridad_tag","estado","fecha_limite","fecha_asignacion"]].to_html(escape=False,index=False,na_rep=""), unsafe_allow_html=True)
+
+    st.markdown("### Cambiar estado")
+    mias=mias.dropna(subset=["tarea_id_num"])
+
+    opciones=("#"+mias["tarea_id_num"].astype(str)+" — "+mias["titulo"].astype(str)).tolist()
+    sel=st.selectbox("Selecciona una tarea", opciones) if opciones else ""
+    sel_id=None
+    if sel:
+        try: sel_id=int(sel.split("—")[0].replace("#","").strip())
+        except Exception: sel_id=None
+
+    c1,c2,c3,c4=st.columns(4)
+    def _set_estado(nvo):
+        if sel_id is None: st.error("Selecciona una tarea válida."); return
+        # mias ya viene filtrado por asignado_id: solo se puede tocar una tarea propia
+        if sel_id not in set(mias["tarea_id_num"].astype(int)) or \
+           not rs.actualizar_tarea(get_spreadsheet(), sel_id, {"estado":nvo, "ultima_actualizacion":iso_now()}):
+            st.error("No se encontró la tarea."); return
+        log("user_tarea_estado", user["usuario"], f"{sel_id}->{nvo}"); st.success("Estado actualizado.")
+    with c1:
+        if st.button("Nueva", use_container_width=True): _set_estado("Nueva")
+    with c2:
+        if st.button("En Progreso", use_container_width=True): _set_estado("En Progreso")
+    with c3:
+        if st.button("Completada", use_container_width=True): _set_estado("Completada")
+    with c4:
+        if st.button("Rechazada", use_container_width=True): _set_estado("Rechazada")
+
+def view_registro(user: Dict):
+    st.subheader("Registrar Labor y Vincular a Tarea")
+    mias=rs.tareas_de(get_spreadsheet(), user["id"]).dropna(subset=["tarea_id_num"])
+    opciones=["(sin tarea)"]+("#"+mias["tarea_id_num"].astype(str)+" — "+mias["titulo"].astype(str)).tolist()
+    sel=st.selectbox("Tarea relacionada (opcional)", opciones)
+    if sel=="(sin tarea)": sel_id=""
+    else:
+        try: sel_id=int(sel.split("—")[0].replace("#","").strip())
+        except Exception: sel_id=""
+
+    c1,c2=st.columns(2)
+    with c1: f_fecha=st.date_input("Fecha", value=date.today())
+    with c2: f_hora =st.time_input("Hora", value=datetime.now().time())
+    trabajo=st.selectbox("Trabajo Realizado", TRABAJOS_CATALOGO)
+    localidad=st.text_input("Localidad / Delegación")
+    obs=st.text_area("Observaciones")
+
+    if st.button("Guardar", type="primary", use_container_width=True):
+        # va al diario local y vuelve enseguida; el hilo de fondo lo sube a RLD_respuestas
+        uid=rs.nuevo_uuid()
+        n=rs.encolar_respuesta(get_spreadsheet(), [uid, sel_id, user["id"], user["nombre"], str(f_fecha), str(f_hora),
+                                                   trabajo, localidad, user["nombre"], obs, "Pendiente", "",
+                                                   iso_now(), "", user["usuario"], ""])
+        log("crear_respuesta", user["usuario"], f"{uid}")
+        st.success("Registro guardado." if n<=1 else f"Registro guardado ({n} por enviar a la hoja).")
+
+def view_mis_labores(user: Dict):
+    st.subheader("Mis Labores")
+    sh=get_spreadsheet()
+    # por defecto, todo lo que sigue en la hoja caliente; los meses archivados solo se abren si la
+    # fecha elegida llega hasta ellos
+    inicio=ra.inicio_caliente(sh, SHEET_RESPUESTAS)
+    if inicio is None:
+        primera=rs.respuestas_de(sh, user["id"])["creado_en"].min()
+        inicio=primera.date() if not pd.isna(primera) else date.today().replace(day=1)
+    desde=st.date_input("Registradas desde", value=inicio)
+    dfr=ra.respuestas_de(sh, user["id"], desde)
+    # creado_en ya es datetime64 (esquema de rld_sheets); las filas sin fecha se muestran
+    mine=dfr[~(dfr["creado_en"]<pd.Timestamp(desde))]
+    if mine.empty: st.info(f"Sin labores desde {desde:%d/%m/%Y}.")
+    else: st.dataframe(_paginar(mine, "pag_labores"), use_container_width=True, hide_index=True)
+
+def view_perfil(user: Dict):
+    st.subheader("Mi Perfil")
+    st.write(f"**Nombre:** {user['nombre']}  |  **Usuario actual:** `{user['usuario']}`")
+
+    nuevo_usuario=st.text_input("Nuevo usuario (opcional)", placeholder="dejar vacío para no cambiar")
+    pwd_actual=st.text_input("Contraseña actual", type="password")
+    pwd_nueva =st.text_input("Nueva contraseña", type="password", help="Mínimo 6 caracteres.")
+    pwd_conf  =st.text_input("Confirmar nueva contraseña", type="password")
+
+    if st.button("Guardar cambios", type="primary"):
+        sh=get_spreadsheet(); info=rs.buscar_usuario(sh, user["usuario"])
+        if info is None: st.error("No se encontró el usuario."); return
+        if hash_password(pwd_actual)!=info["hash"]:
+            st.error("La contraseña actual es incorrecta."); return
+        if pwd_nueva and len(pwd_nueva)<6:
+            st.error("La nueva contraseña debe tener al menos 6 caracteres."); return
+        if nuevo_usuario.strip() and rs.buscar_usuario(sh, nuevo_usuario) is not None:
+            st.error("Ese usuario ya existe."); return
+        if (pwd_nueva or pwd_conf) and pwd_nueva!=pwd_conf:
+            st.error("La confirmación no coincide."); return
+        w=ws_usuarios()
+        if nuevo_usuario.strip():
+            w.update_cell(info["fila"],3,nuevo_usuario.strip()); st.session_state.auth["usuario"]=nuevo_usuario.strip()
+        if pwd_nueva:
+            w.update_cell(info["fila"],5,hash_password(pwd_nueva))
+        rs.registrar_cambio(sh, SHEET_USUARIOS)  # una sola vez, después de las dos escrituras
+        log("user_update_profile", user["usuario"], "OK")
+        st.success("Cambios guardados.")
+
+def _main():
+    portada()
+    if "auth" not in st.session_state:
+        rt.nombrar("login"); do_login(); return
+    user=st.session_state["auth"]; logout_btn()
+    pend=rs.pendientes_respuestas(get_spreadsheet())
+    if pend: st.sidebar.caption(f"⏳ {pend} labor(es) guardada(s) aún sin enviar a la hoja.")
+
+    vista=st.sidebar.radio("Secciones", ["Mis Tareas","Registrar Labor","Mis Labores","Mi Perfil"])
+    rt.nombrar(vista)
+    rs.precargar(get_spreadsheet(), *HOJAS_VISTA[vista])
+    if vista=="Mis Tareas":        view_mis_tareas(user)
+    elif vista=="Registrar Labor": view_registro(user)
+    elif vista=="Mis Labores":     view_mis_labores(user)
+    else:                          view_perfil(user)
+
+def main():
+    # la traza del rerun queda en rld_traza (y en RLD_TRAZA_JSONL si está definido)
+    rt.iniciar("inicio")
+    try: _main()
+    finally: rt.cerrar()
+
+if __name__=="__main__":
+    main()
+
+
+
+
@@ -1,54 +1,78 @@
 # =========================
 # RLD – 2025 (Google Sheets) – APP ADMIN (VIVIANA)
 # =========================
-import time, hashlib
+import os, time, hashlib, shutil, tempfile
 from datetime import datetime, date, timedelta
-from typing import List, Dict
+from typing import Dict
 import streamlit as st
 import pandas as pd
 
 # Google Sheets
 import gspread
-from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.exceptions import APIError
 from google.oauth2.service_account import Credentials
 
+import rld_sheets as rs
+import rld_cuota as rq
+import rld_migraciones as rm
+import rld_resumen as rr
+import rld_analitica as ran
+import rld_archivo as ra
+import rld_export as rx
+import rld_traza as rt
+from rld_sheets import SHEET_USUARIOS, SHEET_TAREAS, SHEET_RESPUESTAS, SHEET_RESUMEN, SHEET_LOGS, SHEET_PARTICIONES, SHEET_ANALITICA
+
 st.set_page_config(page_title="RLD 2025 – Admin (Sheets)", layout="wide")
 APP_TITLE = "REGISTRO DE LABORES DIARIAS – Admin"
 
 SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1LiHP1V5PMzt13yX_zgSeVFmZ7r-HM6PPEI5Ej46ziPk/edit?usp=sharing"
 
-USUARIOS_INICIALES = [
-    ("001", "Jeremy",  "jeremy",  "user"),
-    ("002", "Jannia",  "jannia",  "user"),
-    ("003", "Manfred", "manfred", "user"),
-    ("004", "Luis",    "luis",    "user"),
-    ("005", "Adrian",  "adrian",  "user"),
-    ("006", "Esteban", "esteban", "user"),
-    ("007", "Pamela",  "pamela",  "user"),
-    ("009", "Viviana Peraza", "vperaza", "admin"),
-    ("010", "Charly",  "charly",  "user"),
-]
-PASSWORDS_FIJAS = {
-    "jeremy":"jeremy2025","jannia":"jannia2025","manfred":"manfred2025","luis":"luis2025",
-    "adrian":"adrian2025","esteban":"esteban2025","pamela":"pamela2025",
-    "charly":"charly2025","vperaza":"viviana2025"
-}
-
-SHEET_USUARIOS   = "Usuarios"
-SHEET_TAREAS     = "RLD_tareas"
-SHEET_RESPUESTAS = "RLD_respuestas"
-SHEET_RESUMEN    = "RLD_por_usuario"
-SHEET_LOGS       = "Logs"
-
 PRIORIDADES   = ["Alta","Media","Baja"]
 ESTADOS_TAREA = ["Nueva","En Progreso","Completada","Rechazada"]
 
+# hojas que pinta cada vista: rs.precargar las trae juntas en una sola ida a la API
+HOJAS_VISTA = {
+    "Usuarios":  [SHEET_USUARIOS],
+    "Tareas":    [SHEET_USUARIOS, SHEET_TAREAS],
+    "Resumen":   [SHEET_USUARIOS, SHEET_RESUMEN, SHEET_PARTICIONES, SHEET_ANALITICA],
+    "Mi Perfil": [SHEET_USUARIOS],
+}
+
 def iso_now(): return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 def hash_password(p): return hashlib.sha256(p.encode("utf-8")).hexdigest()
 def _as_bool(x): return str(x).strip().lower() in ("true","1","yes","si","sí")
 
+TAM_PAGINA = [25, 50, 100, 200]
+
+def _mover_pagina(clave, paso): st.session_state[f"{clave}_pag"]=st.session_state.get(f"{clave}_pag",0)+paso
+
+def _paginar(df, clave, firma=None):
+    """Devuelve solo la página actual de df. El cursor vive en session_state y vuelve a 0 si cambian los filtros."""
+    if st.session_state.get(f"{clave}_firma")!=firma:
+        st.session_state[f"{clave}_firma"]=firma; st.session_state[f"{clave}_pag"]=0
+    c1,c2,c3,c4=st.columns([1,1,3,2])
+    tam=c4.selectbox("Por página", TAM_PAGINA, key=f"{clave}_tam", label_visibility="collapsed")
+    paginas=max(1,-(-len(df)//tam))
+    pag=min(max(st.session_state.get(f"{clave}_pag",0),0),paginas-1); st.session_state[f"{clave}_pag"]=pag
+    c1.button("◀", key=f"{clave}_ant", disabled=pag==0, on_click=_mover_pagina, args=(clave,-1))
+    c2.button("▶", key=f"{clave}_sig", disabled=pag>=paginas-1, on_click=_mover_pagina, args=(clave,1))
+    c3.caption(f"Página {pag+1} de {paginas} · {len(df)} fila(s)")
+    return df.iloc[pag*tam:(pag+1)*tam]
+
+def _buscar_titulo(dft, q):
+    """Índices cuyo título contiene q. Si q amplía la búsqueda anterior sobre la misma carga,
+    solo se revisan las coincidencias previas."""
+    q=q.strip().lower()
+    if not q: return dft.index
+    previa=st.session_state.get("_busq_tareas"); ver=dft.attrs.get("cargado")
+    base=dft["titulo_lc"]
+    if previa and previa["ver"]==ver and q.startswith(previa["q"]): base=base.loc[previa["idx"]]
+    idx=base.index[base.str.contains(q, regex=False)]
+    st.session_state["_busq_tareas"]={"ver":ver,"q":q,"idx":idx}
+    return idx
+
 def _tag_prioridad(p):
-    p = (p or "").strip().title()
+    p = ("" if pd.isna(p) else str(p)).strip().title()  # categórica: la celda vacía llega como NaN
     color = "#22c55e"   # Baja
     if p=="Alta":  color="#f59e0b"  # naranja
     if p=="Media": color="#ef4444"  # rojo
@@ -67,143 +91,56 @@ def get_gspread_client():
     )
     return gspread.authorize(creds)
 
-@st.cache_resource(show_spinner=False)
-def get_spreadsheet():
+def _hoja_remota():
     gc = get_gspread_client()
     key = SPREADSHEET_URL.split("/d/")[1].split("/")[0]
-    try: return gc.open_by_key(key)
-    except APIError: return gc.open_by_url(SPREADSHEET_URL)
-
-def _ensure_ws(title: str, header: List[str]):
-    sh = get_spreadsheet()
-    try:
-        ws = sh.worksheet(title)
-    except WorksheetNotFound:
-        ws = sh.add_worksheet(title=title, rows=2000, cols=max(len(header), 12))
-        ws.append_row(header)
-    vals = ws.get_all_values()
-    if not vals: ws.append_row(header)
-    return ws
-
-def ws_usuarios():
-    return _ensure_ws(SHEET_USUARIOS, ["id","nombre","usuario","rol","password_hash","activo","creado_en","ultimo_acceso"])
-
-def ws_tareas():
-    ws = _ensure_ws(
-        SHEET_TAREAS,
-        ["tarea_id","titulo","descripcion","prioridad","estado","asignado_id",
-         "asignado_nombre","fecha_asignacion","fecha_limite","creado_por",
-         "observ_admin","ultima_actualizacion"]
-    )
-    try:
-        hdr = ws.row_values(1)
-        if hdr and hdr[0].strip().lower()=="task_id":
-            ws.update_cell(1,1,"tarea_id")
-    except Exception:
-        pass
-    return ws
-
-def ws_respuestas():
-    return _ensure_ws(
-        SHEET_RESPUESTAS,
-        ["uuid","tarea_id","usuario_id","usuario_nombre","fecha","hora","trabajo_realizado",
-         "localidad_delegacion","funcionario_responsable","observaciones","estado_validacion",
-         "observacion_admin","creado_en","editado_en","creado_por","editado_por"]
-    )
-
-def ws_resumen(): return _ensure_ws(SHEET_RESUMEN, ["usuario_id","usuario_nombre","total","pendientes","validadas","rechazadas","ultima_actividad"])
-def ws_logs():    return _ensure_ws(SHEET_LOGS,    ["evento","quien","detalle","timestamp"])
-
-def df_usuarios():
-    recs = ws_usuarios().get_all_records()
-    df = pd.DataFrame(recs) if recs else pd.DataFrame(columns=["id","nombre","usuario","rol","password_hash","activo","creado_en","ultimo_acceso"])
-    if not df.empty:
-        df["rol_norm"] = df["rol"].astype(str).str.lower()
-        df["activo_norm"] = df["activo"].apply(_as_bool)
-    return df
+    try: sh = gc.open_by_key(key)
+    except APIError: sh = gc.open_by_url(SPREADSHEET_URL)
+    return rq.programar(sh)  # cuota, reintentos y lecturas compartidas entre sesiones
 
-def df_tareas():
-    recs = ws_tareas().get_all_records()
-    df = pd.DataFrame(recs)
-    # columnas mínimas
-    needed = ["tarea_id","titulo","descripcion","prioridad","estado","asignado_id","asignado_nombre","fecha_asignacion","fecha_limite","creado_por","observ_admin","ultima_actualizacion"]
-    for c in needed:
-        if c not in df.columns: df[c] = ""
-    if "task_id" in df.columns and "tarea_id" not in df.columns:
-        df = df.rename(columns={"task_id":"tarea_id"})
-    df["tarea_id_num"] = pd.to_numeric(df["tarea_id"], errors="coerce")
-    return df
-
-def df_respuestas():
-    recs = ws_respuestas().get_all_records()
-    df = pd.DataFrame(recs)
-    for c in ["uuid","tarea_id","usuario_id","usuario_nombre","fecha","hora","trabajo_realizado","localidad_delegacion","funcionario_responsable","observaciones","estado_validacion","observacion_admin","creado_en","editado_en","creado_por","editado_por"]:
-        if c not in df.columns: df[c] = ""
-    if "task_id" in df.columns and "tarea_id" not in df.columns:
-        df = df.rename(columns={"task_id":"tarea_id"})
-    return df
-
-def log(evento, quien, detalle): ws_logs().append_row([evento, quien, detalle, iso_now()])
-
-def seed_usuarios_si_vacio():
-    ws = ws_usuarios()
-    if ws.get_all_records(): return False
-    for (id_, nombre, usuario, rol) in USUARIOS_INICIALES:
-        ws.append_row([id_, nombre, usuario, rol, hash_password(PASSWORDS_FIJAS[usuario]), True, iso_now(), ""])
-    log("seed_usuarios","sistema","OK"); return True
-
-def migrate_passwords_a_fijas():
-    ws = ws_usuarios(); recs = ws.get_all_records()
-    if not recs: return 0
-    n=0
-    for i,r in enumerate(recs, start=2):
-        u=str(r.get("usuario","")).strip().lower()
-        if u in PASSWORDS_FIJAS:
-            h=hash_password(PASSWORDS_FIJAS[u])
-            if str(r.get("password_hash",""))!=h:
-                ws.update_cell(i,5,h); n+=1
-    if n: log("migracion_passwords","sistema",f"{n}")
-    return n
-
-def migrate_tarea_ids():
-    df = df_tareas()
-    if df.empty: return 0
-    ws = ws_tareas(); recs = ws.get_all_records()
-    usados = set(int(x) for x in pd.to_numeric(df["tarea_id"], errors="coerce").dropna().astype(int))
-    next_id = 1; asignados=0
-    for i,r in enumerate(recs, start=2):
-        cur = pd.to_numeric(r.get("tarea_id"), errors="coerce")
-        if pd.isna(cur):
-            while next_id in usados: next_id+=1
-            ws.update_cell(i,1,next_id); usados.add(next_id); asignados+=1
-    return asignados
-
-def next_tarea_id():
-    df=df_tareas()
-    if df.empty or df["tarea_id_num"].dropna().empty: return 1
-    return int(df["tarea_id_num"].max())+1
+@rt.medido("conexion")
+@st.cache_resource(show_spinner=False)
+def get_spreadsheet():
+    if os.environ.get("RLD_BACKEND")=="local":  # hoja en memoria (rld_fake), sin credenciales
+        import rld_fake
+        return rq.programar(rld_fake.spreadsheet_local())
+    if os.environ.get("RLD_BACKEND")=="sqlite":  # SQLite como almacén principal; la hoja, por lotes
+        import rld_sqlite
+        remoto = None if os.environ.get("RLD_SYNC")=="0" else _hoja_remota()
+        return rld_sqlite.abrir(remoto=remoto, al_traer=lambda sh, hojas: rs.registrar_cambio(sh, *hojas))
+    return _hoja_remota()
+
+def ws_usuarios():   return rs.get_ws(get_spreadsheet(), SHEET_USUARIOS)
+def ws_tareas():     return rs.get_ws(get_spreadsheet(), SHEET_TAREAS)
+def ws_respuestas(): return rs.get_ws(get_spreadsheet(), SHEET_RESPUESTAS)
+def ws_resumen():    return rs.get_ws(get_spreadsheet(), SHEET_RESUMEN)
+def ws_logs():       return rs.get_ws(get_spreadsheet(), SHEET_LOGS)
+
+def df_usuarios():   return rs.df_usuarios(get_spreadsheet())
+def df_tareas():     return rs.df_tareas(get_spreadsheet())
+def df_respuestas(): return rs.df_respuestas(get_spreadsheet())
+
+def log(evento, quien, detalle): rs.log_evento(get_spreadsheet(), evento, quien, detalle, iso_now())
 
 def do_login():
     st.subheader("Ingreso (Solo Admin)")
     u = st.text_input("Usuario (p.ej. vperaza)")
     p = st.text_input("Contraseña", type="password")
     if st.button("Entrar", use_container_width=True):
-        dfu=df_usuarios()
-        row=dfu[dfu["usuario"].astype(str).str.lower()==u.strip().lower()]
-        if row.empty: st.error("Usuario no encontrado."); return
-        row=row.iloc[0]
-        if not _as_bool(row.get("activo",True)): st.error("Usuario inactivo."); return
-        if str(row["rol"]).lower()!="admin": st.error("Acceso solo admin."); return
-        if hash_password(p)!=str(row.get("password_hash","")): st.error("Contraseña incorrecta."); return
-        st.session_state.auth={"id":str(row["id"]),"nombre":row["nombre"],"usuario":row["usuario"],"rol":row["rol"]}
-        w=ws_usuarios(); c=w.find(str(row["id"])); 
-        if c: w.update_cell(c.row,8,iso_now())
-        log("login_admin",row["usuario"],"OK"); st.rerun()
+        sh=get_spreadsheet(); info=rs.buscar_usuario(sh, u)  # índice en memoria: sin find ni escaneo
+        if info is None: st.error("Usuario no encontrado."); return
+        if not info["activo"]: st.error("Usuario inactivo."); return
+        if info["rol"]!="admin": st.error("Acceso solo admin."); return
+        if hash_password(p)!=info["hash"]: st.error("Contraseña incorrecta."); return
+        st.session_state.auth={"id":info["id"],"nombre":info["nombre"],"usuario":info["usuario"],"rol":info["rol"]}
+        rs.registrar_acceso(sh, info["fila"], iso_now())  # ultimo_acceso se escribe en segundo plano
+        log("login_admin",info["usuario"],"OK"); st.rerun()
 
 def logout_btn():
     with st.sidebar:
         st.caption(f"Conectada como **{st.session_state['auth']['nombre']}**")
         if st.button("Cerrar sesión", use_container_width=True):
+            rs.flush_logs(get_spreadsheet())
             st.session_state.pop("auth",None); st.rerun()
 
 def view_perfil_admin(user: Dict):
@@ -217,14 +154,11 @@ def view_perfil_admin(user: Dict):
     if st.button("Actualizar contraseña", type="primary"):
         if len(pwd_nueva)<6: st.error("Mínimo 6 caracteres."); return
         if pwd_nueva!=pwd_conf: st.error("La confirmación no coincide."); return
-        dfu=df_usuarios(); row=dfu[dfu["usuario"].astype(str)==user["usuario"]]
-        if row.empty: st.error("No se encontró el usuario."); return
-        row=row.iloc[0]
-        if hash_password(pwd_actual)!=str(row.get("password_hash","")):
+        info=rs.buscar_usuario(get_spreadsheet(), user["usuario"])
+        if info is None: st.error("No se encontró el usuario."); return
+        if hash_password(pwd_actual)!=info["hash"]:
             st.error("La contraseña actual es incorrecta."); return
-        w=ws_usuarios(); cell=w.find(str(row["id"]))
-        if not cell: st.error("No se pudo ubicar la fila."); return
-        w.update_cell(cell.row,5,hash_password(pwd_nueva))
+        ws_usuarios().update_cell(info["fila"],5,hash_password(pwd_nueva)); rs.registrar_cambio(get_spreadsheet(), SHEET_USUARIOS)
         log("admin_cambio_password",user["usuario"],"OK")
         st.success("Contraseña actualizada.")
 
@@ -245,7 +179,7 @@ def view_usuarios():
             if r.get("nombre")==sel:
                 val=str(r.get("activo","TRUE")).upper()
                 nuevo="FALSE" if val in ("TRUE","1") else "TRUE"
-                w.update_cell(i,6,nuevo)
+                w.update_cell(i,6,nuevo); rs.registrar_cambio(get_spreadsheet(), SHEET_USUARIOS)
                 log("toggle_activo",st.session_state['auth']['usuario'],f"{sel}:{nuevo}")
                 st.success(f"{sel} -> {'Activo' if nuevo=='TRUE' else 'Inactivo'}")
                 break
@@ -267,14 +201,14 @@ def view_tareas(usuario_ctx: Dict):
         fecha_lim=st.date_input("Fecha límite", value=date.today()+timedelta(days=3))
 
     if st.button("Crear y asignar", type="primary", use_container_width=True, disabled=not titulo.strip() or not asignados):
-        w=ws_tareas()
-        base_id=next_tarea_id()
-        for i,nom in enumerate(asignados):
+        filas=[]
+        for nom in asignados:
             u=dfu_activos[dfu_activos["nombre"]==nom].iloc[0]
-            tid=base_id+i
-            w.append_row([tid,titulo.strip(),descripcion.strip(),prioridad,"Nueva",
+            filas.append([titulo.strip(),descripcion.strip(),prioridad,"Nueva",
                           str(u["id"]),u["nombre"],iso_now(),str(fecha_lim),
                           usuario_ctx["usuario"],"",iso_now()])
+        # 3 llamadas en total: reserva del bloque de IDs + un append_rows + la versión en RLD_meta
+        base_id=rs.crear_tareas(get_spreadsheet(), filas)
         log("crear_tareas",usuario_ctx["usuario"],f"{len(asignados)}")
         st.success(f"Se crearon {len(asignados)} tareas (IDs desde #{base_id}).")
 
@@ -288,26 +222,49 @@ def view_tareas(usuario_ctx: Dict):
     with f3: f_user=  st.selectbox("Asignado",["(Todos)"]+ (sorted(dft["asignado_nombre"].dropna().unique()) if not dft.empty else []))
     with f4: q_tit=   st.text_input("Buscar por título","")
 
-    data=dft.copy()
+    data=dft
     if not data.empty:
+        if q_tit.strip():       data=data.loc[_buscar_titulo(dft,q_tit)]
         if f_estado!="(Todos)": data=data[data["estado"]==f_estado]
         if f_prior!="(Todas)":  data=data[data["prioridad"]==f_prior]
         if f_user!="(Todos)":   data=data[data["asignado_nombre"]==f_user]
-        if q_tit.strip():       data=data[data["titulo"].astype(str).str.contains(q_tit.strip(),case=False,na=False)]
 
     if not data.empty:
-        data["prioridad_tag"]=data["prioridad"].apply(_tag_prioridad)
-        st.write(data[["tarea_id","titulo","prioridad_tag","estado","asignado_nombre","fecha_limite","fecha_asignacion"]].to_html(escape=False,index=False), unsafe_allow_html=True)
+        pagina=_paginar(data, "pag_tareas", (f_estado,f_prior,f_user,q_tit.strip().lower()))
+        pagina=pagina[["tarea_id","titulo","prioridad","estado","asignado_nombre","fecha_limite","fecha_asignacion"]].copy()
+        pagina.insert(2,"prioridad_tag",pagina.pop("prioridad").map(_tag_prioridad))
+        st.write(pagina.to_html(escape=False,index=False,na_rep=""), unsafe_allow_html=True)
     else:
         st.info("Sin tareas para los filtros aplicados.")
 
+    st.markdown("#### Acciones masivas")
+    ids_filtro=data["tarea_id_num"].dropna().astype(int).tolist() if not data.empty else []
+    todas=st.checkbox(f"Toda la selección filtrada ({len(ids_filtro)} tareas)", disabled=not ids_filtro)
+    ids_masivo=ids_filtro if todas else st.multiselect("Tareas", ids_filtro, format_func=lambda t: f"#{t}")
+    m1,m2=st.columns(2)
+    with m1: accion=st.selectbox("Acción", ["Cambiar estado","Reasignar","Extender fecha límite","Agregar observación","Eliminar"])
+    with m2:
+        if accion=="Cambiar estado":          valor=st.selectbox("Nuevo estado", ESTADOS_TAREA)
+        elif accion=="Reasignar":             valor=st.selectbox("Reasignar a", lista)
+        elif accion=="Extender fecha límite": valor=st.number_input("Días a extender", min_value=1, value=7, step=1)
+        elif accion=="Agregar observación":   valor=st.text_area("Observación a agregar")
+        else:                                 valor=st.checkbox("Confirmo que quiero eliminarlas")
+    listo=bool(ids_masivo) and (accion not in ("Reasignar","Agregar observación","Eliminar") or bool(valor))
+    if st.button(f"Aplicar a {len(ids_masivo)} tarea(s)", disabled=not listo, type="primary"):
+        _admin_masivo(dft, ids_masivo, accion, valor, usuario_ctx)
+
     st.markdown("#### Editar / Eliminar / Estado / Observación")
     opciones=[]
     if not dft.empty:
         dft_ok=dft.dropna(subset=["tarea_id_num"]).sort_values("tarea_id_num")
-        opciones=[f"#{int(r.tarea_id_num)} — {r.titulo} — {r.asignado_nombre}" for _,r in dft_ok.iterrows()]
-    if not opciones:
-        st.warning("No hay tareas con ID numérico válido para seleccionar. Crea una o ejecuta la migración automática recargando la página.")
+        opciones=("#"+dft_ok["tarea_id_num"].astype(str)+" — "+dft_ok["titulo"].astype(str)
+                  +" — "+dft_ok["asignado_nombre"].astype(str)).tolist()
+    if not opciones or dft["tarea_id_num"].isna().any():
+        st.warning("Hay tareas sin ID numérico válido; no se pueden seleccionar hasta asignarles uno.")
+        if st.button("Asignar IDs faltantes"):
+            n=rm.migrate_tarea_ids(get_spreadsheet())
+            if n: log("migracion_tarea_ids",usuario_ctx["usuario"],f"{n}")
+            st.success(f"Se asignaron {n} ID(s)."); st.rerun()
     sel_opt=st.selectbox("Selecciona una tarea", opciones) if opciones else ""
     sugerido=int(dft["tarea_id_num"].max()+1) if not dft.empty and not dft["tarea_id_num"].dropna().empty else 1
     tarea_id_input=st.number_input("…o escribe el ID (#)", min_value=1, value=sugerido, step=1)
@@ -353,93 +310,163 @@ def view_tareas(usuario_ctx: Dict):
         _admin_guardar_observacion(_resolver_id(), obs, usuario_ctx)
 
 def _admin_set_estado(tid, nuevo, user):
-    w=ws_tareas(); recs=w.get_all_records()
-    for i,r in enumerate(recs,start=2):
-        try:
-            if int(pd.to_numeric(r.get("tarea_id"), errors="coerce"))==int(tid):
-                w.update_cell(i,5,nuevo); w.update_cell(i,12,iso_now())
-                log("tarea_estado", user["usuario"], f"{tid}->{nuevo}")
-                st.success("Estado actualizado."); return
-        except Exception: pass
-    st.error("No se encontró la tarea.")
+    if not rs.actualizar_tarea(get_spreadsheet(), tid, {"estado":nuevo, "ultima_actualizacion":iso_now()}):
+        st.error("No se encontró la tarea."); return
+    log("tarea_estado", user["usuario"], f"{tid}->{nuevo}")
+    st.success("Estado actualizado.")
 
 def _admin_guardar_observacion(tid, texto, user):
-    w=ws_tareas(); recs=w.get_all_records()
-    for i,r in enumerate(recs,start=2):
-        try:
-            if int(pd.to_numeric(r.get("tarea_id"), errors="coerce"))==int(tid):
-                w.update_cell(i,11,texto); w.update_cell(i,12,iso_now())
-                log("tarea_obs", user["usuario"], f"{tid}")
-                st.success("Observación guardada."); return
-        except Exception: pass
-    st.error("No se encontró la tarea.")
+    if not rs.actualizar_tarea(get_spreadsheet(), tid, {"observ_admin":texto, "ultima_actualizacion":iso_now()}):
+        st.error("No se encontró la tarea."); return
+    log("tarea_obs", user["usuario"], f"{tid}")
+    st.success("Observación guardada.")
 
 def _admin_editar_tarea(tid, titulo, desc, prior, asignado_nombre, fecha_limite, user):
     dfu=df_usuarios()
     rowu=dfu[(dfu["nombre"]==asignado_nombre) & (dfu["rol_norm"]=="user") & (dfu["activo_norm"])]
     if rowu.empty: st.error("Usuario destino inválido o inactivo."); return
     asig=rowu.iloc[0]
-    w=ws_tareas(); recs=w.get_all_records()
-    for i,r in enumerate(recs,start=2):
-        try:
-            if int(pd.to_numeric(r.get("tarea_id"), errors="coerce"))==int(tid):
-                w.update(f"A{i}:L{i}", [[
-                    tid, titulo.strip(), desc.strip(), prior, r.get("estado","Nueva"),
-                    str(asig["id"]), asig["nombre"], r.get("fecha_asignacion", iso_now()), str(fecha_limite),
-                    user["usuario"], r.get("observ_admin",""), iso_now()
-                ]])
-                log("tarea_editar", user["usuario"], f"{tid}")
-                st.success("Tarea actualizada."); return
-        except Exception: pass
-    st.error("No se encontró la tarea.")
+    # estado, fecha_asignacion y observ_admin se conservan: solo se tocan las columnas editadas
+    ok=rs.actualizar_tarea(get_spreadsheet(), tid, {
+        "titulo":titulo.strip(), "descripcion":desc.strip(), "prioridad":prior,
+        "asignado_id":str(asig["id"]), "asignado_nombre":asig["nombre"], "fecha_limite":str(fecha_limite),
+        "creado_por":user["usuario"], "ultima_actualizacion":iso_now(),
+    })
+    if not ok: st.error("No se encontró la tarea."); return
+    log("tarea_editar", user["usuario"], f"{tid}")
+    st.success("Tarea actualizada.")
 
 def _admin_eliminar_tarea(tid, user):
-    w=ws_tareas(); recs=w.get_all_records()
-    for i,r in enumerate(recs,start=2):
-        try:
-            if int(pd.to_numeric(r.get("tarea_id"), errors="coerce"))==int(tid):
-                w.delete_rows(i)
-                log("tarea_eliminar", user["usuario"], f"{tid}")
-                st.success("Tarea eliminada."); return
-        except Exception: pass
-    st.error("No se encontró la tarea.")
-
-def actualizar_resumen():
-    wsr=ws_resumen()
-    wsr.clear()
-    wsr.append_row(["usuario_id","usuario_nombre","total","pendientes","validadas","rechazadas","ultima_actividad"])
-    dfu=df_usuarios(); dfr=df_respuestas()
-    for _,u in dfu.iterrows():
-        uid,uname=str(u["id"]),str(u["nombre"])
-        sub=dfr[dfr.get("usuario_id","").astype(str)==uid] if not dfr.empty else pd.DataFrame()
-        tot=int(len(sub)); pen=int((sub["estado_validacion"]=="Pendiente").sum()) if not sub.empty else 0
-        val=int((sub["estado_validacion"]=="Validada").sum()) if not sub.empty else 0
-        rec=int((sub["estado_validacion"]=="Rechazada").sum()) if not sub.empty else 0
-        ult=""
-        if not sub.empty and sub["creado_en"].notna().any():
-            m=pd.to_datetime(sub["creado_en"], errors="coerce").max()
-            ult="" if pd.isna(m) else str(m)
-        wsr.append_row([uid,uname,tot,pen,val,rec,ult])
+    if not rs.eliminar_tarea(get_spreadsheet(), tid):
+        st.error("No se encontró la tarea."); return
+    log("tarea_eliminar", user["usuario"], f"{tid}")
+    st.success("Tarea eliminada.")
+
+def _admin_masivo(dft, tids, accion, valor, user):
+    """Una acción sobre varias tareas: un batch_update (de celdas, o de la hoja de cálculo para borrar) y una entrada de log."""
+    sh=get_spreadsheet(); ahora=iso_now()
+    if accion=="Eliminar":
+        faltan=rs.eliminar_tareas(sh, tids)
+    else:
+        filas=dft[dft["tarea_id_num"].isin(tids)].drop_duplicates("tarea_id_num").set_index("tarea_id_num")
+        if accion=="Cambiar estado":
+            cambios={t: {"estado":valor} for t in tids}
+        elif accion=="Reasignar":
+            dfu=df_usuarios()
+            rowu=dfu[(dfu["nombre"]==valor) & (dfu["rol_norm"]=="user") & (dfu["activo_norm"])]
+            if rowu.empty: st.error("Usuario destino inválido o inactivo."); return
+            cambios={t: {"asignado_id":str(rowu.iloc[0]["id"]), "asignado_nombre":rowu.iloc[0]["nombre"]} for t in tids}
+        elif accion=="Extender fecha límite":
+            # desde la fecha límite de cada tarea (hoy si no tiene)
+            lim=filas["fecha_limite"].to_dict(); hoy=pd.Timestamp(date.today())
+            cambios={t: {"fecha_limite":((hoy if pd.isna(lim.get(t)) else lim[t])+timedelta(days=int(valor))).strftime("%Y-%m-%d")}
+                     for t in tids}
+        else:
+            # se agrega al final de la observación que ya tenga cada tarea
+            previa=filas["observ_admin"].fillna("").astype(str).str.strip().to_dict()
+            cambios={t: {"observ_admin":(previa.get(t,"")+"\n" if previa.get(t) else "")+valor.strip()} for t in tids}
+        faltan=rs.actualizar_tareas(sh, {t: {**c, "ultima_actualizacion":ahora} for t, c in cambios.items()})
+    hechas=[t for t in tids if t not in set(faltan)]
+    log("tareas_masivo", user["usuario"], f"{accion}:{len(hechas)}:"+",".join(map(str,hechas)))
+    if faltan: st.warning(f"No se encontraron {len(faltan)} tarea(s): "+", ".join(f"#{t}" for t in faltan))
+    st.success(f"{accion}: {len(hechas)} tarea(s).")
+
+def actualizar_resumen(): return rr.actualizar_resumen(get_spreadsheet())
+
+def _con_nombres(df, col):
+    """Agrega el nombre del usuario al lado de su id (las vistas guardan solo el id)."""
+    dfu=df_usuarios()
+    nombres=dict(zip(dfu["id"].astype(str), dfu["nombre"].astype(str)))
+    df.insert(df.columns.get_loc(col)+1, "nombre", df[col].map(lambda u: nombres.get(u, "(todos)" if u=="" else u)))
+    return df
 
-def main():
-    seed_usuarios_si_vacio()
-    mig=migrate_passwords_a_fijas()
-    if mig: st.toast(f"{mig} contraseñas normalizadas.", icon="✅")
-    mig_ids=migrate_tarea_ids()
-    if mig_ids: st.toast(f"Normalicé {mig_ids} tarea(s) sin ID.", icon="🧩")
+def view_resumen():
+    if st.button("Actualizar resumen", use_container_width=True):
+        n=actualizar_resumen(); ran.refrescar(get_spreadsheet())
+        st.success(f"Resumen actualizado ({n} usuarios).")
+    st.dataframe(rs.df_resumen(get_spreadsheet()), use_container_width=True, hide_index=True)
+
+    # vistas materializadas: se leen de RLD_analitica; se refrescan solas si cambiaron las fuentes
+    sh=get_spreadsheet(); ran.refrescar_si_hace_falta(sh)
+    st.caption(f"Analítica al {ran.actualizado_en(sh) or '—'}")
+    t1,t2,t3,t4,t5=st.tabs(["Por semana","Por trabajo","Por localidad","Vencidas","Tiempo a Completada"])
+    with t1: st.dataframe(_con_nombres(ran.tabla(sh,"usuario_semana").sort_values(["semana","usuario_id"], ascending=[False,True]), "usuario_id"),
+                          use_container_width=True, hide_index=True)
+    with t2: st.dataframe(ran.tabla(sh,"trabajo").sort_values("total", ascending=False), use_container_width=True, hide_index=True)
+    with t3: st.dataframe(ran.tabla(sh,"localidad").sort_values("total", ascending=False), use_container_width=True, hide_index=True)
+    with t4: st.dataframe(_con_nombres(ran.tabla(sh,"vencidas").sort_values("vencidas", ascending=False), "asignado_id"),
+                          use_container_width=True, hide_index=True)
+    with t5: st.dataframe(_con_nombres(ran.tabla(sh,"completar"), "asignado_id"), use_container_width=True, hide_index=True)
+
+    with st.expander("Archivo mensual (RLD_respuestas y Logs)"):
+        st.caption("Mueve los meses cerrados a hojas RLD_respuestas_AAAA_MM / Logs_AAAA_MM y los anota en RLD_particiones.")
+        c1,c2=st.columns(2)
+        if c1.button("Vista previa", use_container_width=True):
+            prev=ra.archivar_todo(get_spreadsheet(), dry_run=True)
+            if prev: st.dataframe(pd.DataFrame(prev), use_container_width=True, hide_index=True)
+            else: st.info("No hay meses cerrados por archivar.")
+        if c2.button("Archivar meses cerrados", type="primary", use_container_width=True):
+            hechos=ra.archivar_todo(get_spreadsheet())
+            n=sum(r["filas"] for r in hechos)
+            if hechos: log("archivo_mensual", st.session_state["auth"]["usuario"], ", ".join(f"{r['hoja']}:{r['filas']}" for r in hechos))
+            st.success(f"Se archivaron {n} fila(s) en {len(hechos)} partición(es).")
+        man=ra.manifiesto(get_spreadsheet())
+        if not man.empty: st.dataframe(man.drop(columns=["agregados","lote"]), use_container_width=True, hide_index=True)
+
+    with st.expander("Exportar para reportes (Parquet / CSV por mes)"):
+        st.caption(f"Escribe RLD_respuestas y RLD_tareas (con los meses archivados) en `{rx.DESTINO}/<hoja>/mes=AAAA-MM/`, leyendo por bloques.")
+        formato=st.radio("Formato", ["parquet","csv"], horizontal=True, disabled=rx.pq is None, index=0 if rx.pq is not None else 1)
+        if st.button("Exportar", use_container_width=True):
+            with st.spinner("Exportando…"):
+                res=rx.exportar(get_spreadsheet(), formato=formato)
+            log("exportar", st.session_state["auth"]["usuario"], ", ".join(f"{r['hoja']}:{r['filas']}" for r in res))
+            st.dataframe(pd.DataFrame(res).drop(columns=["meses"]), use_container_width=True, hide_index=True)
+            zip_path=shutil.make_archive(os.path.join(tempfile.gettempdir(),"rld_export"), "zip", rx.DESTINO)
+            with open(zip_path,"rb") as f:
+                st.download_button("Descargar .zip", f.read(), file_name="rld_export.zip", mime="application/zip")
+
+def panel_traza():
+    """Llamadas a Sheets y trabajo con DataFrames de este rerun, más agregados por vista."""
+    with st.sidebar:
+        if not st.toggle("Traza de Sheets", value=False): return
+        t=rt.actual()
+        ev=pd.DataFrame(t["eventos"] if t else [], columns=["tipo","nombre","hoja","filas","ms"])
+        st.caption(f"Este rerun: {int((ev['tipo']=='api').sum())} llamadas a la API, "
+                   f"{ev.loc[ev['tipo']=='api','ms'].sum():.0f} ms")
+        st.dataframe(ev, use_container_width=True, hide_index=True)
+        st.caption("Por vista (p50/p95)")
+        st.dataframe(pd.DataFrame(rt.agregados()), use_container_width=True, hide_index=True)
+        c1,c2=st.columns(2)
+        if c1.button("JSONL", use_container_width=True):
+            rt.exportar_jsonl(); st.success(f"→ {rt.AGREGADOS_JSONL}")
+        if c2.button("Prometheus", use_container_width=True):
+            rt.exportar_prometheus(); st.success(f"→ {rt.AGREGADOS_PROM}")
+
+def _main():
+    # solo la primera carga del proceso (o tras subir la versión) toca la hoja
+    for num,nombre,n in rm.aplicar_pendientes(get_spreadsheet()):
+        if n: st.toast(f"Migración {num} ({nombre}): {n} fila(s).", icon="🧩")
 
     portada()
 
     if "auth" not in st.session_state:
-        do_login(); return
+        rt.nombrar("login"); do_login(); return
     logout_btn()
     user=st.session_state["auth"]
 
     vista=st.sidebar.radio("Secciones",["Usuarios","Tareas","Resumen","Mi Perfil"])
+    rt.nombrar(vista)
+    rs.precargar(get_spreadsheet(), *HOJAS_VISTA[vista])
     if vista=="Usuarios":   view_usuarios()
     elif vista=="Tareas":   view_tareas(user)
-    elif vista=="Resumen":  st.dataframe(pd.DataFrame(ws_resumen().get_all_records()), use_container_width=True, hide_index=True)
+    elif vista=="Resumen":  view_resumen()
     else:                   view_perfil_admin(user)
+    panel_traza()
+
+def main():
+    rt.iniciar("inicio")
+    try: _main()
+    finally: rt.cerrar()
 
 if __name__=="__main__":
     main()
@@ -0,0 +1,167 @@
+# =========================
+# RLD – 2025 – Benchmark de vistas contra la hoja en memoria (rld_fake)
+# =========================
+# Corre las vistas reales (AppTest de Streamlit) y actualizar_resumen con 10 / 1k / 50k filas y
+# reporta llamadas a la API, bytes y tiempo por vista, en frío (proceso recién arrancado) y en
+# caliente (rerun siguiente). Falla si alguna vista supera su presupuesto de llamadas.
+#
+#   python bench/bench_vistas.py                    # 10,1000,50000
+#   python bench/bench_vistas.py --tamanos 10,1000 --latencia 0.05
+#   python bench/bench_vistas.py --registrar        # reescribe presupuestos.json con lo observado
+import argparse, json, os, sys, tempfile, time
+from datetime import date, timedelta
+
+os.environ["RLD_BACKEND"] = "local"
+os.environ["RLD_RESP_JOURNAL"] = os.path.join(tempfile.mkdtemp(prefix="rld-bench-"), "respuestas.jsonl")
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from streamlit.testing.v1 import AppTest
+
+import rld_fake
+import rld_sheets as rs
+import rld_migraciones as rm
+import rld_resumen as rr
+import rld_analitica as ran
+import rld_cuota as rq
+
+APP_ADMIN   = os.path.join(RAIZ, "app.py")
+APP_USUARIO = os.path.join(RAIZ, "app - Usuarios - Labores.py")
+PRESUPUESTOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presupuestos.json")
+
+ADMIN = {"id":"9","nombre":"Viviana Peraza","usuario":"vperaza","rol":"admin"}
+USER  = {"id":"10","nombre":"Charly","usuario":"charly","rol":"user"}
+
+def preparar(n: int):
+    """Hoja 'existente' con n tareas y n respuestas, ya migrada."""
+    sh = rld_fake.spreadsheet_local(); rld_fake.vaciar(sh)
+    usuarios = [[int(i), nom, u, rol, rs.hash_password(rm.PASSWORDS_FIJAS[u]), "TRUE", "2025-01-01 08:00:00", ""]
+                for (i, nom, u, rol) in rm.USUARIOS_INICIALES]
+    rld_fake.cargar_filas(sh, rs.SHEET_USUARIOS, rs.HEADERS[rs.SHEET_USUARIOS], usuarios)
+    users = [u for u in usuarios if u[3]=="user"]
+    hoy = date(2025, 9, 1)
+    tareas = []
+    for k in range(1, n+1):
+        u = users[k % len(users)]
+        tareas.append([k, f"Tarea {k}", "Descripción", ["Alta","Media","Baja"][k%3],
+                       ["Nueva","En Progreso","Completada","Rechazada"][k%4], u[0], u[1],
+                       f"{hoy+timedelta(days=k%60)} 08:00:00", str(hoy+timedelta(days=k%60+3)),
+                       "vperaza", "", f"{hoy+timedelta(days=k%60)} 09:00:00"])
+    rld_fake.cargar_filas(sh, rs.SHEET_TAREAS, rs.HEADERS[rs.SHEET_TAREAS], tareas)
+    resp = []
+    for k in range(1, n+1):
+        u = users[k % len(users)]
+        resp.append([f"rld-{k}", k, u[0], u[1], str(hoy+timedelta(days=k%60)), "08:00:00",
+                     "Patrullaje Preventivo", "Centro", u[1], "", ["Pendiente","Validada","Rechazada"][k%3],
+                     "", f"{hoy+timedelta(days=k%60)} 10:00:00", "", u[2], ""])
+    rld_fake.cargar_filas(sh, rs.SHEET_RESPUESTAS, rs.HEADERS[rs.SHEET_RESPUESTAS], resp)
+    rld_fake.cargar_filas(sh, rs.SHEET_META, rs.HEADERS[rs.SHEET_META],
+                          [[rm.CLAVE_VERSION, str(rm.version_objetivo()), "2025-01-01 08:00:00"]])
+    rld_fake.cargar_filas(sh, rs.SHEET_PARTICIONES, rs.HEADERS[rs.SHEET_PARTICIONES], [])
+    rld_fake.cargar_filas(sh, rs.SHEET_LOGS, rs.HEADERS[rs.SHEET_LOGS], [])
+    comprobar_huellas(sh)
+    return sh
+
+def comprobar_huellas(sh):
+    """La huella que la hoja calcula en RLD_meta tiene que coincidir con la local: si no, cada lectura
+    incremental termina en una recarga completa y el benchmark no mide ese camino."""
+    for title in rs._HUELLA:
+        ws = sh._hojas.get(title)
+        if ws is None: continue
+        remota = sh._evaluar(ws, 1, rs._formula_huella(title))
+        local = rs._huella_txt(rs._huella_local(title, ws._filas[1:], 2))
+        if remota != local: raise RuntimeError(f"huella de {title}: hoja {remota!r} != local {local!r}")
+
+def en_frio():
+    rs.reiniciar_caches(); rm._version_ok.clear(); rr._inc.clear(); ran._estado.clear(); ran._ultimo.clear()
+    # cuota llena: que lo gastado por las vistas anteriores no haga esperar (y vencer versiones) a esta
+    rq.reiniciar()
+
+def medir(sh, fn):
+    sh.reiniciar_contadores(); t0 = time.perf_counter()
+    fn()
+    rs.flush_respuestas(sh); rs.flush_logs(sh)  # lo que la vista dejó en cola se le cobra a ella
+    return {"llamadas": sh.total_llamadas, "bytes": sh.bytes, "seg": round(time.perf_counter()-t0, 3),
+            "detalle": dict(sh.llamadas)}
+
+def _app(path, auth, vista=None):
+    at = AppTest.from_file(path, default_timeout=600)
+    if auth: at.session_state["auth"] = dict(auth)
+    at.run()
+    if vista: at.sidebar.radio[0].set_value(vista).run()
+    if at.exception: raise RuntimeError(f"{os.path.basename(path)} {vista}: {at.exception[0].message}")
+    return at
+
+def _guardar_registro():
+    at = _app(APP_USUARIO, USER, "Registrar Labor")
+    [b for b in at.button if b.label=="Guardar"][0].click().run()
+    if at.exception: raise RuntimeError(at.exception[0].message)
+
+def _login():
+    at = _app(APP_USUARIO, None)
+    at.text_input[0].set_value(USER["usuario"]); at.text_input[1].set_value(rm.PASSWORDS_FIJAS[USER["usuario"]])
+    [b for b in at.button if b.label=="Entrar"][0].click().run()
+    if at.exception or "auth" not in at.session_state: raise RuntimeError("login fallido")
+
+def _delta_respuestas():
+    """Otra réplica agregó una labor (sin pasar por los contadores) y se relee RLD_respuestas: en
+    caliente tiene que alcanzar con la cola y la huella (un values_batch_get, sin recarga completa)."""
+    sh = rld_fake.spreadsheet_local(); ws = sh._hojas[rs.SHEET_RESPUESTAS]
+    k = len(ws._filas)
+    ws._filas.append([f"rld-otra-{k}", 1, USER["id"], USER["nombre"], "2025-09-01", "08:00:00", "Patrullaje Preventivo",
+                      "Centro", USER["nombre"], "", "Pendiente", "", "2025-09-01 10:00:00", "", USER["usuario"], ""])
+    df = rs.leer_incremental(sh, rs.SHEET_RESPUESTAS)
+    if len(df) != len(ws._filas)-1: raise RuntimeError(f"lectura incremental: {len(df)} filas, hoja {len(ws._filas)-1}")
+
+VISTAS = {
+    "admin_main":         lambda: _app(APP_ADMIN, None),
+    "admin_tareas":       lambda: _app(APP_ADMIN, ADMIN, "Tareas"),
+    "admin_resumen":      lambda: _app(APP_ADMIN, ADMIN, "Resumen"),
+    "actualizar_resumen": lambda: rr.actualizar_resumen(rld_fake.spreadsheet_local()),
+    "respuestas_delta":   _delta_respuestas,
+    "user_mis_tareas":    lambda: _app(APP_USUARIO, USER, "Mis Tareas"),
+    "user_registro":      _guardar_registro,
+    "user_login":         _login,
+}
+
+def correr(tamanos, latencia):
+    filas = []
+    for n in tamanos:
+        for vista, fn in VISTAS.items():
+            sh = preparar(n); sh.latencia = latencia
+            en_frio()
+            frio = medir(sh, fn)
+            caliente = medir(sh, fn)
+            comprobar_huellas(sh)
+            filas.append({"vista": vista, "filas": n, "frio": frio, "caliente": caliente})
+            print(f"{vista:20s} n={n:<6d} frío: {frio['llamadas']:3d} llamadas {frio['bytes']:>10,d} B {frio['seg']:7.3f}s"
+                  f" | caliente: {caliente['llamadas']:3d} llamadas {caliente['bytes']:>10,d} B {caliente['seg']:7.3f}s")
+    return filas
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de llamadas a la API por vista (hoja en memoria)")
+    ap.add_argument("--tamanos", default="10,1000,50000")
+    ap.add_argument("--latencia", type=float, default=0.0, help="segundos por llamada simulada")
+    ap.add_argument("--json", help="guardar resultados en este archivo")
+    ap.add_argument("--registrar", action="store_true", help="reescribir presupuestos.json")
+    a = ap.parse_args(argv)
+    filas = correr([int(x) for x in a.tamanos.split(",")], a.latencia)
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as f: json.dump(filas, f, ensure_ascii=False, indent=1)
+    if a.registrar:
+        pres = {}
+        for r in filas:
+            p = pres.setdefault(r["vista"], {"frio": 0, "caliente": 0})
+            p["frio"] = max(p["frio"], r["frio"]["llamadas"]); p["caliente"] = max(p["caliente"], r["caliente"]["llamadas"])
+        with open(PRESUPUESTOS, "w", encoding="utf-8") as f: json.dump(pres, f, indent=1, sort_keys=True)
+        print(f"Presupuestos registrados en {PRESUPUESTOS}"); return 0
+    with open(PRESUPUESTOS, encoding="utf-8") as f: pres = json.load(f)
+    excedidas = [(r["vista"], r["filas"], fase, r[fase]["llamadas"], pres[r["vista"]][fase])
+                 for r in filas for fase in ("frio", "caliente")
+                 if r["vista"] in pres and r[fase]["llamadas"] > pres[r["vista"]][fase]]
+    for v, n, fase, obs, lim in excedidas:
+        print(f"EXCEDIDO: {v} n={n} {fase}: {obs} llamadas (presupuesto {lim})")
+    return 1 if excedidas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
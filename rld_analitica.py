@@ -0,0 +1,211 @@
+# =========================
+# RLD – 2025 – Vistas materializadas para el tablero (RLD_analitica)
+# =========================
+# Agregados que no conviene recalcular en cada rerun sobre las hojas crudas. refrescar() los pone al
+# día y los guarda en RLD_analitica, una fila por (vista, clave) con claves y valores en JSON; el
+# tablero solo lee esa hoja (chica y versionada) y la desarma con tabla().
+#
+#   usuario_semana  respuestas por usuario y semana ISO de `fecha`   total, pendientes, validadas, rechazadas
+#   trabajo         respuestas por trabajo_realizado                 idem
+#   localidad       respuestas por localidad_delegacion              idem
+#   vencidas        tareas abiertas y vencidas por asignado          abiertas, vencidas
+#   completar       horas de fecha_asignacion a Completada           tareas, mediana_horas (asignado "" = todos)
+#
+# Respuestas: los conteos son sumas, así que solo se pliegan las filas nuevas o editadas desde el
+# último refresco (se resta la contribución vieja y se suma la nueva). Los meses archivados aportan
+# lo que guardó el manifiesto (agregados["_vistas"]) sin abrir las particiones. Tareas: solo se
+# recalculan los asignados con tareas que cambiaron (todos si cambió el día, por las vencidas).
+import json, threading, time
+from datetime import date
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+import rld_sheets as rs
+import rld_traza as rt
+from rld_resumen import CONTADORES, _iguales
+from rld_sheets import SHEET_ANALITICA, SHEET_RESPUESTAS, SHEET_TAREAS, SHEET_PARTICIONES, HEADERS
+
+# vista -> (claves, valores)
+VISTAS: Dict[str, tuple] = {
+    "usuario_semana": (["usuario_id","semana"], CONTADORES),
+    "trabajo":        (["trabajo_realizado"], CONTADORES),
+    "localidad":      (["localidad_delegacion"], CONTADORES),
+    "vencidas":       (["asignado_id"], ["abiertas","vencidas"]),
+    "completar":      (["asignado_id"], ["tareas","mediana_horas"]),
+}
+VISTAS_RESP = ["usuario_semana","trabajo","localidad"]
+# hojas de las que salen las vistas: su versión queda anotada en la fila "_fuentes"
+FUENTES = [SHEET_RESPUESTAS, SHEET_TAREAS, SHEET_PARTICIONES]
+REFRESCO_MIN_SEG = 60  # refrescar_si_hace_falta no reescribe la hoja más seguido que esto
+
+_COLS_RESP = ["usuario_id","semana","trabajo_realizado","localidad_delegacion"]+CONTADORES
+
+# spreadsheet_id -> {"filas": contribución por fila de respuesta, "agg": {vista: DataFrame} (sin archivo),
+#                    "tareas": DataFrame por tarea_id, "agg_t": {vista: DataFrame}, "hoy", "n_escritas"}
+_estado: Dict[str, dict] = {}
+_ultimo: Dict[str, float] = {}
+_lock = threading.Lock()
+
+def _texto(s: pd.Series) -> pd.Series: return s.astype("string").fillna("").str.strip().astype(object)
+
+def _filas_resp(dfr: pd.DataFrame) -> pd.DataFrame:
+    """Contribución de cada respuesta: sus claves y un 1 en los contadores que le tocan."""
+    f = dfr["fecha"].fillna(dfr["creado_en"])
+    iso = f.dt.isocalendar()
+    semana = (iso["year"].astype(str)+"-W"+iso["week"].astype(str).str.zfill(2)).where(f.notna(), "")
+    ev = dfr["estado_validacion"]
+    return pd.DataFrame({
+        "usuario_id": _texto(dfr["usuario_id"]), "semana": semana.astype(object),
+        "trabajo_realizado": _texto(dfr["trabajo_realizado"]), "localidad_delegacion": _texto(dfr["localidad_delegacion"]),
+        "total": 1, "pendientes": ev.eq("Pendiente").astype(int),
+        "validadas": ev.eq("Validada").astype(int), "rechazadas": ev.eq("Rechazada").astype(int),
+    }).reset_index(drop=True)
+
+def _sumar(filas: pd.DataFrame, claves: List[str]) -> pd.DataFrame:
+    return filas.groupby(claves, sort=False)[CONTADORES].sum()
+
+def _combinar(partes: List[pd.DataFrame], claves: List[str]) -> pd.DataFrame:
+    partes = [p for p in partes if not p.empty]
+    if not partes: return pd.DataFrame(columns=claves+CONTADORES).set_index(claves)
+    d = pd.concat(partes).groupby(level=claves).sum()
+    return d[d["total"]!=0]
+
+def _plegar(estado: dict, filas: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    viejas = estado["filas"]; n = len(viejas)
+    actuales = filas.iloc[:n]
+    iguales = pd.Series(True, index=actuales.index)
+    for c in _COLS_RESP: iguales &= _iguales(actuales[c], viejas[c])
+    nuevas = filas.iloc[n:]
+    if iguales.all() and nuevas.empty: return estado["agg"]
+    mas = pd.concat([actuales[~iguales], nuevas]); menos = viejas[~iguales.values]
+    return {v: _combinar([estado["agg"][v], _sumar(mas, VISTAS[v][0]), -_sumar(menos, VISTAS[v][0])], VISTAS[v][0])
+            for v in VISTAS_RESP}
+
+def agregados_archivo(dfr: pd.DataFrame) -> Dict[str, list]:
+    """Vistas de respuestas de un mes que se archiva, para el manifiesto: {vista: [[claves…, contadores…]]}."""
+    filas = _filas_resp(dfr); out = {}
+    for v in VISTAS_RESP:
+        agg = _sumar(filas, VISTAS[v][0])
+        out[v] = [list(k if isinstance(k, tuple) else (k,))+[int(x) for x in r] for k, r in zip(agg.index, agg.values)]
+    return out
+
+def _archivado(sh) -> Dict[str, pd.DataFrame]:
+    man = rs.snapshot(sh, SHEET_PARTICIONES)
+    partes: Dict[str, list] = {v: [] for v in VISTAS_RESP}
+    for s in man.loc[man["base"]==SHEET_RESPUESTAS, "agregados"]:
+        if not s: continue
+        for v, filas in json.loads(s).get("_vistas", {}).items():
+            if v in partes: partes[v] += filas
+    return {v: pd.DataFrame(f, columns=VISTAS[v][0]+CONTADORES).groupby(VISTAS[v][0], sort=False)[CONTADORES].sum()
+            for v, f in partes.items()}
+
+def _filas_tareas(dft: pd.DataFrame, hoy: pd.Timestamp) -> pd.DataFrame:
+    """Una fila por tarea_id: asignado, si está abierta/vencida y las horas hasta Completada.
+    La hoja no guarda cuándo se completó: se toma ultima_actualizacion de las tareas Completada."""
+    dft = dft[dft["tarea_id_num"].notna()].drop_duplicates("tarea_id_num")
+    abierta = dft["estado"].isin(["Nueva","En Progreso"])
+    horas = (dft["ultima_actualizacion"]-dft["fecha_asignacion"]).dt.total_seconds()/3600
+    return pd.DataFrame({
+        "asignado_id": _texto(dft["asignado_id"]), "abiertas": abierta.astype(int),
+        "vencidas": (abierta & dft["fecha_limite"].lt(hoy)).astype(int),
+        "horas": horas.where(dft["estado"].eq("Completada") & horas.ge(0)),
+    }).set_axis(dft["tarea_id_num"].astype(int).values)
+
+def _agg_tareas(t: pd.DataFrame, con_total: bool = True) -> Dict[str, pd.DataFrame]:
+    venc = t.groupby("asignado_id", sort=False)[["abiertas","vencidas"]].sum()
+    h = t[t["horas"].notna()]
+    comp = h.groupby("asignado_id", sort=False)["horas"].agg(tareas="count", mediana_horas="median")
+    if con_total and not h.empty:
+        comp.loc[""] = [len(h), float(h["horas"].median())]
+    return {"vencidas": venc[venc["abiertas"]>0], "completar": comp}
+
+def _plegar_tareas(estado: dict, t: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    viejas = estado["tareas"]; ids = t.index.union(viejas.index)
+    a, v = t.reindex(ids), viejas.reindex(ids)
+    iguales = pd.Series(True, index=ids)
+    for c in t.columns: iguales &= _iguales(a[c], v[c])
+    if iguales.all(): return estado["agg_t"]
+    afectados = set(a.loc[~iguales, "asignado_id"].dropna()) | set(v.loc[~iguales, "asignado_id"].dropna())
+    nuevos = _agg_tareas(t[t["asignado_id"].isin(afectados)], con_total=False)
+    out = {k: pd.concat([estado["agg_t"][k].drop(index=list(afectados | {""}), errors="ignore"), nuevos[k]])
+           for k in nuevos}
+    h = t["horas"].dropna()
+    if not h.empty: out["completar"].loc[""] = [len(h), float(h.median())]
+    return out
+
+def _numero(x):
+    x = float(x)
+    return int(x) if x.is_integer() else round(x, 2)
+
+def _filas_hoja(aggs: Dict[str, pd.DataFrame], fuentes: dict, ahora: str) -> List[list]:
+    filas = [["_fuentes", "[]", json.dumps(fuentes, separators=(",", ":")), ahora]]
+    for v, (claves, valores) in VISTAS.items():
+        df = aggs[v].sort_index()
+        for k, r in zip(df.index, df[valores].values):
+            filas.append([v, json.dumps([str(x) for x in (k if isinstance(k, tuple) else (k,))], ensure_ascii=False),
+                          json.dumps([_numero(x) for x in r]), ahora])
+    return filas
+
+@rt.medido("escritura", SHEET_ANALITICA)
+def refrescar(sh, incremental: bool = True) -> int:
+    """Recalcula las vistas (solo lo que cambió desde el último refresco del proceso) y reescribe
+    RLD_analitica con un único update de rango. Devuelve las filas de datos escritas."""
+    vers = rs.versiones(sh)
+    fuentes = {"versiones": {t: vers.get(t) for t in FUENTES}, "hoy": str(date.today())}  # leídas antes que los datos
+    hoy = pd.Timestamp(date.today())
+    rs.precargar(sh, *FUENTES)  # las que vencieron, en una sola ida
+    filas = _filas_resp(rs.df_respuestas(sh)); t = _filas_tareas(rs.df_tareas(sh), hoy)
+    with _lock:
+        e = _estado.get(sh.id)
+        # si desaparecieron filas (archivo o borrado manual) la marca de agua ya no sirve
+        if not incremental or e is None or len(filas) < len(e["filas"]):
+            agg = {v: _sumar(filas, VISTAS[v][0]) for v in VISTAS_RESP}
+        else:
+            agg = _plegar(e, filas)
+        agg_t = _agg_tareas(t) if not incremental or e is None or e["hoy"]!=hoy else _plegar_tareas(e, t)
+        _estado[sh.id] = {"filas": filas, "agg": agg, "tareas": t, "agg_t": agg_t, "hoy": hoy,
+                          "n_escritas": (e or {}).get("n_escritas")}
+    arch = _archivado(sh)
+    total = {v: _combinar([agg[v], arch[v]], VISTAS[v][0]) for v in VISTAS_RESP}
+    datos = _filas_hoja({**total, **agg_t}, fuentes, rs.iso_now())
+    ws = rs.get_ws(sh, SHEET_ANALITICA)
+    valores = [HEADERS[SHEET_ANALITICA]]+datos
+    previas = _estado[sh.id].get("n_escritas")
+    if previas is None:
+        ws.clear()  # primera vez en el proceso: no se sabe cuántas filas viejas quedan
+    else:
+        valores += [[""]*len(HEADERS[SHEET_ANALITICA])]*max(0, previas-len(datos))
+    ws.update(range_name=f"A1:D{len(valores)}", values=valores, value_input_option="RAW")
+    _estado[sh.id]["n_escritas"] = len(datos); _ultimo[sh.id] = time.monotonic()
+    rs.registrar_cambio(sh, SHEET_ANALITICA)
+    return len(datos)
+
+def _fuentes_guardadas(df: pd.DataFrame) -> Optional[dict]:
+    f = df.loc[df["vista"]=="_fuentes", "valores"]
+    return json.loads(f.iloc[0]) if not f.empty and f.iloc[0] else None
+
+def al_dia(sh) -> bool:
+    """¿Lo guardado corresponde a las versiones actuales de las fuentes (y al día de hoy)?"""
+    guardadas = _fuentes_guardadas(rs.snapshot(sh, SHEET_ANALITICA))
+    if guardadas is None: return False
+    vers = rs.versiones(sh)
+    return guardadas == {"versiones": {t: vers.get(t) for t in FUENTES}, "hoy": str(date.today())}
+
+def refrescar_si_hace_falta(sh) -> bool:
+    """Para el tablero: refresca solo si las fuentes cambiaron, a lo sumo cada REFRESCO_MIN_SEG."""
+    if al_dia(sh) or time.monotonic()-_ultimo.get(sh.id, -REFRESCO_MIN_SEG) < REFRESCO_MIN_SEG: return False
+    refrescar(sh); return True
+
+def tabla(sh, vista: str) -> pd.DataFrame:
+    """Una vista guardada como DataFrame (claves + valores), sin tocar las hojas crudas."""
+    claves, valores = VISTAS[vista]
+    df = rs.snapshot(sh, SHEET_ANALITICA)
+    df = df[df["vista"]==vista]
+    filas = [json.loads(c)+json.loads(v) for c, v in zip(df["clave"], df["valores"])]
+    return pd.DataFrame(filas, columns=claves+valores)
+
+def actualizado_en(sh) -> str:
+    df = rs.snapshot(sh, SHEET_ANALITICA)
+    f = df.loc[df["vista"]=="_fuentes", "actualizado_en"]
+    return str(f.iloc[0]) if not f.empty else ""
@@ -0,0 +1,128 @@
+# =========================
+# RLD – 2025 – Archivo mensual de RLD_respuestas y Logs
+# =========================
+# Los meses cerrados salen de las hojas "calientes" a particiones (RLD_respuestas_2025_09,
+# Logs_2025_09) y quedan anotados en RLD_particiones. Las lecturas normales solo ven la hoja
+# caliente; una partición se abre cuando un filtro de fecha llega hasta su mes, y como no cambia
+# se lee a lo sumo una vez por proceso. El manifiesto guarda además los conteos por usuario de
+# cada mes de respuestas (y sus vistas de rld_analitica), así el resumen no necesita releer el historial.
+import hashlib, json, threading
+from datetime import date
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+import rld_sheets as rs
+import rld_resumen as rr
+import rld_analitica as ran
+import rld_traza as rt
+from rld_sheets import SHEET_RESPUESTAS, SHEET_LOGS, SHEET_PARTICIONES
+
+# hoja caliente -> columna cuya fecha decide el mes
+COLUMNA_FECHA = {SHEET_RESPUESTAS: "creado_en", SHEET_LOGS: "timestamp"}
+
+# (spreadsheet_id, hoja) -> DataFrame de una partición ya leída
+_leidas: Dict[tuple, pd.DataFrame] = {}
+_leidas_lock = threading.Lock()
+
+def nombre_particion(base: str, mes: str) -> str: return f"{base}_{mes.replace('-', '_')}"
+
+def _lote(filas: List[list]) -> str:
+    return hashlib.sha1(json.dumps(filas, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+def manifiesto(sh) -> pd.DataFrame: return rs.snapshot(sh, SHEET_PARTICIONES)
+
+def _sin_vacias(r: list) -> list:
+    r = [str(x) for x in r]
+    while r and r[-1]=="": r.pop()
+    return r
+
+def _termina_en(existentes: List[list], filas: List[list]) -> bool:
+    """¿La partición ya tiene este lote al final? (copiado en una corrida que no llegó al manifiesto)"""
+    if len(existentes) < len(filas): return False
+    return all(_sin_vacias(a)==_sin_vacias(b) for a, b in zip(existentes[len(existentes)-len(filas):], filas))
+
+@rt.medido("escritura")
+def archivar(sh, base: str, hoy: Optional[date] = None, dry_run: bool = False) -> List[dict]:
+    """Mueve a particiones las filas de meses cerrados de `base`. Devuelve un dict por mes.
+
+    Solo se mueve el tramo inicial de la hoja (hasta la primera fila del mes en curso o sin fecha):
+    las altas llegan al final, así que borrar desde la fila 2 no choca con escrituras concurrentes.
+    Cada mes se copia y se anota en el manifiesto antes de borrar nada; si una corrida se corta,
+    la siguiente reconoce el lote ya anotado por su hash y solo completa el borrado. Si se cortó
+    entre la copia y la anotación, la partición ya termina en ese lote y no se vuelve a copiar."""
+    actual = (hoy or date.today()).strftime("%Y-%m")
+    ws = rs.get_ws(sh, base)
+    vals = ws.get_all_values()
+    if len(vals) < 2: return []
+    header, datos = vals[0], vals[1:]
+    j = header.index(COLUMNA_FECHA[base])
+    # el mismo parser que snapshot(): también las fechas con el formato regional de la hoja (1/9/2025)
+    meses = rs._fechas(pd.Series([r[j] if len(r) > j else "" for r in datos], dtype=object)).dt.strftime("%Y-%m")
+    n = int((meses.notna() & (meses < actual)).cumprod().sum())
+    if n == 0: return []
+    rs.invalidar(SHEET_PARTICIONES)
+    man = manifiesto(sh)
+    hechos = set(man["lote"].astype(str))
+    out = []
+    for mes, grupo in meses.iloc[:n].groupby(meses.iloc[:n], sort=True):
+        filas = [datos[i] for i in grupo.index]
+        hoja, lote = nombre_particion(base, mes), _lote(filas)
+        out.append({"hoja": hoja, "mes": mes, "filas": len(filas), "ya_copiado": lote in hechos})
+        if dry_run or lote in hechos: continue
+        wp = rs.get_ws(sh, hoja)
+        if not _termina_en(wp.get_all_values()[1:], filas): wp.append_rows(filas, value_input_option="RAW")
+        if base==SHEET_RESPUESTAS:
+            dfm = rs.a_dataframe(base, header, filas)
+            agregados = rr.agregados_json(dfm, _vistas=ran.agregados_archivo(dfm))
+        else: agregados = ""
+        rs.get_ws(sh, SHEET_PARTICIONES).append_rows(
+            [[hoja, base, mes, len(filas), lote, agregados, rs.iso_now()]], value_input_option="RAW")
+    if dry_run: return out
+    ws.delete_rows(2, n+1)
+    rs.registrar_cambio(sh, base, SHEET_PARTICIONES)
+    return out
+
+def archivar_todo(sh, hoy: Optional[date] = None, dry_run: bool = False) -> List[dict]:
+    return [r for base in COLUMNA_FECHA for r in archivar(sh, base, hoy, dry_run)]
+
+def leer_particion(sh, hoja: str) -> pd.DataFrame:
+    key = (sh.id, hoja)
+    with _leidas_lock:
+        df = _leidas.get(key)
+        if df is None:
+            vals = rs.get_ws(sh, hoja).get_all_values()
+            df = _leidas[key] = rs.a_dataframe(hoja, vals[0] if vals else rs.headers_de(hoja), vals[1:])
+    return df.copy()
+
+def particiones_desde(sh, base: str, desde: date) -> List[str]:
+    man = manifiesto(sh)
+    sel = man.loc[(man["base"]==base) & (man["mes"] >= desde.strftime("%Y-%m")), "hoja"]
+    return sorted(set(sel.astype(str)))
+
+def inicio_caliente(sh, base: str) -> Optional[date]:
+    """Primer día del mes siguiente al último archivado de `base` (None si no hay particiones):
+    lo anterior ya no está en la hoja caliente."""
+    man = manifiesto(sh)
+    meses = man.loc[man["base"]==base, "mes"].astype(str)
+    if meses.empty: return None
+    a, m = map(int, meses.max().split("-"))
+    return date(a+m//12, m%12+1, 1)
+
+def df_desde(sh, base: str, desde: Optional[date] = None) -> pd.DataFrame:
+    """Hoja caliente y, si `desde` cae en meses archivados, las particiones de esos meses (en orden)."""
+    df = rs.snapshot(sh, base)
+    if desde is None: return df
+    partes = [leer_particion(sh, h) for h in particiones_desde(sh, base, desde)]
+    return rs.concatenar(partes+[df]) if partes else df
+
+def respuestas_de(sh, usuario_id, desde: Optional[date] = None) -> pd.DataFrame:
+    """df_desde(SHEET_RESPUESTAS, desde) de un solo usuario."""
+    df = rs.respuestas_de(sh, usuario_id)
+    if desde is None: return df
+    partes = [p[p["usuario_id"].eq(int(usuario_id)).fillna(False)]
+              for p in (leer_particion(sh, h) for h in particiones_desde(sh, SHEET_RESPUESTAS, desde))]
+    return rs.concatenar(partes+[df]) if partes else df
+
+def reiniciar_caches():
+    with _leidas_lock: _leidas.clear()
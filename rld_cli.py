@@ -0,0 +1,157 @@
+# =========================
+# RLD – 2025 – Comandos de administración sin Streamlit
+# =========================
+# Lo que en la app admin son botones, por lotes y desde la terminal, con la misma lógica de hojas
+# (rld_sheets, rld_resumen, rld_migraciones…). No importa Streamlit. Como las apps, aplica antes
+# las migraciones pendientes (salvo --dry-run; con la hoja en memoria siempre, porque arranca
+# vacía). Cada comando informa filas, segundos, filas/s y llamadas a la API.
+#
+#   python rld_cli.py importar-tareas plan.csv --por vperaza   # titulo,descripcion,prioridad,asignado,fecha_limite[,estado]
+#   python rld_cli.py importar-tareas plan.csv --lote 200 --dry-run
+#   python rld_cli.py resumen [--completo]                      # RLD_por_usuario y RLD_analitica
+#   python rld_cli.py migrar [--dry-run]
+#   python rld_cli.py usuarios --activar charly,luis --inactivar pamela
+#   python rld_cli.py archivar [--dry-run]
+#   RLD_BACKEND=local python rld_cli.py …                      # contra la hoja en memoria (o --local)
+import argparse, csv, os, sys, time
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+import rld_analitica as ran
+import rld_archivo as ra
+import rld_conexion
+import rld_migraciones as rm
+import rld_resumen as rr
+import rld_sheets as rs
+import rld_traza as rt
+
+LOTE = 500  # tareas por append_rows (y por reserva de IDs)
+MAX_ERRORES = 20  # líneas con error que se muestran
+COLUMNAS_CSV = ["titulo","descripcion","prioridad","asignado","fecha_limite"]
+
+def _lista(s: str) -> List[str]: return [x.strip() for x in (s or "").split(",") if x.strip()]
+
+def leer_csv(ruta: str) -> List[Dict[str, str]]:
+    # utf-8-sig: los CSV guardados desde Excel traen BOM
+    with open(ruta, encoding="utf-8-sig", newline="") as f:
+        lector = csv.DictReader(f)
+        faltan = [c for c in COLUMNAS_CSV if c not in (lector.fieldnames or [])]
+        if faltan: raise ValueError(f"Faltan columnas en {ruta}: {', '.join(faltan)}")
+        return [{k: (v or "").strip() for k, v in r.items() if k} for r in lector]
+
+def filas_tareas(registros: List[Dict[str, str]], dfu: pd.DataFrame, por: str) -> Tuple[List[list], List[str]]:
+    """Filas de RLD_tareas (sin tarea_id) como las arma "Crear y asignar", y los errores por línea.
+    `asignado` puede ser el usuario, el nombre o el id de un usuario activo con rol user."""
+    activos = dfu[(dfu["rol_norm"]=="user") & (dfu["activo_norm"])]
+    por_clave: Dict[str, pd.Series] = {}
+    for _, u in activos.iterrows():
+        for k in (str(u["usuario"]).lower(), str(u["nombre"]).lower(), str(u["id"])): por_clave.setdefault(k, u)
+    filas, errores = [], []
+    for linea, r in enumerate(registros, start=2):
+        u = por_clave.get(r["asignado"].lower())
+        prioridad = r["prioridad"] or "Media"; estado = r.get("estado") or "Nueva"
+        flim = pd.to_datetime(r["fecha_limite"], errors="coerce")
+        mal = [m for m, ok in [("título vacío", r["titulo"]), (f"asignado desconocido o inactivo: {r['asignado']!r}", u is not None),
+                               (f"prioridad inválida: {prioridad!r}", prioridad in rs.CATEGORIAS["prioridad"]),
+                               (f"estado inválido: {estado!r}", estado in rs.CATEGORIAS["estado"]),
+                               (f"fecha_limite inválida: {r['fecha_limite']!r}", not pd.isna(flim))] if not ok]
+        if mal: errores.append(f"línea {linea}: "+"; ".join(mal)); continue
+        ahora = rs.iso_now()
+        filas.append([r["titulo"], r["descripcion"], prioridad, estado, str(u["id"]), u["nombre"], ahora,
+                      flim.strftime("%Y-%m-%d"), por, "", ahora])
+    return filas, errores
+
+def cmd_importar_tareas(sh, a) -> int:
+    filas, errores = filas_tareas(leer_csv(a.csv), rs.df_usuarios(sh), a.por)
+    for e in errores[:MAX_ERRORES]: print(e, file=sys.stderr)
+    if len(errores) > MAX_ERRORES: print(f"… y {len(errores)-MAX_ERRORES} más", file=sys.stderr)
+    if errores: print(f"{len(errores)} línea(s) con errores: no se importó nada.", file=sys.stderr); return -1
+    if a.dry_run:
+        print(f"[dry-run] {len(filas)} tarea(s) en {-(-len(filas)//a.lote)} lote(s) de hasta {a.lote}"); return len(filas)
+    for i in range(0, len(filas), a.lote):
+        lote = filas[i:i+a.lote]
+        base = rs.crear_tareas(sh, lote)  # reserva de IDs + un append_rows + la versión
+        print(f"  #{base}–#{base+len(lote)-1}")
+    rs.log_evento(sh, "importar_tareas", a.por, f"{os.path.basename(a.csv)}:{len(filas)}", rs.iso_now())
+    return len(filas)
+
+def cmd_resumen(sh, a) -> int:
+    if a.dry_run:
+        n = len(rr.calcular_resumen(sh, incremental=False))
+        print(f"[dry-run] RLD_por_usuario tendría {n} fila(s)"); return n
+    n = rr.actualizar_resumen(sh, incremental=not a.completo)
+    m = ran.refrescar(sh, incremental=not a.completo)
+    print(f"  RLD_por_usuario: {n} fila(s); RLD_analitica: {m} fila(s)")
+    return n+m
+
+def cmd_migrar(sh, a) -> int:
+    if a.dry_run:
+        pend = rm.pendientes(sh)
+        for num, nombre in pend: print(f"[dry-run] pendiente {num} ({nombre})")
+        if not pend: print("[dry-run] sin migraciones pendientes")
+        return 0
+    hechas = rm.aplicar_pendientes(sh)
+    for num, nombre, n in hechas: print(f"  {num} ({nombre}): {n} fila(s)")
+    if not hechas: print("  sin migraciones pendientes")
+    return sum(n for _, _, n in hechas)
+
+def cmd_usuarios(sh, a) -> int:
+    cambios = {**{u: True for u in _lista(a.activar)}, **{u: False for u in _lista(a.inactivar)}}
+    if not cambios: print("Nada que hacer: use --activar y/o --inactivar.", file=sys.stderr); return -1
+    if a.dry_run:
+        dfu = rs.df_usuarios(sh); conocidos = set(dfu["usuario"].astype(str).str.lower())
+        for u, v in cambios.items():
+            print(f"[dry-run] {u} -> {'activo' if v else 'inactivo'}" + ("" if u.lower() in conocidos else " (no existe)"))
+        return sum(u.lower() in conocidos for u in cambios)
+    faltan = rs.fijar_activo(sh, cambios)
+    for u in faltan: print(f"  no existe: {u}", file=sys.stderr)
+    hechos = [u for u in cambios if u not in faltan]
+    if hechos: rs.log_evento(sh, "usuarios_activo", "cli", ", ".join(f"{u}:{cambios[u]}" for u in hechos), rs.iso_now())
+    return len(hechos)
+
+def cmd_archivar(sh, a) -> int:
+    hechos = ra.archivar_todo(sh, dry_run=a.dry_run)
+    for r in hechos: print(f"  {'[dry-run] ' if a.dry_run else ''}{r['hoja']}: {r['filas']} fila(s)" + (" (ya copiado)" if r["ya_copiado"] else ""))
+    if not hechos: print("  no hay meses cerrados por archivar")
+    return sum(r["filas"] for r in hechos)
+
+COMANDOS = {"importar-tareas": cmd_importar_tareas, "resumen": cmd_resumen, "migrar": cmd_migrar,
+            "usuarios": cmd_usuarios, "archivar": cmd_archivar}
+
+def _parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Operaciones de administración de RLD sin Streamlit")
+    ap.add_argument("--url", default=None, help="hoja de cálculo (por defecto RLD_SPREADSHEET_URL)")
+    ap.add_argument("--local", action="store_true", help="usar la hoja en memoria (RLD_BACKEND=local)")
+    sub = ap.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("importar-tareas", help="alta masiva de tareas desde CSV")
+    p.add_argument("csv"); p.add_argument("--por", default="cli", help="creado_por de las tareas")
+    p.add_argument("--lote", type=int, default=LOTE, help="tareas por append_rows")
+    p = sub.add_parser("resumen", help="recalcular RLD_por_usuario y RLD_analitica")
+    p.add_argument("--completo", action="store_true", help="desde cero, sin plegar incrementalmente")
+    sub.add_parser("migrar", help="aplicar las migraciones pendientes")
+    p = sub.add_parser("usuarios", help="activar/inactivar usuarios")
+    p.add_argument("--activar", default="", help="usuarios separados por coma")
+    p.add_argument("--inactivar", default="", help="usuarios separados por coma")
+    sub.add_parser("archivar", help="mover los meses cerrados a particiones")
+    for s in sub.choices.values(): s.add_argument("--dry-run", action="store_true", help="validar e informar sin escribir")
+    return ap
+
+def main(argv=None) -> int:
+    a = _parser().parse_args(argv)
+    if a.local: os.environ["RLD_BACKEND"] = "local"
+    sh = rld_conexion.abrir(a.url)
+    rt.iniciar(f"cli {a.comando}"); t0 = time.perf_counter()
+    local = os.environ.get("RLD_BACKEND")=="local"
+    if a.comando!="migrar" and (not a.dry_run or local):
+        for num, nombre, n in rm.aplicar_pendientes(sh): print(f"  migración {num} ({nombre}): {n} fila(s)")
+    n = COMANDOS[a.comando](sh, a)
+    if not a.dry_run: rs.flush_logs(sh)
+    seg = time.perf_counter()-t0; traza = rt.cerrar()
+    if n < 0: return 1
+    print(f"{a.comando}: {n} fila(s) en {seg:.2f}s ({n/seg if seg else n:,.0f} filas/s), "
+          f"{traza['resumen']['api']} llamada(s) a la API")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
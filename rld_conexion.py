@@ -0,0 +1,47 @@
+# =========================
+# RLD – 2025 – Conexión a la hoja sin Streamlit (comandos y tareas de fondo)
+# =========================
+# Las apps abren la hoja con st.secrets; aquí se hace lo mismo leyendo las credenciales de
+# RLD_CREDENCIALES (JSON de la cuenta de servicio) o de .streamlit/secrets.toml.
+import json, os, tomllib
+from typing import Optional
+
+import rld_cuota as rq
+
+SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1LiHP1V5PMzt13yX_zgSeVFmZ7r-HM6PPEI5Ej46ziPk/edit?usp=sharing"
+SECRETS_TOML = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets","https://www.googleapis.com/auth/drive"]
+
+def credenciales() -> dict:
+    ruta = os.environ.get("RLD_CREDENCIALES", "")
+    if ruta:
+        with open(ruta, encoding="utf-8") as f: info = json.load(f)
+    elif os.path.exists(SECRETS_TOML):
+        with open(SECRETS_TOML, "rb") as f: info = dict(tomllib.load(f).get("gcp_service_account", {}))
+    else: info = {}
+    if not info: raise RuntimeError("Faltan credenciales: defina RLD_CREDENCIALES o .streamlit/secrets.toml [gcp_service_account].")
+    if isinstance(info.get("private_key"), str):
+        info["private_key"] = info["private_key"].replace("\\n","\n").replace("\r\n","\n")
+    return info
+
+def abrir(url: Optional[str] = None):
+    """Spreadsheet envuelto con la capa de cuota; con RLD_BACKEND=local, la hoja en memoria; con
+    RLD_BACKEND=sqlite, el almacén local (sincronizado con la hoja salvo RLD_SYNC=0)."""
+    if os.environ.get("RLD_BACKEND")=="local":
+        import rld_fake
+        return rq.programar(rld_fake.spreadsheet_local())
+    if os.environ.get("RLD_BACKEND")=="sqlite":
+        import rld_sqlite, rld_sheets as rs
+        remoto = None if os.environ.get("RLD_SYNC")=="0" else _remota(url)
+        return rld_sqlite.abrir(remoto=remoto, al_traer=lambda sh, hojas: rs.registrar_cambio(sh, *hojas))
+    return _remota(url)
+
+def _remota(url: Optional[str] = None):
+    import gspread
+    from gspread.exceptions import APIError
+    from google.oauth2.service_account import Credentials
+    gc = gspread.authorize(Credentials.from_service_account_info(credenciales(), scopes=SCOPES))
+    url = url or os.environ.get("RLD_SPREADSHEET_URL", SPREADSHEET_URL)
+    try: sh = gc.open_by_key(url.split("/d/")[1].split("/")[0])
+    except APIError: sh = gc.open_by_url(url)
+    return rq.programar(sh)
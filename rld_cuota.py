@@ -0,0 +1,140 @@
+# =========================
+# RLD – 2025 – Capa de peticiones a Sheets: cuota, reintentos y lecturas compartidas
+# =========================
+import os, random, threading, time
+from typing import Callable, Dict
+
+import requests
+from gspread.exceptions import APIError
+
+import rld_traza as rt
+
+# Cuota de la API de Sheets por cuenta de servicio (lecturas y escrituras se cuentan aparte).
+LECTURAS_POR_MIN   = int(os.environ.get("RLD_LECTURAS_POR_MIN", "60"))
+ESCRITURAS_POR_MIN = int(os.environ.get("RLD_ESCRITURAS_POR_MIN", "60"))
+MAX_INTENTOS = 6
+BACKOFF_BASE = 1.0   # seg; se duplica en cada intento, con jitter completo
+BACKOFF_MAX  = 32.0
+
+LECTURAS = {"get_all_records","get_all_values","get","get_values","batch_get","col_values","row_values",
+            "find","findall","acell","cell","values_batch_get","values_get","worksheets","worksheet",
+            "fetch_sheet_metadata"}
+REINTENTABLES_LECTURA   = {429, 500, 502, 503, 504}
+REINTENTABLES_ESCRITURA = {429}  # un 5xx en un append puede haberse aplicado: no se repite
+
+# Se puede reemplazar en pruebas para no dormir de verdad.
+dormir: Callable[[float], None] = time.sleep
+reloj: Callable[[], float] = time.monotonic
+
+class _Cubeta:
+    """Token bucket: `por_minuto` fichas, recarga continua."""
+    def __init__(self, por_minuto: int):
+        self.cap = float(por_minuto); self.fichas = float(por_minuto)
+        self.t = reloj(); self.lock = threading.Lock()
+
+    def tomar(self):
+        while True:
+            with self.lock:
+                ahora = reloj()
+                self.fichas = min(self.cap, self.fichas+(ahora-self.t)*self.cap/60.0); self.t = ahora
+                if self.fichas >= 1: self.fichas -= 1; return
+                espera = (1-self.fichas)*60.0/self.cap
+            dormir(espera)
+
+_cubetas = {"lectura": _Cubeta(LECTURAS_POR_MIN), "escritura": _Cubeta(ESCRITURAS_POR_MIN)}
+
+def reiniciar():
+    """Cuota llena, como al arrancar el proceso (benchmarks y pruebas)."""
+    for c in _cubetas.values():
+        with c.lock: c.fichas = c.cap; c.t = reloj()
+
+def _status(exc) -> int:
+    if isinstance(exc, APIError):
+        code = getattr(exc, "code", None)
+        if code is None and getattr(exc, "response", None) is not None: code = exc.response.status_code
+        return int(code or 0)
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)): return 503
+    return 0
+
+def ejecutar(fn: Callable, lectura: bool):
+    """Corre una llamada respetando la cuota y reintentando 429/5xx con backoff exponencial."""
+    reintentables = REINTENTABLES_LECTURA if lectura else REINTENTABLES_ESCRITURA
+    cubeta = _cubetas["lectura" if lectura else "escritura"]
+    for intento in range(MAX_INTENTOS):
+        cubeta.tomar()
+        try:
+            return fn()
+        except (APIError, requests.ConnectionError, requests.Timeout) as e:
+            if _status(e) not in reintentables or intento==MAX_INTENTOS-1: raise
+            dormir(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE*(2**intento))))
+
+# clave de la lectura -> {"evento", "resultado", "error"}; los que llegan mientras está en vuelo esperan
+_en_vuelo: Dict[tuple, dict] = {}
+_vuelo_lock = threading.Lock()
+# id de la hoja de cálculo -> escrituras terminadas. Va en la clave de las lecturas: quien acaba de
+# escribir no se suma a una lectura que salió antes de su escritura (y podría no verla).
+_generacion: Dict[str, int] = {}
+
+def _gen(origen: str) -> int:
+    with _vuelo_lock: return _generacion.get(origen.partition("/")[0], 0)
+
+def _escrita(origen: str):
+    with _vuelo_lock:
+        sid = origen.partition("/")[0]; _generacion[sid] = _generacion.get(sid, 0)+1
+
+def _una_vez(clave: tuple, fn: Callable):
+    """Single-flight: lecturas idénticas concurrentes (de cualquier sesión) comparten una petición.
+    El resultado es el mismo objeto para todos: no debe modificarse. Devuelve (resultado, compartida)."""
+    with _vuelo_lock:
+        vuelo = _en_vuelo.get(clave)
+        lider = vuelo is None
+        if lider: vuelo = _en_vuelo[clave] = {"evento": threading.Event(), "resultado": None, "error": None}
+    if not lider:
+        vuelo["evento"].wait()
+        if vuelo["error"] is not None: raise vuelo["error"]
+        return vuelo["resultado"], True
+    try:
+        vuelo["resultado"] = ejecutar(fn, lectura=True)
+        return vuelo["resultado"], False
+    except Exception as e:
+        vuelo["error"] = e; raise
+    finally:
+        with _vuelo_lock: _en_vuelo.pop(clave, None)
+        vuelo["evento"].set()
+
+class _Programado:
+    """Proxy de Spreadsheet/Worksheet: los métodos pasan por ejecutar(); los atributos, directo."""
+    def __init__(self, obj, origen: str):
+        self._obj = obj; self._origen = origen
+
+    def __getattr__(self, nombre):
+        attr = getattr(self._obj, nombre)
+        if not callable(attr): return attr
+        def llamada(*args, **kwargs):
+            fn = lambda: attr(*args, **kwargs)
+            t0 = time.perf_counter(); compartida = False
+            if nombre in LECTURAS:
+                clave = (self._origen, _gen(self._origen), nombre, repr(args), repr(sorted(kwargs.items())))
+                res, compartida = _una_vez(clave, fn)
+            else:
+                # también si falla: un 5xx pudo haberse aplicado igual
+                try: res = ejecutar(fn, lectura=False)
+                finally: _escrita(self._origen)
+            rt.registrar("api", nombre, self._origen.partition("/")[2], rt.contar_filas(res),
+                         time.perf_counter()-t0, compartida=compartida)
+            return _envolver(res, self._origen)
+        return llamada
+
+    def __repr__(self): return f"<programado {self._obj!r}>"
+
+def _es_hoja(x) -> bool: return hasattr(x, "title") and hasattr(x, "row_values")
+
+def _envolver(res, origen: str):
+    if _es_hoja(res): return _Programado(res, f"{origen}/{res.title}")
+    if isinstance(res, list) and res and all(_es_hoja(x) for x in res):
+        return [_Programado(x, f"{origen}/{x.title}") for x in res]
+    return res
+
+def programar(sh):
+    """Envuelve un Spreadsheet de gspread (o el fake local) con la capa de cuota."""
+    return sh if isinstance(sh, _Programado) else _Programado(sh, str(sh.id))
@@ -0,0 +1,149 @@
+# =========================
+# RLD – 2025 – Exportación columnar (Parquet, o CSV sin pyarrow) por mes
+# =========================
+# Recorre RLD_respuestas y RLD_tareas (incluidas las particiones archivadas) por bloques de filas,
+# los tipa con el esquema de rld_sheets y los escribe en un archivo por hoja y mes:
+#   <destino>/<hoja>/mes=2025-09/part-0.parquet
+# Cada bloque se escribe y se descarta, así que exportar años de historial no carga la hoja
+# completa en memoria. Los reportes leen después esos archivos con leer(), sin tocar la API.
+#
+#   python rld_export.py                          # Parquet en ./export
+#   python rld_export.py --formato csv --bloque 2000 --destino /tmp/rld
+#   RLD_BACKEND=local python rld_export.py        # contra la hoja en memoria
+import argparse, os, shutil, sys, time
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+import rld_sheets as rs
+import rld_archivo as ra
+from rld_sheets import SHEET_RESPUESTAS, SHEET_TAREAS, ESQUEMA
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DESTINO = os.environ.get("RLD_EXPORT_DIR", "export")
+BLOQUE = 5000  # filas por lectura de rango
+# hoja -> columna cuya fecha decide el mes del archivo
+COLUMNA_MES = {SHEET_RESPUESTAS: "fecha", SHEET_TAREAS: "fecha_asignacion"}
+SIN_FECHA = "sin_fecha"
+# tipos que no están en ESQUEMA porque la app conserva la columna cruda (ver tarea_id_num)
+_TIPOS_EXTRA = {SHEET_TAREAS: {"tarea_id": "Int64"}}
+
+def _base(title: str) -> str: return title if title in rs.HEADERS else title.rsplit("_", 2)[0]
+
+def _tipos(base: str) -> Dict[str, str]: return {**ESQUEMA.get(base, {}), **_TIPOS_EXTRA.get(base, {})}
+
+def bloques(sh, title: str, tam: int = BLOQUE) -> Iterator[pd.DataFrame]:
+    """DataFrames tipados de hasta `tam` filas, con un get de rango por bloque."""
+    ws = rs.get_ws(sh, title); base = _base(title)
+    col = rowcol_to_a1(1, len(rs.headers_de(title))).rstrip("0123456789")
+    header, desde = None, 1
+    while True:
+        pedido = tam+(1 if header is None else 0)
+        vals = ws.get(f"A{desde}:{col}{desde+pedido-1}")
+        desde += pedido
+        if header is None:
+            if not vals: return
+            header, datos = [str(h) for h in vals[0]], vals[1:]
+        else: datos = vals
+        df = rs.a_dataframe(title, header, datos) if datos else None
+        if df is not None and not df.empty:
+            if base==SHEET_TAREAS: df["tarea_id"] = df["tarea_id_num"]
+            yield df
+        if len(vals) < pedido: return  # la API recorta las filas vacías del final
+
+def _esquema_arrow(base: str, columnas: List[str]):
+    arrow = {"Int64": pa.int64(), "fecha": pa.timestamp("us"), "cat": pa.dictionary(pa.int32(), pa.string())}
+    tipos = _tipos(base)
+    return pa.schema([(c, arrow[tipos[c]] if c in tipos else pa.string()) for c in columnas])
+
+def _preparar(df: pd.DataFrame, base: str, columnas: List[str]) -> pd.DataFrame:
+    df = df.reindex(columns=columnas)
+    tipos = _tipos(base)
+    for c in columnas:
+        if c not in tipos: df[c] = df[c].astype("string")  # columnas libres: texto, aunque Sheets diera números
+    return df
+
+class _Escritor:
+    """Un archivo abierto por mes; Parquet agrega un row group por bloque, CSV agrega filas."""
+    def __init__(self, carpeta: str, base: str, formato: str):
+        self.carpeta, self.base, self.formato = carpeta, base, formato
+        self.columnas = rs.headers_de(base)
+        self.schema = _esquema_arrow(base, self.columnas) if formato=="parquet" else None
+        self.abiertos: Dict[str, object] = {}; self.filas: Dict[str, int] = {}
+
+    def _ruta(self, mes: str) -> str:
+        d = os.path.join(self.carpeta, f"mes={mes}"); os.makedirs(d, exist_ok=True)
+        return os.path.join(d, f"part-0.{'parquet' if self.formato=='parquet' else 'csv'}")
+
+    def escribir(self, df: pd.DataFrame):
+        meses = df[COLUMNA_MES[self.base]].dt.strftime("%Y-%m").fillna(SIN_FECHA)
+        df = _preparar(df, self.base, self.columnas)
+        for mes, g in df.groupby(meses, sort=False):
+            if self.formato=="parquet":
+                w = self.abiertos.get(mes)
+                if w is None: w = self.abiertos[mes] = pq.ParquetWriter(self._ruta(mes), self.schema)
+                w.write_table(pa.Table.from_pandas(g, schema=self.schema, preserve_index=False))
+            else:
+                ruta = self.abiertos.setdefault(mes, self._ruta(mes))
+                g.to_csv(ruta, mode="a", header=mes not in self.filas, index=False, date_format="%Y-%m-%d %H:%M:%S")
+            self.filas[mes] = self.filas.get(mes, 0)+len(g)
+
+    def cerrar(self):
+        if self.formato=="parquet":
+            for w in self.abiertos.values(): w.close()
+
+def exportar_hoja(sh, base: str, destino: str = "", formato: Optional[str] = None, tam: int = BLOQUE) -> dict:
+    """Exporta la hoja y sus particiones archivadas. Se escribe en una carpeta temporal que
+    reemplaza a la anterior al terminar, así un reporte nunca lee una exportación a medias."""
+    destino = destino or DESTINO
+    formato = formato or ("parquet" if pq is not None else "csv")
+    if formato=="parquet" and pq is None: raise RuntimeError("Parquet requiere pyarrow; use formato='csv'.")
+    final = os.path.join(destino, base); tmp = os.path.join(destino, f".{base}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True); os.makedirs(tmp)
+    t0 = time.perf_counter(); esc = _Escritor(tmp, base, formato)
+    try:
+        hojas = (ra.particiones_desde(sh, base, pd.Timestamp.min.date()) if base in ra.COLUMNA_FECHA else [])+[base]
+        for title in hojas:
+            for df in bloques(sh, title, tam): esc.escribir(df)
+    finally:
+        esc.cerrar()
+    shutil.rmtree(final, ignore_errors=True); os.replace(tmp, final)
+    seg = time.perf_counter()-t0; n = sum(esc.filas.values())
+    return {"hoja": base, "formato": formato, "filas": n, "meses": dict(sorted(esc.filas.items())),
+            "carpeta": final, "seg": round(seg, 3), "filas_por_seg": round(n/seg) if seg else n}
+
+def exportar(sh, destino: str = "", formato: Optional[str] = None, tam: int = BLOQUE) -> List[dict]:
+    return [exportar_hoja(sh, base, destino, formato, tam) for base in COLUMNA_MES]
+
+def leer(hoja: str, destino: str = "", meses: Optional[List[str]] = None) -> pd.DataFrame:
+    """Lee la exportación local (Parquet o CSV), opcionalmente solo algunos meses."""
+    carpeta = os.path.join(destino or DESTINO, hoja)
+    dirs = sorted(d for d in os.listdir(carpeta) if d.startswith("mes=") and (meses is None or d[4:] in meses))
+    partes = []
+    for d in dirs:
+        for f in sorted(os.listdir(os.path.join(carpeta, d))):
+            ruta = os.path.join(carpeta, d, f)
+            df = pd.read_parquet(ruta) if f.endswith(".parquet") else pd.read_csv(ruta, dtype=str)
+            partes.append(df.assign(mes=d[4:]))
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=rs.headers_de(hoja)+["mes"])
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Exporta RLD_respuestas y RLD_tareas a archivos por mes")
+    ap.add_argument("--destino", default=DESTINO)
+    ap.add_argument("--formato", choices=["parquet", "csv"], default=None)
+    ap.add_argument("--bloque", type=int, default=BLOQUE, help="filas por lectura")
+    a = ap.parse_args(argv)
+    import rld_conexion
+    for r in exportar(rld_conexion.abrir(), a.destino, a.formato, a.bloque):
+        print(f"{r['hoja']}: {r['filas']} filas en {len(r['meses'])} mes(es) → {r['carpeta']} "
+              f"({r['formato']}, {r['seg']}s, {r['filas_por_seg']} filas/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+# =========================
+# RLD – 2025 – Spreadsheet en memoria (sustituto local de gspread para pruebas y benchmarks)
+# =========================
+# Implementa el subconjunto de gspread que usan las apps. Cuenta llamadas y bytes, puede inyectar
+# latencia y errores 429, y evalúa las dos fórmulas que escribe rld_sheets (talonario y huella).
+import collections, json, re, threading, time
+from typing import Dict, List, Optional
+
+from gspread.cell import Cell
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import numericise_all, rowcol_to_a1
+
+class _Respuesta:
+    """Lo mínimo de requests.Response que necesita gspread.APIError."""
+    def __init__(self, code: int, msg: str):
+        self.status_code = code; self.text = msg
+        self._json = {"error": {"code": code, "message": msg, "status": "RESOURCE_EXHAUSTED"}}
+    def json(self): return self._json
+
+def _col_num(letras: str) -> int:
+    n = 0
+    for ch in letras: n = n*26+ord(ch)-64
+    return n
+
+def _rango(a1: str, nfilas: int, ncols: int):
+    """'A2:P', 'B5', 'A1:G10' -> (fila1, col1, fila2, col2), 1-based e inclusivo."""
+    a1 = a1.split("!")[-1].replace("$", "")
+    ini, _, fin = a1.partition(":")
+    fin = fin or ini
+    def parte(x, fila_def, col_def):
+        m = re.fullmatch(r"([A-Z]*)(\d*)", x)
+        return (int(m.group(2)) if m.group(2) else fila_def), (_col_num(m.group(1)) if m.group(1) else col_def)
+    f1, c1 = parte(ini, 1, 1)
+    f2, c2 = parte(fin, max(nfilas, 1), max(ncols, 1))
+    return f1, c1, f2, c2
+
+def _peso(x) -> int: return len(json.dumps(x, ensure_ascii=False, default=str))
+
+class FakeWorksheet:
+    def __init__(self, sh: "FakeSpreadsheet", title: str, id_: int, rows: int = 1000, cols: int = 26):
+        self.spreadsheet = sh; self.title = title; self.id = id_
+        self.row_count = rows; self.col_count = cols
+        self._filas: List[List[str]] = []
+        self._formulas: Dict[tuple, str] = {}  # (fila, col) -> fórmula (solo con USER_ENTERED)
+
+    # ---- utilidades internas ----
+    def _llamada(self, metodo: str, enviado=None):
+        self.spreadsheet._llamada(metodo, self.title, enviado)
+
+    def _recibido(self, x):
+        self.spreadsheet._sumar_bytes(x); return x
+
+    def _ncols(self) -> int: return max([len(r) for r in self._filas] + [0])
+
+    def _poner(self, f: int, c: int, v, user_entered: bool):
+        while len(self._filas) < f: self._filas.append([])
+        fila = self._filas[f-1]
+        while len(fila) < c: fila.append("")
+        v = "" if v is None else str(v)
+        if user_entered and v.startswith("="):
+            self._formulas[(f, c)] = v
+        else:
+            self._formulas.pop((f, c), None)
+        fila[c-1] = v
+
+    def _valor(self, f: int, c: int, formulas: bool = False) -> str:
+        if (f, c) in self._formulas:
+            return self._formulas[(f, c)] if formulas else self.spreadsheet._evaluar(self, f, self._formulas[(f, c)])
+        fila = self._filas[f-1] if f <= len(self._filas) else []
+        return fila[c-1] if c <= len(fila) else ""
+
+    def _leer(self, f1, c1, f2, c2, formulas: bool = False) -> List[List[str]]:
+        out = []
+        for f in range(f1, min(f2, len(self._filas))+1):
+            fila = [self._valor(f, c, formulas) for c in range(c1, min(c2, max(len(self._filas[f-1]), 0))+1)]
+            while fila and fila[-1]=="": fila.pop()
+            out.append(fila)
+        while out and not out[-1]: out.pop()
+        return out
+
+    def _escribir_bloque(self, f1, c1, valores, value_input_option):
+        ue = str(getattr(value_input_option, "value", value_input_option) or "RAW").upper()=="USER_ENTERED"
+        for i, fila in enumerate(valores):
+            for j, v in enumerate(fila): self._poner(f1+i, c1+j, v, ue)
+
+    def _desplazar_formulas(self, desde: int, n: int):
+        self._formulas = {((f-n if f > desde else f), c): v for (f, c), v in self._formulas.items()
+                          if not (desde-n < f <= desde)}
+
+    # ---- API de gspread ----
+    def get_all_values(self, **kw):
+        self._llamada("get_all_values")
+        return self._recibido(self._leer(1, 1, len(self._filas), self._ncols()))
+
+    def get_all_records(self, **kw):
+        self._llamada("get_all_records")
+        vals = self._leer(1, 1, len(self._filas), self._ncols())
+        if not vals: return self._recibido([])
+        hdr = vals[0]
+        recs = [dict(zip(hdr, numericise_all((r+[""]*len(hdr))[:len(hdr)]))) for r in vals[1:]]
+        return self._recibido(recs)
+
+    def get(self, range_name=None, **kw):
+        self._llamada("get")
+        return self._recibido(self._leer(*_rango(range_name or "A1:ZZ", len(self._filas), self._ncols())))
+
+    def row_values(self, row: int, **kw):
+        self._llamada("row_values")
+        vals = self._leer(row, 1, row, self._ncols())
+        return self._recibido(vals[0] if vals else [])
+
+    def col_values(self, col: int, **kw):
+        self._llamada("col_values")
+        out = [(self._valor(f, col)) for f in range(1, len(self._filas)+1)]
+        while out and out[-1]=="": out.pop()
+        return self._recibido(out)
+
+    def find(self, query, in_row=None, in_column=None, **kw):
+        self._llamada("find")
+        for f in range(1, len(self._filas)+1):
+            if in_row and f!=in_row: continue
+            for c in range(1, len(self._filas[f-1])+1):
+                if in_column and c!=in_column: continue
+                if self._valor(f, c)==str(query): return Cell(f, c, self._valor(f, c))
+        return None
+
+    def append_row(self, values, value_input_option="RAW", **kw):
+        return self.append_rows([values], value_input_option=value_input_option, **kw)
+
+    def append_rows(self, values, value_input_option="RAW", insert_data_option=None,
+                    table_range=None, include_values_in_response=None, **kw):
+        self._llamada("append_rows", values)
+        # como Sheets: se agrega después de la última fila con datos
+        while self._filas and not any(self._filas[-1]): self._filas.pop()
+        ini = len(self._filas)+1
+        self._escribir_bloque(ini, 1, values, value_input_option)
+        fin = len(self._filas); ancho = max([len(r) for r in values]+[1])
+        upd = {"updatedRange": f"'{self.title}'!A{ini}:{rowcol_to_a1(fin, ancho)}",
+               "updatedRows": len(values)}
+        if include_values_in_response:
+            upd["updatedData"] = {"values": self._leer(ini, 1, fin, ancho)}
+        return self._recibido({"updates": upd})
+
+    def update_cell(self, row: int, col: int, value):
+        self._llamada("update_cell", value)
+        self._poner(row, col, value, True)  # gspread usa USER_ENTERED en update_cell
+
+    def update(self, values=None, range_name=None, value_input_option=None, **kw):
+        if isinstance(values, str) and not isinstance(range_name, str):  # orden viejo (rango, valores)
+            values, range_name = range_name, values
+        self._llamada("update", values)
+        f1, c1, _, _ = _rango(range_name or "A1", len(self._filas), self._ncols())
+        self._escribir_bloque(f1, c1, values, value_input_option)
+        return {"updatedRange": range_name}
+
+    def batch_update(self, data, value_input_option=None, **kw):
+        self._llamada("batch_update", data)
+        for d in data:
+            f1, c1, _, _ = _rango(d["range"], len(self._filas), self._ncols())
+            self._escribir_bloque(f1, c1, d["values"], value_input_option)
+        return {"totalUpdatedCells": sum(len(r) for d in data for r in d["values"])}
+
+    def batch_clear(self, ranges):
+        self._llamada("batch_clear", ranges)
+        for r in ranges:
+            f1, c1, f2, c2 = _rango(r, len(self._filas), self._ncols())
+            for f in range(f1, min(f2, len(self._filas))+1):
+                for c in range(c1, min(c2, len(self._filas[f-1]))+1): self._poner(f, c, "", False)
+
+    def _borrar(self, ini: int, fin: int):
+        del self._filas[ini-1:fin]
+        self._desplazar_formulas(fin, fin-ini+1)
+
+    def delete_rows(self, start_index: int, end_index: Optional[int] = None):
+        self._llamada("delete_rows")
+        self._borrar(start_index, end_index or start_index)
+
+    def clear(self):
+        self._llamada("clear")
+        self._filas = []; self._formulas = {}
+
+    def __repr__(self): return f"<FakeWorksheet {self.title!r} filas={len(self._filas)}>"
+
+class FakeSpreadsheet:
+    def __init__(self, id_: str = "local", latencia: float = 0.0):
+        self.id = id_; self.title = "RLD (local)"
+        self.latencia = latencia
+        self._hojas: Dict[str, FakeWorksheet] = {}
+        self._lock = threading.RLock()
+        self._fallos: List[tuple] = []  # (metodo o None, código) pendientes de lanzar
+        self.reiniciar_contadores()
+
+    # ---- medición ----
+    def reiniciar_contadores(self):
+        self.llamadas = collections.Counter()          # metodo -> n
+        self.llamadas_por_hoja = collections.Counter() # (hoja, metodo) -> n
+        self.bytes = 0
+
+    @property
+    def total_llamadas(self) -> int: return sum(self.llamadas.values())
+
+    def _sumar_bytes(self, x): self.bytes += _peso(x)
+
+    def _recibido(self, x):
+        self._sumar_bytes(x); return x
+
+    def inyectar_errores(self, n: int, code: int = 429, metodo: Optional[str] = None):
+        """Las próximas n llamadas (a `metodo`, o a cualquiera) fallan con APIError(code)."""
+        self._fallos.extend([(metodo, code)]*n)
+
+    def _llamada(self, metodo: str, hoja: Optional[str], enviado=None):
+        with self._lock:
+            self.llamadas[metodo] += 1; self.llamadas_por_hoja[(hoja, metodo)] += 1
+            if enviado is not None: self._sumar_bytes(enviado)
+            for i, (m, code) in enumerate(self._fallos):
+                if m is None or m==metodo:
+                    del self._fallos[i]
+                    raise APIError(_Respuesta(code, f"fallo inyectado en {metodo}"))
+        if self.latencia: time.sleep(self.latencia)
+
+    # ---- fórmulas soportadas ----
+    def _evaluar(self, ws: FakeWorksheet, fila: int, formula: str) -> str:
+        m = re.fullmatch(r'=SUM\(INDIRECT\("([A-Z]+)2:\1"&ROW\(\)\)\)', formula)
+        if m:
+            c = _col_num(m.group(1)); tot = 0.0
+            for f in range(2, fila+1):
+                try: tot += float(ws._valor(f, c) or 0)
+                except ValueError: pass
+            return str(int(tot)) if tot==int(tot) else str(tot)
+        if formula.startswith("=TEXT("):
+            return '|'.join(self._termino(t) for t in formula[1:].split('&"|"&'))
+        return "#ERROR!"
+
+    def _columna(self, ref: str):
+        m = re.fullmatch(r"'([^']+)'!([A-Z]+)2:\2", ref)
+        hoja = self._hojas[m.group(1)]; c = _col_num(m.group(2))
+        return [(f, hoja._valor(f, c)) for f in range(2, len(hoja._filas)+1)]
+
+    def _termino(self, t: str) -> str:
+        m = re.fullmatch(r'TEXT\(COUNTA\(([^)]+)\),"0"\)', t)
+        if m: return str(sum(1 for _, v in self._columna(m.group(1)) if v!=""))
+        m = re.fullmatch(r'TEXT\(SUMPRODUCT\(ROW\(([^)]+)\)\*(.+)\),"0"\)', t)
+        if not m: return "#ERROR!"
+        col = self._columna(m.group(1)); expr = m.group(2)
+        if expr.startswith("(LEN(") and expr.endswith(")>0)"): g = lambda v: 1 if v else 0
+        elif expr.startswith("LEN("): g = len
+        elif expr.startswith("IFERROR(UNICODE("): g = lambda v: ord(v[0]) if v else 0
+        else: return "#ERROR!"
+        return str(sum(f*g(v) for f, v in col))
+
+    # ---- API de gspread ----
+    def worksheets(self, **kw):
+        self._llamada("worksheets", None)
+        return list(self._hojas.values())
+
+    def worksheet(self, title: str):
+        self._llamada("worksheet", title)
+        if title not in self._hojas: raise WorksheetNotFound(title)
+        return self._hojas[title]
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26, index=None):
+        self._llamada("add_worksheet", title)
+        ws = self._hojas[title] = FakeWorksheet(self, title, len(self._hojas)+1, rows, cols)
+        return ws
+
+    def del_worksheet(self, ws):
+        self._llamada("del_worksheet", ws.title)
+        self._hojas.pop(ws.title, None)
+
+    def _borrados(self, body) -> List[tuple]:
+        """[(hoja, fila_ini, fila_fin)] 1-based de los deleteDimension (ROWS) de un batch_update; son
+        los únicos pedidos soportados y se aplican en el orden dado, como en la API."""
+        por_id = {w.id: w for w in self._hojas.values()}
+        out = []
+        for r in body.get("requests", []):
+            d = r.get("deleteDimension", {}).get("range", {})
+            if d.get("dimension")!="ROWS" or d.get("sheetId") not in por_id:
+                raise APIError(_Respuesta(400, f"pedido no soportado: {r}"))
+            out.append((por_id[d["sheetId"]], d["startIndex"]+1, d["endIndex"]))
+        return out
+
+    def batch_update(self, body, **kw):
+        self._llamada("batch_update", None, body)
+        for ws, ini, fin in self._borrados(body): ws._borrar(ini, fin)
+        return {"replies": [{} for _ in body.get("requests", [])]}
+
+    def values_batch_get(self, ranges, params=None, **kw):
+        self._llamada("values_batch_get", None)
+        formulas = (params or {}).get("valueRenderOption")=="FORMULA"
+        out = []
+        for r in ranges:
+            hoja = self._hojas[r.split("!")[0].strip("'")]
+            out.append({"range": r, "values": hoja._leer(*_rango(r, len(hoja._filas), hoja._ncols()), formulas=formulas)})
+        return self._recibido({"valueRanges": out})
+
+    def __repr__(self): return f"<FakeSpreadsheet {self.id!r} hojas={list(self._hojas)}>"
+
+# Instancia por proceso para RLD_BACKEND=local (apps, benchmarks y CLI comparten la misma).
+_local: Optional[FakeSpreadsheet] = None
+
+def spreadsheet_local() -> FakeSpreadsheet:
+    global _local
+    if _local is None: _local = FakeSpreadsheet()
+    return _local
+
+def cargar_filas(sh: FakeSpreadsheet, title: str, header: List[str], filas: List[list]):
+    """Carga datos sin contar llamadas (para preparar escenarios)."""
+    ws = sh._hojas.get(title) or FakeWorksheet(sh, title, len(sh._hojas)+1)
+    sh._hojas[title] = ws
+    ws._filas = [list(map(str, header))] + [[("" if v is None else str(v)) for v in f] for f in filas]
+    ws._formulas = {}
+    return ws
+
+def vaciar(sh: FakeSpreadsheet):
+    """Borra todas las hojas y contadores (la instancia sigue siendo la misma)."""
+    with sh._lock:
+        sh._hojas.clear(); sh._fallos.clear(); sh.reiniciar_contadores()
@@ -0,0 +1,105 @@
+# =========================
+# RLD – 2025 – Migraciones numeradas (se aplican una vez por versión de esquema)
+# =========================
+import threading
+from typing import Callable, Dict, List, Tuple
+
+import pandas as pd
+
+import rld_sheets as rs
+from rld_sheets import SHEET_USUARIOS, SHEET_TAREAS
+
+USUARIOS_INICIALES = [
+    ("001", "Jeremy",  "jeremy",  "user"),
+    ("002", "Jannia",  "jannia",  "user"),
+    ("003", "Manfred", "manfred", "user"),
+    ("004", "Luis",    "luis",    "user"),
+    ("005", "Adrian",  "adrian",  "user"),
+    ("006", "Esteban", "esteban", "user"),
+    ("007", "Pamela",  "pamela",  "user"),
+    ("009", "Viviana Peraza", "vperaza", "admin"),
+    ("010", "Charly",  "charly",  "user"),
+]
+PASSWORDS_FIJAS = {
+    "jeremy":"jeremy2025","jannia":"jannia2025","manfred":"manfred2025","luis":"luis2025",
+    "adrian":"adrian2025","esteban":"esteban2025","pamela":"pamela2025",
+    "charly":"charly2025","vperaza":"viviana2025"
+}
+
+CLAVE_VERSION = "schema_version"
+
+# (número, nombre, función(sh) -> cantidad de filas cambiadas), en orden
+MIGRACIONES: List[Tuple[int, str, Callable]] = []
+
+def migracion(num: int, nombre: str):
+    def reg(fn):
+        MIGRACIONES.append((num, nombre, fn)); MIGRACIONES.sort(key=lambda m: m[0])
+        return fn
+    return reg
+
+@migracion(1, "seed_usuarios")
+def seed_usuarios_si_vacio(sh) -> int:
+    ws = rs.get_ws(sh, SHEET_USUARIOS)
+    if len(ws.col_values(1)) > 1: return 0
+    ws.append_rows([[id_, nombre, usuario, rol, rs.hash_password(PASSWORDS_FIJAS[usuario]), True, rs.iso_now(), ""]
+                    for (id_, nombre, usuario, rol) in USUARIOS_INICIALES])
+    rs.registrar_cambio(sh, SHEET_USUARIOS)
+    rs.log_evento(sh, "seed_usuarios", "sistema", "OK", rs.iso_now())
+    return len(USUARIOS_INICIALES)
+
+@migracion(2, "passwords_fijas")
+def migrate_passwords_a_fijas(sh) -> int:
+    ws = rs.get_ws(sh, SHEET_USUARIOS); recs = ws.get_all_records()
+    data = []
+    for i, r in enumerate(recs, start=2):
+        u = str(r.get("usuario","")).strip().lower()
+        if u in PASSWORDS_FIJAS:
+            h = rs.hash_password(PASSWORDS_FIJAS[u])
+            if str(r.get("password_hash",""))!=h: data.append({"range": f"E{i}", "values": [[h]]})
+    if data:
+        ws.batch_update(data); rs.registrar_cambio(sh, SHEET_USUARIOS)
+        rs.log_evento(sh, "migracion_passwords", "sistema", f"{len(data)}", rs.iso_now())
+    return len(data)
+
+@migracion(3, "tarea_ids")
+def migrate_tarea_ids(sh) -> int:
+    """Asigna tarea_id a filas sin ID numérico, desde el talonario de RLD_ids."""
+    ws = rs.get_ws(sh, SHEET_TAREAS)
+    vals = ws.get_all_values()
+    faltan = [i for i, r in enumerate(vals[1:], start=2)
+              if any(str(x).strip() for x in r) and pd.isna(pd.to_numeric(r[0] if r else "", errors="coerce"))]
+    if not faltan: return 0
+    base = rs.reservar_ids(sh, len(faltan))
+    ws.batch_update([{"range": f"A{i}", "values": [[base+k]]} for k, i in enumerate(faltan)])
+    rs.descartar_indice_tareas(); rs.registrar_cambio(sh, SHEET_TAREAS)
+    return len(faltan)
+
+# spreadsheet_id -> versión ya confirmada en este proceso
+_version_ok: Dict[str, int] = {}
+_mig_lock = threading.Lock()
+
+def version_objetivo() -> int: return MIGRACIONES[-1][0] if MIGRACIONES else 0
+
+def _version_hoja(sh) -> int:
+    try: return int(rs.meta_leer(sh).get(CLAVE_VERSION) or 0)
+    except ValueError: return 0
+
+def pendientes(sh) -> List[Tuple[int, str]]:
+    """Migraciones que faltan en la hoja, sin aplicarlas."""
+    actual = _version_hoja(sh)
+    return [(num, nombre) for num, nombre, _ in MIGRACIONES if num > actual]
+
+def aplicar_pendientes(sh) -> List[Tuple[int, str, int]]:
+    """Corre las migraciones que falten. Tras la primera vez en el proceso no hace llamadas."""
+    if _version_ok.get(sh.id, -1) >= version_objetivo(): return []
+    with _mig_lock:
+        if _version_ok.get(sh.id, -1) >= version_objetivo(): return []
+        actual = _version_hoja(sh)
+        hechas = []
+        for num, nombre, fn in MIGRACIONES:
+            if num <= actual: continue
+            hechas.append((num, nombre, fn(sh)))
+            # se registra cada paso: si una migración falla, las anteriores no se repiten
+            rs.meta_escribir(sh, {CLAVE_VERSION: num})
+        _version_ok[sh.id] = max(actual, version_objetivo())
+        return hechas
@@ -0,0 +1,107 @@
+# =========================
+# RLD – 2025 – Resumen por usuario (RLD_por_usuario)
+# =========================
+import json, threading
+from typing import Dict
+
+import pandas as pd
+
+import rld_sheets as rs
+import rld_traza as rt
+from rld_sheets import SHEET_RESUMEN, SHEET_RESPUESTAS, SHEET_PARTICIONES, HEADERS
+
+CONTADORES = ["total","pendientes","validadas","rechazadas"]
+
+# spreadsheet_id -> {"filas": (uid, ev, ts) de las filas ya procesadas, "agg": agregados por uid,
+#                    "n_escritas": filas de datos que quedaron en RLD_por_usuario}
+_inc: Dict[str, dict] = {}
+_inc_lock = threading.Lock()
+
+def _filas(dfr: pd.DataFrame) -> pd.DataFrame:
+    # columnas ya tipadas por el esquema (Int64, categórica, datetime64): no se reconvierten
+    return pd.DataFrame({
+        "uid": dfr["usuario_id"], "ev": dfr["estado_validacion"], "ts": dfr["creado_en"],
+    }).reset_index(drop=True)
+
+def _iguales(a: pd.Series, b: pd.Series) -> pd.Series:
+    """a == b elemento a elemento, contando NA == NA."""
+    if a.dtype != b.dtype: a, b = a.astype(object), b.astype(object)
+    return (a.eq(b) | (a.isna() & b.isna())).fillna(False).astype(bool)
+
+def _agregar(filas: pd.DataFrame) -> pd.DataFrame:
+    ev = filas["ev"]
+    return filas.assign(
+        total=1, pendientes=ev.eq("Pendiente").astype(int),
+        validadas=ev.eq("Validada").astype(int), rechazadas=ev.eq("Rechazada").astype(int),
+    ).groupby("uid").agg(
+        total=("total","sum"), pendientes=("pendientes","sum"), validadas=("validadas","sum"),
+        rechazadas=("rechazadas","sum"), ultima_actividad=("ts","max"),
+    )
+
+def _plegar(estado: dict, filas: pd.DataFrame) -> pd.DataFrame:
+    """Recalcula solo los usuarios con filas nuevas o editadas desde la marca de agua."""
+    viejas = estado["filas"]; n = len(viejas)
+    actuales = filas.iloc[:n]
+    cambiadas = ~(_iguales(actuales["uid"], viejas["uid"]) & _iguales(actuales["ev"], viejas["ev"])
+                  & _iguales(actuales["ts"], viejas["ts"]))
+    nuevas = filas.iloc[n:]
+    if not cambiadas.any() and nuevas.empty: return estado["agg"]
+    afectados = {u for u in (set(viejas.loc[cambiadas,"uid"]) | set(actuales.loc[cambiadas,"uid"]) | set(nuevas["uid"]))
+                 if not pd.isna(u)}
+    return pd.concat([estado["agg"].drop(index=list(afectados), errors="ignore"),
+                      _agregar(filas[filas["uid"].isin(afectados)])])
+
+def agregados_json(dfr: pd.DataFrame, **extra) -> str:
+    """Conteos por usuario de un mes archivado: {uid: [total, pendientes, validadas, rechazadas, ultima]}.
+    `extra` agrega claves con "_" adelante (p.ej. _vistas de rld_analitica), que _archivado ignora."""
+    agg = _agregar(_filas(dfr))
+    return json.dumps({**{str(uid): [int(r.total), int(r.pendientes), int(r.validadas), int(r.rechazadas),
+                                "" if pd.isna(r.ultima_actividad) else str(r.ultima_actividad)]
+                          for uid, r in agg.iterrows()}, **extra}, ensure_ascii=False, separators=(",", ":"))
+
+def _archivado(sh) -> pd.DataFrame:
+    """Suma de los agregados que el manifiesto guarda por mes archivado (sin abrir las particiones)."""
+    man = rs.snapshot(sh, SHEET_PARTICIONES)
+    filas = [[int(uid)]+v for s in man.loc[man["base"]==SHEET_RESPUESTAS, "agregados"] if s
+             for uid, v in json.loads(s).items() if not uid.startswith("_")]
+    df = pd.DataFrame(filas, columns=["uid"]+CONTADORES+["ultima_actividad"]).astype({"uid": "Int64"})
+    df["ultima_actividad"] = pd.to_datetime(df["ultima_actividad"], errors="coerce")
+    return df.groupby("uid").agg({**{c: "sum" for c in CONTADORES}, "ultima_actividad": "max"})
+
+@rt.medido("df")
+def calcular_resumen(sh, incremental: bool = True) -> pd.DataFrame:
+    """Una fila por usuario (en el orden de la hoja Usuarios), con las columnas de RLD_por_usuario."""
+    dfu = rs.df_usuarios(sh); filas = _filas(rs.df_respuestas(sh))
+    with _inc_lock:
+        estado = _inc.get(sh.id)
+        # si desaparecieron filas (borrado manual) la marca de agua ya no sirve
+        if not incremental or estado is None or len(filas) < len(estado["filas"]):
+            agg = _agregar(filas)
+        else:
+            agg = _plegar(estado, filas)
+        _inc[sh.id] = {"filas": filas, "agg": agg, "n_escritas": (estado or {}).get("n_escritas")}
+    arch = _archivado(sh)
+    if not arch.empty:
+        agg = pd.concat([agg, arch]).groupby(level=0).agg({**{c: "sum" for c in CONTADORES}, "ultima_actividad": "max"})
+    res = pd.DataFrame({"uid": dfu["id"], "usuario_id": dfu["id"].astype(str), "usuario_nombre": dfu["nombre"].astype(str)})
+    res = res.join(agg, on="uid")
+    res[CONTADORES] = res[CONTADORES].fillna(0).astype(int)
+    res["ultima_actividad"] = res["ultima_actividad"].map(lambda m: "" if pd.isna(m) else str(m))
+    return res[HEADERS[SHEET_RESUMEN]]
+
+@rt.medido("escritura", SHEET_RESUMEN)
+def actualizar_resumen(sh, incremental: bool = True) -> int:
+    """Reescribe RLD_por_usuario con un único update de rango. Devuelve las filas escritas."""
+    res = calcular_resumen(sh, incremental)
+    ws = rs.get_ws(sh, SHEET_RESUMEN)
+    valores = [HEADERS[SHEET_RESUMEN]] + res.values.tolist()
+    previas = _inc[sh.id].get("n_escritas")
+    if previas is None:
+        ws.clear()  # primera vez en el proceso: no se sabe cuántas filas viejas quedan
+    else:
+        # se rellena con vacíos lo que sobre de la escritura anterior
+        valores += [[""]*len(HEADERS[SHEET_RESUMEN])]*max(0, previas-len(res))
+    ws.update(range_name=f"A1:G{len(valores)}", values=valores)
+    _inc[sh.id]["n_escritas"] = len(res)
+    rs.registrar_cambio(sh, SHEET_RESUMEN)
+    return len(res)
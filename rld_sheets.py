@@ -0,0 +1,1030 @@
+# =========================
+# RLD – 2025 – Acceso compartido a Google Sheets (admin y usuarios)
+# =========================
+import atexit, bisect, hashlib, json, os, threading, time, uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol, numericise_all, rowcol_to_a1
+
+import rld_traza as rt
+
+SHEET_USUARIOS   = "Usuarios"
+SHEET_TAREAS     = "RLD_tareas"
+SHEET_RESPUESTAS = "RLD_respuestas"
+SHEET_RESUMEN    = "RLD_por_usuario"
+SHEET_LOGS       = "Logs"
+SHEET_IDS        = "RLD_ids"
+SHEET_META       = "RLD_meta"
+SHEET_PARTICIONES = "RLD_particiones"
+SHEET_ANALITICA  = "RLD_analitica"
+
+HEADERS: Dict[str, List[str]] = {
+    SHEET_USUARIOS:   ["id","nombre","usuario","rol","password_hash","activo","creado_en","ultimo_acceso"],
+    SHEET_TAREAS:     ["tarea_id","titulo","descripcion","prioridad","estado","asignado_id",
+                       "asignado_nombre","fecha_asignacion","fecha_limite","creado_por",
+                       "observ_admin","ultima_actualizacion"],
+    SHEET_RESPUESTAS: ["uuid","tarea_id","usuario_id","usuario_nombre","fecha","hora","trabajo_realizado",
+                       "localidad_delegacion","funcionario_responsable","observaciones","estado_validacion",
+                       "observacion_admin","creado_en","editado_en","creado_por","editado_por"],
+    SHEET_RESUMEN:    ["usuario_id","usuario_nombre","total","pendientes","validadas","rechazadas","ultima_actividad"],
+    SHEET_LOGS:       ["evento","quien","detalle","timestamp"],
+    SHEET_IDS:        ["reserva","cantidad","hasta","creado_en"],
+    SHEET_META:       ["clave","valor","actualizado_en"],
+    SHEET_PARTICIONES: ["hoja","base","mes","filas","lote","agregados","archivado_en"],
+    SHEET_ANALITICA:  ["vista","clave","valores","actualizado_en"],
+}
+
+# Subir cuando cambie HEADERS: fuerza a revisar de nuevo las hojas en cada proceso.
+SCHEMA_VERSION = 2
+
+def headers_de(title: str) -> List[str]:
+    """Encabezados de una hoja; las particiones mensuales (RLD_respuestas_2025_09) usan los de su base."""
+    return HEADERS[title] if title in HEADERS else HEADERS[title.rsplit("_", 2)[0]]
+
+def iso_now(): return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def hash_password(p): return hashlib.sha256(p.encode("utf-8")).hexdigest()
+
+# (spreadsheet_id, titulo, version) -> Worksheet ya verificada
+_ws_registry: Dict[tuple, object] = {}
+_ws_lock = threading.Lock()
+
+def _verificar_ws(sh, existentes: Dict[str, object], title: str, header: List[str], hdr: Optional[list] = None):
+    """Crea la hoja si falta y revisa su encabezado (`hdr` si ya se leyó, p.ej. en precargar)."""
+    ws = existentes.get(title)
+    if ws is None:
+        try: ws = sh.worksheet(title)
+        except WorksheetNotFound:
+            ws = sh.add_worksheet(title=title, rows=2000, cols=max(len(header), 12))
+            existentes[title] = ws
+        hdr = None
+    if hdr is None: hdr = ws.row_values(1)
+    if not hdr:
+        ws.append_row(header)
+    elif hdr[0].strip().lower()=="task_id" and header[0]=="tarea_id":
+        ws.update_cell(1,1,"tarea_id")
+    if title==SHEET_IDS: _sembrar_ids(sh, existentes, ws)
+    return ws
+
+@rt.medido("ws")
+def get_ws(sh, title: str):
+    """Worksheet verificada una sola vez por proceso; luego no cuesta llamadas a la API."""
+    key = (sh.id, title, SCHEMA_VERSION)
+    ws = _ws_registry.get(key)
+    if ws is not None: return ws
+    with _ws_lock:
+        ws = _ws_registry.get(key)
+        if ws is None:
+            # Un solo fetch de metadatos trae los handles de todas las hojas existentes.
+            existentes = {w.title: w for w in sh.worksheets()}
+            ws = _verificar_ws(sh, existentes, title, headers_de(title))
+            _ws_registry[key] = ws
+    return ws
+
+def invalidar_ws(title: str = None):
+    """Olvida handles (p.ej. si alguien borró/renombró la hoja a mano)."""
+    with _ws_lock:
+        for k in [k for k in _ws_registry if title is None or k[1]==title]:
+            _ws_registry.pop(k, None)
+
+# -------------------------
+# Snapshots de DataFrames (compartidos por todas las sesiones del proceso)
+# -------------------------
+CACHE_TTL = 60  # segundos; para hojas sin versión en RLD_meta (ver _al_dia). Las escrituras propias invalidan antes
+
+# (spreadsheet_id, titulo) -> (instante, DataFrame)
+_snapshots: Dict[tuple, tuple] = {}
+# (spreadsheet_id, titulo) -> versión de la hoja (RLD_meta) cuando se cargó el snapshot
+_snap_version: Dict[tuple, Optional[str]] = {}
+_snap_lock = threading.Lock()
+
+def _as_bool(x): return str(x).strip().lower() in ("true","1","yes","si","sí")
+
+# -------------------------
+# Esquema: cada hoja se convierte una sola vez, al cargarla, a columnas tipadas
+# -------------------------
+# "Int64" = entero nullable, "cat" = categórica, "fecha" = datetime64. Las vistas filtran y
+# comparan sobre estos tipos en vez de volver a hacer astype(str)/to_datetime en cada rerun.
+ESQUEMA: Dict[str, Dict[str, str]] = {
+    SHEET_USUARIOS:   {"id":"Int64", "rol":"cat", "creado_en":"fecha", "ultimo_acceso":"fecha"},
+    SHEET_TAREAS:     {"prioridad":"cat", "estado":"cat", "asignado_id":"Int64", "fecha_asignacion":"fecha",
+                       "fecha_limite":"fecha", "ultima_actualizacion":"fecha"},
+    SHEET_RESPUESTAS: {"tarea_id":"Int64", "usuario_id":"Int64", "fecha":"fecha", "trabajo_realizado":"cat",
+                       "estado_validacion":"cat", "creado_en":"fecha", "editado_en":"fecha"},
+}
+# Categorías conocidas (en este orden); valores nuevos se agregan al final en vez de perderse.
+CATEGORIAS: Dict[str, List[str]] = {
+    "estado": ["Nueva","En Progreso","Completada","Rechazada"],
+    "prioridad": ["Alta","Media","Baja"],
+    "estado_validacion": ["Pendiente","Validada","Rechazada"],
+    "rol_norm": ["admin","user"],
+}
+
+def _enteros(s: pd.Series) -> pd.Series:
+    n = pd.to_numeric(s, errors="coerce")
+    return n.where(n==n.round()).astype("Int64")
+
+def _categorica(s: pd.Series, col: str) -> pd.Series:
+    v = s.astype("string").str.strip()
+    v = v.where(v!="")
+    cats = CATEGORIAS.get(col, [])
+    extra = sorted(set(v.dropna().unique())-set(cats))
+    return v.astype(pd.CategoricalDtype(cats+extra))
+
+def _fechas(s: pd.Series) -> pd.Series:
+    t = pd.to_datetime(s, errors="coerce", format="ISO8601")
+    resto = t.isna() & s.notna() & s.astype(str).str.strip().ne("")
+    if resto.any():  # formatos de la configuración regional de la hoja (p.ej. 1/9/2025)
+        t[resto] = pd.to_datetime(s[resto].astype(str), errors="coerce", format="mixed", dayfirst=True)
+    return t
+
+def _tipar(df: pd.DataFrame, title: str) -> pd.DataFrame:
+    conv = {"Int64": _enteros, "fecha": _fechas}
+    for c, tipo in ESQUEMA[title].items():
+        if c in df.columns: df[c] = _categorica(df[c], c) if tipo=="cat" else conv[tipo](df[c])
+    return df
+
+def concatenar(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """pd.concat que conserva las categóricas: si las categorías difieren entre partes, las une."""
+    for c in [c for c in dfs[0].columns if isinstance(dfs[0][c].dtype, pd.CategoricalDtype)]:
+        tipos = [d[c].dtype for d in dfs if c in d.columns]
+        if all(t==tipos[0] for t in tipos): continue
+        cats = list(dict.fromkeys(x for t in tipos if isinstance(t, pd.CategoricalDtype) for x in t.categories))
+        dfs = [d.assign(**{c: d[c].astype(pd.CategoricalDtype(cats))}) if c in d.columns else d for d in dfs]
+    return pd.concat(dfs, ignore_index=True)
+
+def _parse_usuarios(recs):
+    df = pd.DataFrame(recs) if recs else pd.DataFrame(columns=HEADERS[SHEET_USUARIOS])
+    df["rol_norm"] = _categorica(df["rol"].astype("string").str.lower(), "rol_norm")
+    df["activo_norm"] = df["activo"].map(_as_bool).astype(bool)
+    return _tipar(df, SHEET_USUARIOS)
+
+def _parse_tareas(recs):
+    df = pd.DataFrame(recs)
+    if "task_id" in df.columns and "tarea_id" not in df.columns:
+        df = df.rename(columns={"task_id":"tarea_id"})
+    for c in HEADERS[SHEET_TAREAS]:
+        if c not in df.columns: df[c] = ""
+    df["tarea_id_num"] = _enteros(df["tarea_id"])
+    # índice de búsqueda por título: se calcula una vez por carga, no en cada tecla
+    df["titulo_lc"] = df["titulo"].astype(str).str.lower()
+    return _tipar(df, SHEET_TAREAS)
+
+def _parse_respuestas(recs):
+    df = pd.DataFrame(recs)
+    if "task_id" in df.columns and "tarea_id" not in df.columns:
+        df = df.rename(columns={"task_id":"tarea_id"})
+    for c in HEADERS[SHEET_RESPUESTAS]:
+        if c not in df.columns: df[c] = ""
+    return _tipar(df, SHEET_RESPUESTAS)
+
+def _parse_resumen(recs): return pd.DataFrame(recs)
+
+def _parse_logs(recs):
+    return pd.DataFrame(recs) if recs else pd.DataFrame(columns=HEADERS[SHEET_LOGS])
+
+def _parse_particiones(recs):
+    df = pd.DataFrame(recs) if recs else pd.DataFrame(columns=HEADERS[SHEET_PARTICIONES])
+    df["mes"] = df["mes"].astype(str)
+    return df
+
+def _parse_analitica(recs):
+    # clave y valores son JSON: se dejan como texto (get_all_records no debe convertirlos)
+    df = pd.DataFrame(recs) if recs else pd.DataFrame(columns=HEADERS[SHEET_ANALITICA])
+    return df.astype({c: str for c in HEADERS[SHEET_ANALITICA]})
+
+_PARSERS = {
+    SHEET_USUARIOS: _parse_usuarios, SHEET_TAREAS: _parse_tareas,
+    SHEET_RESPUESTAS: _parse_respuestas, SHEET_RESUMEN: _parse_resumen, SHEET_LOGS: _parse_logs,
+    SHEET_PARTICIONES: _parse_particiones, SHEET_ANALITICA: _parse_analitica,
+}
+
+def a_dataframe(title: str, header: List[str], filas: List[list]) -> pd.DataFrame:
+    """Filas crudas (como las da get_all_values, sin el encabezado) de `title` o de una de sus
+    particiones, al DataFrame tipado que devuelve snapshot()."""
+    base = title if title in _PARSERS else title.rsplit("_", 2)[0]
+    return _PARSERS[base](_registros([str(h) for h in header], filas))
+
+def _vigente(sh, title: str, hit) -> bool:
+    return hit is not None and _al_dia(sh, title, hit[0], _snap_version.get((sh.id, title)))
+
+def _guardar(key: tuple, df: pd.DataFrame, version: Optional[str]) -> tuple:
+    df.attrs["cargado"] = time.monotonic()  # identifica esta carga (viaja con las copias)
+    hit = _snapshots[key] = (df.attrs["cargado"], df)
+    _snap_version[key] = version
+    return hit
+
+def _cargar(sh, title: str) -> tuple:
+    """(instante de la carga, DataFrame compartido). No modificar el DataFrame."""
+    key = (sh.id, title)
+    hit = _snapshots.get(key)
+    if not _vigente(sh, title, hit):
+        with _snap_lock:
+            hit = _snapshots.get(key)
+            if not _vigente(sh, title, hit):
+                version = _version_conocida(sh, title)  # leída antes que los datos
+                if title in _HUELLA: df = leer_incremental(sh, title)
+                else: df = _PARSERS[title](get_ws(sh, title).get_all_records())
+                hit = _guardar(key, df, version)
+    return hit
+
+@rt.medido("df")
+def snapshot(sh, title: str) -> pd.DataFrame:
+    """DataFrame de la hoja; se relee solo si cambió su versión en RLD_meta. Devuelve una copia."""
+    return _cargar(sh, title)[1].copy()
+
+def invalidar(*titles: str):
+    """Descarta snapshots tras una escritura; sin argumentos, todos."""
+    with _snap_lock:
+        for k in [k for k in _snapshots if not titles or k[1] in titles]:
+            _snapshots.pop(k, None)
+
+@rt.medido("df")
+def precargar(sh, *titles: str) -> int:
+    """Trae en un solo values_batch_get las hojas que una vista declara y cuyo snapshot venció, y las
+    deja donde las buscan df_usuarios/df_tareas/df_respuestas. Las incrementales (RLD_respuestas,
+    Logs) piden solo su cola y la huella, como leer_incremental. Devuelve cuántas hojas cargó."""
+    titles = list(dict.fromkeys(titles))
+    if any(t in VERSIONADAS for t in titles) and _versiones_viejas(sh):
+        # las versiones viajan en el mismo lote que las hojas que no están en memoria; las que sí
+        # están se comparan después y solo las que cambiaron cuestan un segundo lote
+        frias = [t for t in titles if (sh.id, t) not in _snapshots
+                 or (t not in VERSIONADAS and not _vigente(sh, t, _snapshots[(sh.id, t)]))]
+        _lote(sh, frias, con_versiones=True)
+        resto = [t for t in titles if t not in frias and not _vigente(sh, t, _snapshots.get((sh.id, t)))]
+        _lote(sh, resto)
+        return len(frias)+len(resto)
+    pend = [t for t in titles if not _vigente(sh, t, _snapshots.get((sh.id, t)))]
+    _lote(sh, pend)
+    return len(pend)
+
+def _lote(sh, pend: List[str], con_versiones: bool = False):
+    if not pend and not con_versiones: return
+    rango_meta = f"'{SHEET_META}'!A1:B"
+    hojas = pend+([SHEET_META] if con_versiones or any(t in _HUELLA for t in pend) else [])
+    with _ws_lock:
+        sin_verificar = [t for t in hojas if (sh.id, t, SCHEMA_VERSION) not in _ws_registry]
+        existentes = {w.title: w for w in sh.worksheets()} if sin_verificar else {}
+        for t in [t for t in sin_verificar if t not in existentes]:  # las que faltan se crean ya
+            _ws_registry[(sh.id, t, SCHEMA_VERSION)] = _verificar_ws(sh, existentes, t, headers_de(t))
+    with _snap_lock, _delta_lock:
+        rangos, planes = ([rango_meta] if con_versiones else []), {}
+        for t in pend:
+            completa, rs_t = _delta_pedir(sh, t) if t in _HUELLA else (True, [_rango(t, 1)])
+            idx = []
+            for r in rs_t:
+                if r not in rangos: rangos.append(r)
+                idx.append(rangos.index(r))
+            planes[t] = (completa, idx)
+        resp = sh.values_batch_get(rangos)
+        vals = [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+        if rango_meta in rangos: _anotar_meta(sh, vals[rangos.index(rango_meta)])
+        version = {t: _version_conocida(sh, t) for t in pend}
+        # el encabezado de las hojas aún no verificadas viene en el mismo lote (sin row_values)
+        primeras = {t: vals[idx[-1]] for t, (completa, idx) in planes.items() if completa}
+        if rango_meta in rangos: primeras[SHEET_META] = vals[rangos.index(rango_meta)]
+        with _ws_lock:
+            for t in sin_verificar:
+                key = (sh.id, t, SCHEMA_VERSION)
+                if key in _ws_registry: continue
+                hdr = [str(h) for h in primeras[t][0]] if primeras.get(t) else ([] if t in primeras else None)
+                _ws_registry[key] = _verificar_ws(sh, existentes, t, headers_de(t), hdr)
+        for t, (completa, idx) in planes.items():
+            if t in _HUELLA: df = _delta_aplicar(sh, t, completa, vals[idx[0]], vals[idx[1]])
+            else:
+                v = vals[idx[0]]
+                df = _PARSERS[t](_registros([str(h) for h in v[0]], v[1:], huecos=True) if v else [])
+            _guardar((sh.id, t), df, version[t])
+
+def df_usuarios(sh):   return snapshot(sh, SHEET_USUARIOS)
+def df_tareas(sh):     return snapshot(sh, SHEET_TAREAS)
+def df_respuestas(sh): return snapshot(sh, SHEET_RESPUESTAS)
+def df_resumen(sh):    return snapshot(sh, SHEET_RESUMEN)
+
+def respuestas_de(sh, usuario_id) -> pd.DataFrame:
+    """Respuestas de un usuario en la hoja caliente (con SQLite, por índice; si no, del snapshot)."""
+    df = _por_indice(sh, SHEET_RESPUESTAS, usuario_id=usuario_id)
+    if df is not None: return df
+    df = df_respuestas(sh)
+    return df[df["usuario_id"].eq(int(usuario_id)).fillna(False)]
+
+# -------------------------
+# Índice de usuarios para el login
+# -------------------------
+# spreadsheet_id -> (instante de la carga de Usuarios, {usuario en minúsculas: datos de la fila});
+# se rearma solo cuando cambia esa carga, así que un login con el snapshot vigente no llama a la API.
+_idx_usuarios: Dict[str, tuple] = {}
+
+@rt.medido("df", SHEET_USUARIOS)
+def buscar_usuario(sh, usuario: str) -> Optional[dict]:
+    """{"fila", "id", "nombre", "usuario", "hash", "rol", "activo"} o None si no existe."""
+    cargado, dfu = _cargar(sh, SHEET_USUARIOS)
+    idx = _idx_usuarios.get(sh.id)
+    if idx is None or idx[0] != cargado:
+        por = {}
+        if not dfu.empty:
+            cols = zip(dfu["id"], dfu["nombre"], dfu["usuario"], dfu["password_hash"], dfu["rol_norm"], dfu["activo_norm"])
+            for fila, (i, n, u, h, r, a) in enumerate(cols, start=2):
+                por.setdefault(str(u).strip().lower(), {"fila": fila, "id": str(i), "nombre": n, "usuario": str(u),
+                                                        "hash": str(h), "rol": r, "activo": bool(a)})
+        idx = _idx_usuarios[sh.id] = (cargado, por)
+    return idx[1].get(str(usuario).strip().lower())
+
+# -------------------------
+# Bitácora (Logs) con escritura diferida
+# -------------------------
+LOG_FLUSH_N   = 25   # eventos en cola que disparan un envío
+LOG_FLUSH_SEG = 20   # antigüedad máxima (seg) de un evento en cola
+# Diario local opcional (JSONL): si el proceso muere, los eventos se reenvían al arrancar.
+LOG_JOURNAL   = os.environ.get("RLD_LOG_JOURNAL", "")
+
+_log_buf: List[list] = []
+_log_lock = threading.Lock()
+_log_estado = {"sh": None, "primero": None, "hilo": None, "recuperado": False}
+
+def _journal_recuperar():
+    if _log_estado["recuperado"]: return
+    _log_estado["recuperado"] = True
+    if LOG_JOURNAL and os.path.exists(LOG_JOURNAL):
+        with open(LOG_JOURNAL, encoding="utf-8") as f:
+            _log_buf[:0] = [json.loads(l) for l in f if l.strip()]
+        if _log_buf and _log_estado["primero"] is None: _log_estado["primero"] = time.monotonic()
+
+def _journal_reescribir():
+    if not LOG_JOURNAL: return
+    with open(LOG_JOURNAL, "w", encoding="utf-8") as f:
+        for row in _log_buf: f.write(json.dumps(row, ensure_ascii=False)+"\n")
+
+_despertar = threading.Event()  # adelanta el ciclo del hilo (p.ej. al guardar una labor)
+
+def _log_timer():
+    while True:
+        _despertar.wait(LOG_FLUSH_SEG/2); _despertar.clear()
+        # (estado, flush, antigüedad mínima): las labores se envían apenas se pueda
+        for estado, flush, espera in ((_log_estado, flush_logs, LOG_FLUSH_SEG), (_acc_estado, flush_accesos, LOG_FLUSH_SEG),
+                                      (_resp_estado, flush_respuestas, 0)):
+            primero = estado["primero"]
+            if primero is not None and time.monotonic()-primero >= espera:
+                try: flush()
+                except Exception: pass  # se reintenta en el siguiente ciclo
+
+def _arrancar_hilo():
+    if _log_estado["hilo"] is None:
+        _log_estado["hilo"] = threading.Thread(target=_log_timer, name="rld-logs", daemon=True)
+        _log_estado["hilo"].start()
+
+def log_evento(sh, evento, quien, detalle, timestamp):
+    """Encola un evento con su timestamp original; se envía por lotes con flush_logs()."""
+    row = [evento, quien, detalle, timestamp]
+    with _log_lock:
+        _journal_recuperar()
+        _log_estado["sh"] = sh
+        _log_buf.append(row)
+        if _log_estado["primero"] is None: _log_estado["primero"] = time.monotonic()
+        if LOG_JOURNAL:
+            with open(LOG_JOURNAL, "a", encoding="utf-8") as f: f.write(json.dumps(row, ensure_ascii=False)+"\n")
+        _arrancar_hilo()
+        lleno = len(_log_buf) >= LOG_FLUSH_N or time.monotonic()-_log_estado["primero"] >= LOG_FLUSH_SEG
+    if lleno: flush_logs(sh)
+
+@rt.medido("escritura", SHEET_LOGS)
+def flush_logs(sh=None) -> int:
+    """Envía todos los eventos pendientes con un único append_rows. Devuelve cuántos envió."""
+    with _log_lock:
+        _journal_recuperar()
+        sh = sh or _log_estado["sh"]
+        if not _log_buf or sh is None: return 0
+        rows = list(_log_buf)
+        # Si falla, la excepción sube y la cola queda intacta para el próximo intento.
+        get_ws(sh, SHEET_LOGS).append_rows(rows, value_input_option="RAW")
+        del _log_buf[:len(rows)]
+        _log_estado["primero"] = time.monotonic() if _log_buf else None
+        _journal_reescribir()
+    return len(rows)
+
+def pendientes_logs() -> int: return len(_log_buf)
+
+# ultimo_acceso de Usuarios: fila -> timestamp más reciente; lo escribe el mismo hilo de fondo
+_accesos: Dict[int, str] = {}
+_acc_lock = threading.Lock()
+_acc_estado = {"sh": None, "primero": None}
+
+def registrar_acceso(sh, fila: int, timestamp: str):
+    """Anota un login; ultimo_acceso se escribe por lotes con flush_accesos()."""
+    with _acc_lock:
+        _accesos[int(fila)] = timestamp; _acc_estado["sh"] = sh
+        if _acc_estado["primero"] is None: _acc_estado["primero"] = time.monotonic()
+    with _log_lock: _arrancar_hilo()
+
+@rt.medido("escritura", SHEET_USUARIOS)
+def flush_accesos(sh=None) -> int:
+    """Escribe los ultimo_acceso pendientes con un solo batch_update. Devuelve cuántos escribió."""
+    with _acc_lock:
+        sh = sh or _acc_estado["sh"]
+        if not _accesos or sh is None: return 0
+        pend = dict(_accesos)
+        col = HEADERS[SHEET_USUARIOS].index("ultimo_acceso")+1
+        get_ws(sh, SHEET_USUARIOS).batch_update(
+            [{"range": rowcol_to_a1(f, col), "values": [[ts]]} for f, ts in sorted(pend.items())],
+            value_input_option="USER_ENTERED")
+        _accesos.clear()
+        _acc_estado["primero"] = None
+    registrar_cambio(sh, SHEET_USUARIOS)  # las otras réplicas ven el ultimo_acceso nuevo
+    return len(pend)
+
+@rt.medido("escritura", SHEET_USUARIOS)
+def fijar_activo(sh, cambios: Dict[str, bool]) -> List[str]:
+    """Activa/inactiva usuarios (por `usuario`) con una lectura de la columna y un batch_update.
+    Devuelve los usuarios que no existen."""
+    ws = get_ws(sh, SHEET_USUARIOS); cols = HEADERS[SHEET_USUARIOS]
+    filas = {str(u).strip().lower(): i for i, u in enumerate(ws.col_values(cols.index("usuario")+1)[1:], start=2)}
+    col = cols.index("activo")+1
+    data = [{"range": rowcol_to_a1(filas[u.lower()], col), "values": [["TRUE" if v else "FALSE"]]}
+            for u, v in cambios.items() if u.lower() in filas]
+    if data:
+        ws.batch_update(data, value_input_option="USER_ENTERED")
+        registrar_cambio(sh, SHEET_USUARIOS)
+    return [u for u in cambios if u.lower() not in filas]
+
+# -------------------------
+# Labores (RLD_respuestas) con diario local: guardar no espera a la red
+# -------------------------
+# Cada labor se anota primero en este JSONL (con fsync) y el hilo de fondo la envía con append_rows.
+# Si el proceso muere o no hay conexión, sigue en el diario y se reintenta.
+RESP_JOURNAL = os.environ.get("RLD_RESP_JOURNAL", "rld_respuestas_pendientes.jsonl")
+
+# {"fila": [...], "dudosa": bool}; dudosa = un envío anterior pudo haber llegado (se revisa el uuid)
+_resp_buf: List[dict] = []
+_resp_lock = threading.Lock()
+_resp_estado = {"sh": None, "primero": None, "recuperado": False}
+
+def nuevo_uuid() -> str:
+    """Identificador de una labor; no choca aunque dos guardados caigan en el mismo milisegundo."""
+    return f"rld-{uuid.uuid4().hex}"
+
+def _resp_recuperar():
+    if _resp_estado["recuperado"]: return
+    _resp_estado["recuperado"] = True
+    if RESP_JOURNAL and os.path.exists(RESP_JOURNAL):
+        with open(RESP_JOURNAL, encoding="utf-8") as f:
+            # no se sabe si el proceso anterior alcanzó a enviarlas: todas quedan dudosas
+            _resp_buf[:0] = [{"fila": json.loads(l), "dudosa": True} for l in f if l.strip()]
+        if _resp_buf and _resp_estado["primero"] is None: _resp_estado["primero"] = time.monotonic()
+
+def _resp_reescribir():
+    if not RESP_JOURNAL: return
+    tmp = RESP_JOURNAL+".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for p in _resp_buf: f.write(json.dumps(p["fila"], ensure_ascii=False)+"\n")
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, RESP_JOURNAL)
+
+def encolar_respuesta(sh, fila: list) -> int:
+    """Anota una fila de RLD_respuestas (uuid en la columna A) en el diario y vuelve enseguida.
+    Devuelve cuántas quedan por enviar."""
+    with _resp_lock:
+        _resp_recuperar()
+        _resp_estado["sh"] = sh
+        if RESP_JOURNAL:
+            with open(RESP_JOURNAL, "a", encoding="utf-8") as f:
+                f.write(json.dumps(fila, ensure_ascii=False)+"\n"); f.flush(); os.fsync(f.fileno())
+        _resp_buf.append({"fila": fila, "dudosa": False})
+        if _resp_estado["primero"] is None: _resp_estado["primero"] = time.monotonic()
+        n = len(_resp_buf)
+    with _log_lock: _arrancar_hilo()
+    _despertar.set()
+    return n
+
+@rt.medido("escritura", SHEET_RESPUESTAS)
+def flush_respuestas(sh=None) -> int:
+    """Envía las labores del diario con un único append_rows. Idempotente por uuid: si un intento
+    anterior falló a medias, antes se lee la columna uuid y no se reenvía lo que ya llegó."""
+    with _resp_lock:
+        _resp_recuperar()
+        sh = sh or _resp_estado["sh"]
+        if not _resp_buf or sh is None: return 0
+        pend = list(_resp_buf)
+        ws = get_ws(sh, SHEET_RESPUESTAS)
+        enviar = pend
+        if any(p["dudosa"] for p in pend):
+            ya = set(ws.col_values(1))
+            enviar = [p for p in pend if not (p["dudosa"] and p["fila"][0] in ya)]
+        try:
+            if enviar: ws.append_rows([p["fila"] for p in enviar], value_input_option="RAW")
+        except Exception:
+            # un 5xx o un corte pudo aplicarse igual: el próximo intento revisa los uuid
+            for p in pend: p["dudosa"] = True
+            raise
+        del _resp_buf[:len(pend)]
+        _resp_estado["primero"] = time.monotonic() if _resp_buf else None
+        _resp_reescribir()
+    if enviar: registrar_cambio(sh, SHEET_RESPUESTAS)
+    return len(enviar)
+
+def pendientes_respuestas(sh=None) -> int:
+    """Labores en el diario que aún no llegaron a la hoja. Con `sh`, deja listo el envío de las
+    que haya dejado un proceso anterior."""
+    with _resp_lock:
+        _resp_recuperar()
+        if sh is not None and _resp_estado["sh"] is None: _resp_estado["sh"] = sh
+        n = len(_resp_buf)
+    if n and sh is not None:
+        with _log_lock: _arrancar_hilo()
+    return n
+
+@atexit.register
+def _flush_logs_al_salir():
+    for flush in (flush_respuestas, flush_logs, flush_accesos):
+        try: flush()
+        except Exception: pass
+
+# -------------------------
+# Índice tarea_id -> fila de RLD_tareas
+# -------------------------
+INDICE_TTL = CACHE_TTL  # pasado este tiempo se relee la columna A (una llamada pequeña)
+
+# spreadsheet_id -> {"filas": {tarea_id: fila}, "n": filas usadas (con encabezado), "t": instante}
+_idx_tareas: Dict[str, dict] = {}
+_idx_lock = threading.Lock()
+
+def _construir_indice(sh) -> dict:
+    version = _version_conocida(sh, SHEET_TAREAS)
+    col = get_ws(sh, SHEET_TAREAS).col_values(1)
+    filas: Dict[int, int] = {}
+    for i, v in enumerate(col[1:], start=2):
+        n = pd.to_numeric(v, errors="coerce")
+        if not pd.isna(n): filas.setdefault(int(n), i)
+    idx = _idx_tareas[sh.id] = {"filas": filas, "n": max(len(col), 1), "t": time.monotonic(), "version": version}
+    return idx
+
+def _indice(sh) -> dict:
+    idx = _idx_tareas.get(sh.id)
+    # otra réplica pudo insertar/borrar filas: el índice sigue a la versión de RLD_tareas
+    if idx is None or not _al_dia(sh, SHEET_TAREAS, idx["t"], idx["version"], INDICE_TTL): idx = _construir_indice(sh)
+    return idx
+
+def fila_tarea(sh, tid) -> Optional[int]:
+    """Fila (1-based) de la tarea; si no está en el índice se reconstruye una vez."""
+    tid = int(tid)
+    with _idx_lock:
+        fila = _indice(sh)["filas"].get(tid)
+        if fila is None: fila = _construir_indice(sh)["filas"].get(tid)
+    return fila
+
+def indice_registrar_altas(sh, tids: List[int], desde: Optional[int] = None):
+    """Registra filas agregadas en orden; `desde` es la primera fila que devolvió el append."""
+    with _idx_lock:
+        idx = _idx_tareas.get(sh.id)
+        if idx is None: return
+        if desde is not None: idx["n"] = max(idx["n"], desde-1)
+        for tid in tids:
+            idx["n"] += 1; idx["filas"].setdefault(int(tid), idx["n"])
+
+def _indice_registrar_bajas(sh, filas: List[int]):
+    idx = _idx_tareas.get(sh.id)
+    if idx is None: return
+    borradas = sorted(set(filas)); fuera = set(borradas)
+    idx["filas"] = {t: f-bisect.bisect_left(borradas, f) for t, f in idx["filas"].items() if f not in fuera}
+    idx["n"] -= len(borradas)
+
+def _filas_de(sh, tids) -> Dict[int, Optional[int]]:
+    """Filas de varias tareas con el índice reconstruido a lo sumo una vez (llamar con _idx_lock)."""
+    idx = _indice(sh)
+    if any(int(t) not in idx["filas"] for t in tids): idx = _construir_indice(sh)
+    return {int(t): idx["filas"].get(int(t)) for t in tids}
+
+def _coinciden(sh, filas: Dict[int, Optional[int]]) -> bool:
+    """¿La columna A de cada fila tiene todavía su tarea_id? Un values_batch_get con una celda por fila."""
+    pares = sorted({(f, t) for t, f in filas.items() if f is not None})
+    if not pares: return True
+    resp = sh.values_batch_get([f"'{SHEET_TAREAS}'!A{f}" for f, _ in pares])
+    for (f, t), vr in zip(pares, resp.get("valueRanges", [])):
+        v = (vr.get("values") or [[""]])[0]
+        n = pd.to_numeric(v[0] if v else "", errors="coerce")
+        if pd.isna(n) or int(n) != t: return False
+    return True
+
+def _filas_confirmadas(sh, tids) -> Dict[int, Optional[int]]:
+    """Filas de las tareas, comprobadas contra la hoja antes de escribir: borrar u ordenar filas a
+    mano no cambia la versión de RLD_tareas, así que el índice puede estar corrido. Si no coincide
+    se rearma (y se descartan snapshot y partición). Llamar con _idx_lock."""
+    filas = _filas_de(sh, tids)
+    if _coinciden(sh, filas): return filas
+    invalidar(SHEET_TAREAS)
+    with _part_lock: _part_tareas.pop(sh.id, None)
+    idx = _construir_indice(sh)
+    return {int(t): idx["filas"].get(int(t)) for t in tids}
+
+def _tramos(filas: List[int]) -> List[Tuple[int, int]]:
+    """[3,4,5,9,10] -> [(3,5),(9,10)]"""
+    tramos: List[Tuple[int, int]] = []
+    for f in sorted(set(filas)):
+        if tramos and f == tramos[-1][1]+1: tramos[-1] = (tramos[-1][0], f)
+        else: tramos.append((f, f))
+    return tramos
+
+@rt.medido("escritura", SHEET_TAREAS)
+def actualizar_tarea(sh, tid, campos: Dict[str, object]) -> bool:
+    """Escribe varias columnas de una tarea con un solo batch_update. False si no existe.
+    RAW, como el alta: título, descripción y observaciones son texto libre ("=…" no es fórmula)."""
+    cols = HEADERS[SHEET_TAREAS]
+    with _idx_lock:
+        fila = _filas_confirmadas(sh, [tid])[int(tid)]
+        if fila is None: return False
+        data = [{"range": rowcol_to_a1(fila, cols.index(c)+1), "values": [[v]]} for c, v in campos.items()]
+        get_ws(sh, SHEET_TAREAS).batch_update(data, value_input_option="RAW")
+    _part_cambio(sh, tid, campos)
+    registrar_cambio(sh, SHEET_TAREAS)
+    return True
+
+@rt.medido("escritura", SHEET_TAREAS)
+def eliminar_tarea(sh, tid) -> bool:
+    with _idx_lock:
+        fila = _filas_confirmadas(sh, [tid])[int(tid)]
+        if fila is None: return False
+        get_ws(sh, SHEET_TAREAS).delete_rows(fila)
+        _indice_registrar_bajas(sh, [fila])
+    _part_cambio(sh, tid, None)
+    registrar_cambio(sh, SHEET_TAREAS)
+    return True
+
+@rt.medido("escritura", SHEET_TAREAS)
+def actualizar_tareas(sh, cambios: Dict[int, Dict[str, object]]) -> List[int]:
+    """Cambios de varias tareas (cada una con sus columnas) en un solo batch_update.
+    Devuelve los IDs que no se encontraron (esos no se tocan)."""
+    cols = HEADERS[SHEET_TAREAS]
+    with _idx_lock:
+        filas = _filas_confirmadas(sh, cambios)
+        faltan = [t for t, f in filas.items() if f is None]
+        data = [{"range": rowcol_to_a1(filas[int(t)], cols.index(c)+1), "values": [[v]]}
+                for t, campos in cambios.items() if filas[int(t)] is not None for c, v in campos.items()]
+        if not data: return faltan
+        get_ws(sh, SHEET_TAREAS).batch_update(data, value_input_option="RAW")
+    for t, campos in cambios.items():
+        if filas[int(t)] is not None: _part_cambio(sh, t, campos)
+    registrar_cambio(sh, SHEET_TAREAS)
+    return faltan
+
+@rt.medido("escritura", SHEET_TAREAS)
+def eliminar_tareas(sh, tids: List[int]) -> List[int]:
+    """Borra varias tareas con un solo batch_update de la hoja de cálculo: un deleteDimension por
+    tramo de filas contiguas, de abajo hacia arriba (así borrar un tramo no corre las filas de los
+    que faltan). Devuelve los IDs no encontrados."""
+    with _idx_lock:
+        filas = _filas_confirmadas(sh, tids)
+        faltan = [t for t, f in filas.items() if f is None]
+        borrar = [f for f in filas.values() if f is not None]
+        if not borrar: return faltan
+        id_ = get_ws(sh, SHEET_TAREAS).id
+        sh.batch_update({"requests": [
+            {"deleteDimension": {"range": {"sheetId": id_, "dimension": "ROWS", "startIndex": ini-1, "endIndex": fin}}}
+            for ini, fin in reversed(_tramos(borrar))]})
+        _indice_registrar_bajas(sh, borrar)
+    for t, f in filas.items():
+        if f is not None: _part_cambio(sh, t, None)
+    registrar_cambio(sh, SHEET_TAREAS)
+    return faltan
+
+def descartar_indice_tareas():
+    """Para escrituras que cambian IDs o el orden de filas fuera de estas funciones."""
+    with _idx_lock: _idx_tareas.clear()
+    with _part_lock: _part_tareas.clear()
+
+# -------------------------
+# Partición de tareas por asignado (app de usuarios)
+# -------------------------
+# Se arma a partir del snapshot (de nuevo si cambia la versión de RLD_tareas) y la mantienen al día las escrituras
+# de este módulo (altas, ediciones/reasignaciones, bajas). Un usuario que abre sus tareas hace
+# trabajo proporcional a sus tareas, no a toda la hoja.
+
+# spreadsheet_id -> {"partes": {asignado_id: DataFrame ordenado por tarea_id_num},
+#                    "duenos": {tarea_id: asignado_id}, "t": instante}
+_part_tareas: Dict[str, dict] = {}
+_part_lock = threading.Lock()
+
+def _ordenar(df): return df.sort_values("tarea_id_num", kind="stable", na_position="last").reset_index(drop=True)
+
+def _particionar(df: pd.DataFrame) -> dict:
+    claves = df["asignado_id"].astype(str)
+    partes = {k: _ordenar(g) for k, g in df.groupby(claves, sort=False)}
+    ids = df["tarea_id_num"]
+    duenos = {int(t): k for t, k in zip(ids[ids.notna()], claves[ids.notna()])}
+    return {"partes": partes, "duenos": duenos, "t": time.monotonic(), "version": None}
+
+def _part_vigente(sh) -> Optional[dict]:
+    p = _part_tareas.get(sh.id)
+    return p if p is not None and _al_dia(sh, SHEET_TAREAS, p["t"], p["version"]) else None
+
+def _por_indice(sh, title: str, **igual) -> Optional[pd.DataFrame]:
+    """Con el almacén SQLite, las filas de `title` con columna == valor salen de sus índices
+    (rld_sqlite.INDEXADAS) sin armar el DataFrame de toda la hoja. None con los otros backends."""
+    consultar = getattr(sh, "consultar", None)
+    if consultar is None: return None
+    header = [str(h) for h in get_ws(sh, title).row_values(1)]
+    return _PARSERS[title](_registros(header, consultar(title, **igual)))
+
+def tareas_de(sh, asignado_id) -> pd.DataFrame:
+    """Tareas asignadas a un usuario, ordenadas por tarea_id_num. Devuelve una copia."""
+    df = _por_indice(sh, SHEET_TAREAS, asignado_id=asignado_id)
+    if df is not None: return _ordenar(df)
+    with _part_lock:
+        p = _part_vigente(sh)
+        if p is None:
+            p = _part_tareas[sh.id] = _particionar(df_tareas(sh))
+            p["version"] = _snap_version.get((sh.id, SHEET_TAREAS))
+        df = p["partes"].get(str(asignado_id))
+    return df.copy() if df is not None else _parse_tareas([]).iloc[0:0]
+
+def _part_insertar(p: dict, nuevas: pd.DataFrame):
+    for k, g in nuevas.groupby(nuevas["asignado_id"].astype(str), sort=False):
+        previa = p["partes"].get(k)
+        p["partes"][k] = _ordenar(g if previa is None else concatenar([previa, g]))
+        p["duenos"].update({int(t): k for t in g["tarea_id_num"].dropna()})
+
+def _part_quitar(p: dict, tid: int) -> Optional[dict]:
+    """Saca la tarea de su partición y devuelve su fila (solo las columnas de la hoja)."""
+    k = p["duenos"].pop(tid, None)
+    df = p["partes"].get(k)
+    if df is None: return None
+    sel = df["tarea_id_num"].eq(tid).fillna(False).astype(bool)
+    if not sel.any(): return None
+    fila = df.loc[sel, HEADERS[SHEET_TAREAS]].iloc[0].to_dict()
+    if sel.all(): p["partes"].pop(k)
+    else: p["partes"][k] = df[~sel].reset_index(drop=True)
+    return fila
+
+def _part_alta(sh, filas: List[list]):
+    with _part_lock:
+        p = _part_vigente(sh)
+        if p is not None: _part_insertar(p, _parse_tareas([dict(zip(HEADERS[SHEET_TAREAS], f)) for f in filas]))
+
+def _part_cambio(sh, tid: int, campos: Optional[Dict[str, object]]):
+    """Edición (o reasignación) de una tarea; con campos=None, baja."""
+    with _part_lock:
+        p = _part_vigente(sh)
+        if p is None: return
+        fila = _part_quitar(p, int(tid))
+        if fila is None:
+            if campos is not None: _part_tareas.pop(sh.id, None)  # no la conocíamos: se rearma al leer
+            return
+        if campos is not None: _part_insertar(p, _parse_tareas([{**fila, **campos}]))
+
+# -------------------------
+# Reserva atómica de bloques de tarea_id
+# -------------------------
+# RLD_ids es un talonario: cada reserva es una fila agregada con append (atómico en Sheets).
+# La columna "hasta" es la suma acumulada de "cantidad" hasta esa fila, y la devuelve el propio
+# append (include_values_in_response). Dos admins simultáneos reciben filas, y bloques, distintos.
+_FORMULA_HASTA = '=SUM(INDIRECT("B2:B"&ROW()))'
+
+def _sembrar_ids(sh, existentes: Dict[str, object], ws):
+    """Primera fila del talonario: el mayor tarea_id que ya exista en RLD_tareas."""
+    if len(ws.col_values(1)) >= 2: return
+    wt = existentes.get(SHEET_TAREAS)
+    ids = pd.to_numeric(pd.Series(wt.col_values(1)[1:] if wt is not None else [], dtype=object), errors="coerce").dropna()
+    ws.append_rows([["base", int(ids.max()) if not ids.empty else 0, _FORMULA_HASTA, iso_now()]],
+                   value_input_option="USER_ENTERED")
+
+@rt.medido("escritura", SHEET_IDS)
+def reservar_ids(sh, n: int) -> int:
+    """Reserva n IDs consecutivos con una sola llamada. Devuelve el primero."""
+    resp = get_ws(sh, SHEET_IDS).append_rows(
+        [[uuid.uuid4().hex[:12], int(n), _FORMULA_HASTA, iso_now()]],
+        value_input_option="USER_ENTERED", include_values_in_response=True)
+    hasta = int(float(str(resp["updates"]["updatedData"]["values"][0][2]).replace(",", "")))
+    return hasta-int(n)+1
+
+def _fila_inicial(resp) -> Optional[int]:
+    try: return a1_to_rowcol(resp["updates"]["updatedRange"].split("!")[-1].split(":")[0])[0]
+    except (KeyError, TypeError, AttributeError): return None
+
+@rt.medido("escritura", SHEET_TAREAS)
+def crear_tareas(sh, filas: List[list]) -> int:
+    """Agrega tareas (filas sin tarea_id) con un bloque de IDs propio y un solo append_rows
+    (3 llamadas con la versión en RLD_meta)."""
+    base = reservar_ids(sh, len(filas))
+    tids = [base+i for i in range(len(filas))]
+    resp = get_ws(sh, SHEET_TAREAS).append_rows([[tid]+list(f) for tid, f in zip(tids, filas)])
+    indice_registrar_altas(sh, tids, desde=_fila_inicial(resp))
+    _part_alta(sh, [[tid]+list(f) for tid, f in zip(tids, filas)])
+    registrar_cambio(sh, SHEET_TAREAS)
+    return base
+
+# -------------------------
+# RLD_meta: pares clave/valor pequeños (versión de esquema, etc.)
+# -------------------------
+def meta_leer(sh) -> Dict[str, str]:
+    vals = get_ws(sh, SHEET_META).get_all_values()
+    return {r[0]: (r[1] if len(r) > 1 else "") for r in vals[1:] if r and r[0]}
+
+@rt.medido("escritura", SHEET_META)
+def meta_escribir(sh, valores: Dict[str, object], formulas: bool = False):
+    """Actualiza/crea claves con un solo batch_update. La columna A se lee solo si hay claves
+    cuya fila no se conoce (las filas de RLD_meta no se mueven: las claves existentes se cachean)."""
+    ws = get_ws(sh, SHEET_META)
+    filas = _meta_filas.get(sh.id, {})
+    n = None
+    if not all(k in filas for k in valores):
+        claves = ws.col_values(1); n = len(claves)
+        filas = _meta_filas[sh.id] = {k: i for i, k in enumerate(claves, start=1) if k}
+    data, nuevas = [], []
+    for k, v in valores.items():
+        if k in filas: data.append({"range": f"B{filas[k]}:C{filas[k]}", "values": [[str(v), iso_now()]]})
+        else: nuevas.append([k, str(v), iso_now()])
+    if nuevas:
+        data.append({"range": f"A{n+1}:C{n+len(nuevas)}", "values": nuevas})
+    if data: ws.batch_update(data, value_input_option="USER_ENTERED" if formulas else "RAW")
+    for i, r in enumerate(nuevas, start=(n or 0)+1): filas[r[0]] = i
+
+# -------------------------
+# Versión por hoja en RLD_meta: detección de cambios entre réplicas
+# -------------------------
+# La app de admin y la de usuarios son procesos aparte. Cada escritura sube la versión de su hoja
+# (clave "version:<hoja>") y los lectores, en vez de releer la hoja cada CACHE_TTL, miran las
+# versiones en un rango chico de RLD_meta (a lo sumo una vez cada VERSION_SEG: una por rerun).
+# La versión es un sello único (instante + proceso), no un contador: no hace falta leerla para
+# subirla y dos réplicas que escriben a la vez nunca dejan el mismo valor.
+# Las ediciones a mano en la hoja no suben la versión: por eso un snapshot dura a lo sumo CACHE_MAX.
+VERSIONADAS = {SHEET_USUARIOS, SHEET_TAREAS, SHEET_RESPUESTAS, SHEET_RESUMEN, SHEET_PARTICIONES, SHEET_ANALITICA}
+VERSION_SEG = 2
+CACHE_MAX   = 600
+
+_PROCESO = uuid.uuid4().hex[:8]
+# spreadsheet_id -> (instante de la lectura, {hoja: versión})
+_versiones: Dict[str, tuple] = {}
+# spreadsheet_id -> {clave de RLD_meta: fila}
+_meta_filas: Dict[str, Dict[str, int]] = {}
+_ver_lock = threading.Lock()
+
+def _clave_version(title): return f"version:{title}"
+
+def _anotar_meta(sh, vals: List[list]):
+    """Guarda versiones y filas de claves a partir de una lectura de RLD_meta!A1:B (con encabezado)."""
+    filas = _meta_filas.setdefault(sh.id, {})
+    vers = {}
+    for i, r in enumerate(vals[1:], start=2):
+        if not r or not r[0]: continue
+        filas[r[0]] = i
+        if r[0].startswith("version:"): vers[r[0][len("version:"):]] = r[1] if len(r) > 1 else ""
+    _versiones[sh.id] = (time.monotonic(), vers)
+
+def _versiones_viejas(sh) -> bool:
+    hit = _versiones.get(sh.id)
+    return hit is None or time.monotonic()-hit[0] >= VERSION_SEG
+
+def versiones(sh) -> Dict[str, str]:
+    """Versión actual de cada hoja; una lectura de RLD_meta!A1:B cada VERSION_SEG como máximo."""
+    if _versiones_viejas(sh):
+        with _ver_lock:
+            if _versiones_viejas(sh):
+                _anotar_meta(sh, get_ws(sh, SHEET_META).get("A1:B"))
+    return _versiones[sh.id][1]
+
+def _version_conocida(sh, title: str) -> Optional[str]:
+    """La última versión leída (sin ir a la API); se toma antes de leer los datos de la hoja."""
+    return _versiones.get(sh.id, (0, {}))[1].get(title) if title in VERSIONADAS else None
+
+def _al_dia(sh, title: str, t0: float, version: Optional[str], ttl: float = CACHE_TTL) -> bool:
+    """¿Sigue valiendo algo cargado en t0 con esa versión? Sin versión en RLD_meta, por tiempo."""
+    edad = time.monotonic()-t0
+    actual = versiones(sh).get(title) if title in VERSIONADAS else None
+    if actual is None: return edad < ttl
+    return actual==version and edad < CACHE_MAX
+
+def registrar_cambio(sh, *titles: str):
+    """Llamar después de escribir en esas hojas: descarta los snapshots del proceso y sube su
+    versión en RLD_meta (una escritura) para que las otras réplicas recarguen."""
+    invalidar(*titles)
+    marcar = [t for t in dict.fromkeys(titles) if t in VERSIONADAS]
+    if not marcar: return
+    sello = f"{time.time_ns()}-{_PROCESO}"
+    previas = {t: _version_conocida(sh, t) for t in marcar}
+    meta_escribir(sh, {_clave_version(t): sello for t in marcar})
+    with _ver_lock:
+        hit = _versiones.get(sh.id)
+        if hit is not None: hit[1].update({t: sello for t in marcar})
+    if SHEET_TAREAS in marcar:
+        # el índice y la partición ya incluyen esta escritura: adoptan el sello si no se perdieron otra
+        with _idx_lock:
+            idx = _idx_tareas.get(sh.id)
+            if idx is not None and idx["version"]==previas[SHEET_TAREAS]: idx["version"] = sello
+        with _part_lock:
+            p = _part_tareas.get(sh.id)
+            if p is not None and p["version"]==previas[SHEET_TAREAS]: p["version"] = sello
+
+# -------------------------
+# Lectura incremental de hojas que solo crecen (RLD_respuestas, Logs)
+# -------------------------
+# Cada refresco trae, en un solo values_batch_get, la cola A{n+1}:… y una huella calculada por
+# Sheets en RLD_meta. Si la huella coincide con la que se calcula localmente (filas viejas + cola),
+# solo hubo altas al final; si no, alguien editó/borró filas y se recarga la hoja completa.
+# La huella es heurística (sumas ponderadas por fila), así que además se recarga todo cada DELTA_FULL_SEG.
+DELTA_FULL_SEG = 600
+
+# columnas que entran en la huella: "len" = ROW*LEN, "uni" = ROW*UNICODE(1er carácter), "set" = ROW*(no vacía)
+_HUELLA = {
+    SHEET_RESPUESTAS: [("A","len"), ("K","uni"), ("K","len"), ("L","len"), ("N","set")],
+    SHEET_LOGS:       [("A","len"), ("D","len")],
+}
+
+def _clave_huella(title): return f"huella:{title}"
+
+def _formula_huella(title: str) -> str:
+    q = f"'{title}'!"
+    partes = [f'TEXT(COUNTA({q}A2:A),"0")']
+    for c, tipo in _HUELLA[title]:
+        r = f"{q}{c}2:{c}"
+        expr = {"len": f"LEN({r})", "uni": f"IFERROR(UNICODE({r}),0)", "set": f"(LEN({r})>0)"}[tipo]
+        partes.append(f'TEXT(SUMPRODUCT(ROW({r})*{expr}),"0")')
+    return "=" + '&"|"&'.join(partes)
+
+def _huella_local(title: str, filas: List[list], desde: int, base: Optional[List[int]] = None) -> List[int]:
+    """Suma a `base` el aporte de `filas`, que empiezan en la fila `desde` de la hoja."""
+    tot = list(base) if base else [0]*(len(_HUELLA[title])+1)
+    for i, row in enumerate(filas, start=desde):
+        tot[0] += 1 if (row and str(row[0])!="") else 0
+        for k, (c, tipo) in enumerate(_HUELLA[title], start=1):
+            j = ord(c)-65
+            v = str(row[j]) if len(row) > j else ""
+            if tipo=="len": tot[k] += i*len(v)
+            elif tipo=="uni": tot[k] += i*(ord(v[0]) if v else 0)
+            else: tot[k] += i*(1 if v else 0)
+    return tot
+
+def _huella_txt(partes: List[int]) -> str: return "|".join(str(int(p)) for p in partes)
+
+# (spreadsheet_id, titulo) -> {"df", "n" (filas de datos), "huella" (partes locales), "t_full"}
+_delta: Dict[tuple, dict] = {}
+_delta_lock = threading.Lock()
+
+def _registros(header: List[str], filas: List[list], huecos: bool = False) -> List[dict]:
+    """Igual que get_all_records(): rellena columnas y convierte números. Con `huecos` conserva las
+    filas vacías intermedias (como get_all_records), para que la posición siga siendo la fila."""
+    out = []
+    if huecos:
+        while filas and not any(str(x)!="" for x in filas[-1]): filas = filas[:-1]
+    for r in filas:
+        r = list(r)+[""]*(len(header)-len(r))
+        if not huecos and not any(str(x)!="" for x in r): continue
+        out.append(dict(zip(header, numericise_all(r[:len(header)]))))
+    return out
+
+def _rango(title: str, desde: int) -> str:
+    return f"'{title}'!A{desde}:{rowcol_to_a1(1, len(headers_de(title))).rstrip('0123456789')}"
+
+def _delta_pedir(sh, title: str) -> tuple:
+    """(completa, rangos) de la próxima lectura incremental: huella en RLD_meta y cola de la hoja.
+    Llamar con _delta_lock tomado."""
+    st = _delta.get((sh.id, title))
+    completa = st is None or time.monotonic()-st["t_full"] >= DELTA_FULL_SEG
+    return completa, [f"'{SHEET_META}'!A1:B", _rango(title, 1 if completa else st["n"]+2)]
+
+def _delta_aplicar(sh, title: str, completa: bool, meta_vals: List[list], vals: List[list]) -> pd.DataFrame:
+    """Aplica lo que trajo _delta_pedir: suma la cola o, si la huella no cuadra, recarga todo."""
+    key = (sh.id, title); st = _delta.get(key)
+    _anotar_meta(sh, meta_vals)
+    meta = {r[0]: (r[1] if len(r) > 1 else "") for r in meta_vals[1:] if r}
+    remota = meta.get(_clave_huella(title))
+    if remota is None:
+        meta_escribir(sh, {_clave_huella(title): _formula_huella(title)}, formulas=True)
+    if not completa:
+        partes = _huella_local(title, vals, st["n"]+2, st["huella"])
+        if remota is not None and _huella_txt(partes)==remota:
+            if vals:
+                nuevo = _PARSERS[title](_registros(st["header"], vals))
+                st["df"] = concatenar([st["df"], nuevo])
+                st["n"] += len(vals); st["huella"] = partes
+            return st["df"].copy()
+        # hubo cambios que no son altas: recarga completa
+        vals = get_ws(sh, title).get(_rango(title, 1).split("!")[1])
+    header = [str(h) for h in (vals[0] if vals else HEADERS[title])]
+    datos = vals[1:]
+    st = _delta[key] = {
+        "df": _PARSERS[title](_registros(header, datos)), "header": header,
+        "n": len(datos), "huella": _huella_local(title, datos, 2), "t_full": time.monotonic(),
+    }
+    return st["df"].copy()
+
+@rt.medido("df")
+def leer_incremental(sh, title: str) -> pd.DataFrame:
+    """DataFrame completo de la hoja; en régimen normal solo se descargan las filas nuevas."""
+    get_ws(sh, SHEET_META); get_ws(sh, title)  # hojas verificadas (sin llamadas si ya lo estaban)
+    with _delta_lock:
+        completa, rangos = _delta_pedir(sh, title)
+        resp = sh.values_batch_get(rangos)
+        meta_vals, vals = [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+        return _delta_aplicar(sh, title, completa, meta_vals, vals)
+
+def df_logs(sh): return snapshot(sh, SHEET_LOGS)
+
+def reiniciar_caches():
+    """Olvida todo el estado del proceso (como un arranque en frío). Los logs en cola se conservan."""
+    with _ws_lock: _ws_registry.clear()
+    with _snap_lock: _snapshots.clear(); _snap_version.clear()
+    with _ver_lock: _versiones.clear(); _meta_filas.clear()
+    with _idx_lock: _idx_tareas.clear()
+    with _part_lock: _part_tareas.clear()
+    _idx_usuarios.clear()
+    with _delta_lock: _delta.clear()
@@ -0,0 +1,405 @@
+# =========================
+# RLD – 2025 – Almacén local en SQLite (backend principal) con espejo por lotes en Google Sheets
+# =========================
+# Con RLD_BACKEND=sqlite las apps leen y escriben contra un archivo SQLite que expone el mismo
+# subconjunto de gspread que rld_fake (las hojas se evalúan en memoria con las mismas fórmulas), así
+# que rld_sheets y las vistas no cambian: una consulta interactiva no sale del proceso.
+# Cada escritura se guarda en una transacción junto con la operación en la tabla `salida`; el
+# Sincronizador la replica en la hoja por lotes (append_rows y batch_update consecutivos van juntos)
+# y trae de vuelta lo que las personas editen allí, que sigue siendo la vista para ellas.
+# Las dos apps (procesos distintos) comparten el archivo: antes de cada llamada se mira
+# PRAGMA data_version y se recargan solo las hojas que el otro proceso cambió.
+import json, os, sqlite3, threading, time, uuid
+from typing import Callable, Dict, List, Optional
+
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+
+from rld_fake import FakeSpreadsheet, FakeWorksheet, _rango
+
+RUTA = os.environ.get("RLD_SQLITE", "rld.sqlite3")
+SYNC_SEG  = float(os.environ.get("RLD_SYNC_SEG", "5"))     # cada cuánto se empuja la salida
+TRAER_SEG = float(os.environ.get("RLD_TRAER_SEG", "300"))  # cada cuánto se trae lo editado en la hoja
+LOTE_MAX = 500  # operaciones de `salida` por empuje
+
+# columnas con índice propio en `filas` (cuando la hoja las tiene en su encabezado)
+INDEXADAS = ["tarea_id", "asignado_id", "usuario_id", "creado_en"]
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS hojas (titulo TEXT PRIMARY KEY, id INTEGER, filas INTEGER, cols INTEGER,
+                                  version INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS filas (hoja TEXT, fila INTEGER, datos TEXT, formulas TEXT,
+                                  tarea_id TEXT, asignado_id TEXT, usuario_id TEXT, creado_en TEXT,
+                                  PRIMARY KEY (hoja, fila));
+CREATE INDEX IF NOT EXISTS filas_tarea    ON filas (hoja, tarea_id);
+CREATE INDEX IF NOT EXISTS filas_asignado ON filas (hoja, asignado_id);
+CREATE INDEX IF NOT EXISTS filas_usuario  ON filas (hoja, usuario_id);
+CREATE INDEX IF NOT EXISTS filas_creado   ON filas (hoja, creado_en);
+CREATE TABLE IF NOT EXISTS salida (id INTEGER PRIMARY KEY AUTOINCREMENT, hoja TEXT, metodo TEXT, args TEXT, ts REAL);
+CREATE TABLE IF NOT EXISTS turno (id INTEGER PRIMARY KEY CHECK (id = 1), dueno TEXT, hasta REAL);
+"""
+
+def _mutacion(nombre: str):
+    def metodo(self, *args, **kw): return self.spreadsheet._escribir(self, nombre, args, kw)
+    metodo.__name__ = nombre
+    return metodo
+
+class SqliteWorksheet(FakeWorksheet):
+    """Hoja en memoria cuyas escrituras pasan por SQLite (ver SqliteSpreadsheet._escribir)."""
+    append_rows  = _mutacion("append_rows")
+    update_cell  = _mutacion("update_cell")
+    update       = _mutacion("update")
+    batch_update = _mutacion("batch_update")
+    batch_clear  = _mutacion("batch_clear")
+    delete_rows  = _mutacion("delete_rows")
+    clear        = _mutacion("clear")
+
+    def __repr__(self): return f"<SqliteWorksheet {self.title!r} filas={len(self._filas)}>"
+
+def _tocadas(ws: FakeWorksheet, metodo: str, args: tuple, kw: dict, res) -> set:
+    """Filas (1-based) que pudo cambiar una escritura ya aplicada en memoria."""
+    n = len(ws._filas)
+    if metodo=="append_rows":
+        ini = a1_to_rowcol(res["updates"]["updatedRange"].split("!")[-1].split(":")[0])[0]
+        return set(range(ini, n+1))
+    if metodo=="update_cell": return {args[0] if args else kw["row"]}
+    if metodo=="update":
+        values = kw.get("values", args[0] if args else None); rango = kw.get("range_name", args[1] if len(args) > 1 else None)
+        if isinstance(values, str) and not isinstance(rango, str): values, rango = rango, values
+        f1 = _rango(rango or "A1", n, 1)[0]
+        return set(range(f1, f1+len(values)))
+    if metodo=="batch_update":
+        data = kw.get("data", args[0] if args else [])
+        return {f for d in data for f1 in [_rango(d["range"], n, 1)[0]] for f in range(f1, f1+len(d["values"]))}
+    if metodo=="batch_clear":
+        rangos = kw.get("ranges", args[0] if args else [])
+        return {f for r in rangos for f1, _, f2, _ in [_rango(r, n, 1)] for f in range(f1, min(f2, n)+1)}
+    return set()
+
+class SqliteSpreadsheet(FakeSpreadsheet):
+    def __init__(self, ruta: str = RUTA, id_: Optional[str] = None):
+        super().__init__(id_ or f"sqlite:{os.path.abspath(ruta)}")
+        self.title = "RLD (SQLite)"; self.ruta = ruta
+        self._db = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL"); self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_ESQUEMA)
+        self._versiones: Dict[str, int] = {}  # hoja -> versión cargada en memoria
+        self._data_version = None
+        self._entrante = False  # escribiendo lo traído de la hoja: no vuelve a `salida`
+        self.sincronizador: Optional["Sincronizador"] = None
+        with self._lock: self._refrescar(forzar=True)
+
+    # ---- memoria <-> disco ----
+    def _refrescar(self, forzar: bool = False):
+        """Recarga las hojas que otro proceso cambió (PRAGMA data_version no cambia con lo propio)."""
+        dv = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if dv==self._data_version and not forzar: return
+        self._data_version = dv
+        propia = not self._db.in_transaction
+        if propia: self._db.execute("BEGIN")
+        try:
+            vistas = set()
+            for titulo, id_, nfilas, ncols, version in self._db.execute("SELECT titulo, id, filas, cols, version FROM hojas").fetchall():
+                vistas.add(titulo)
+                ws = self._hojas.get(titulo)
+                if ws is None: ws = self._hojas[titulo] = SqliteWorksheet(self, titulo, id_, nfilas, ncols)
+                elif self._versiones.get(titulo)==version: continue
+                self._cargar_hoja(ws); self._versiones[titulo] = version
+            for t in [t for t in self._hojas if t not in vistas]: self._hojas.pop(t); self._versiones.pop(t, None)
+        finally:
+            if propia: self._db.execute("COMMIT")
+
+    def _cargar_hoja(self, ws: FakeWorksheet):
+        ws._filas, ws._formulas = [], {}
+        for fila, datos, formulas in self._db.execute(
+                "SELECT fila, datos, formulas FROM filas WHERE hoja=? ORDER BY fila", (ws.title,)):
+            while len(ws._filas) < fila-1: ws._filas.append([])
+            ws._filas.append(json.loads(datos))
+            for c in json.loads(formulas or "[]"): ws._formulas[(fila, c)] = ws._filas[-1][c-1]
+
+    def _guardar_filas(self, ws: FakeWorksheet, tocadas):
+        t = ws.title; n = len(ws._filas)
+        hdr = ws._filas[0] if ws._filas else []
+        pos = [hdr.index(c) if c in hdr else None for c in INDEXADAS]
+        formulas: Dict[int, List[int]] = {}
+        for (f, c) in ws._formulas: formulas.setdefault(f, []).append(c)
+        self._db.execute("DELETE FROM filas WHERE hoja=? AND fila>?", (t, n))
+        self._db.executemany(
+            "INSERT OR REPLACE INTO filas (hoja, fila, datos, formulas, tarea_id, asignado_id, usuario_id, creado_en)"
+            " VALUES (?,?,?,?,?,?,?,?)",
+            [(t, f, json.dumps(r, ensure_ascii=False), json.dumps(sorted(formulas[f])) if f in formulas else None,
+              *[(r[p] if p is not None and p < len(r) and f > 1 else None) for p in pos])
+             for f in sorted(tocadas) if 1 <= f <= n for r in [ws._filas[f-1]]])
+
+    def _borrar_filas(self, t: str, ini: int, fin: int):
+        self._db.execute("DELETE FROM filas WHERE hoja=? AND fila BETWEEN ? AND ?", (t, ini, fin))
+        # se corre en dos pasos para no chocar con la clave (hoja, fila) a mitad del UPDATE
+        self._db.execute("UPDATE filas SET fila=-(fila-?) WHERE hoja=? AND fila>?", (fin-ini+1, t, fin))
+        self._db.execute("UPDATE filas SET fila=-fila WHERE hoja=? AND fila<0", (t,))
+
+    def _persistir(self, ws: FakeWorksheet, metodo: str, args: tuple, kw: dict, res):
+        t = ws.title
+        if metodo=="clear":
+            self._db.execute("DELETE FROM filas WHERE hoja=?", (t,)); return
+        if metodo=="delete_rows":
+            ini = args[0] if args else kw["start_index"]
+            self._borrar_filas(t, ini, (args[1] if len(args) > 1 else kw.get("end_index")) or ini); return
+        tocadas = _tocadas(ws, metodo, args, kw, res)
+        # si cambió el encabezado, cambian las columnas indexadas de todas las filas
+        self._guardar_filas(ws, range(1, len(ws._filas)+1) if 1 in tocadas else tocadas)
+
+    def _transaccion(self, fn: Callable):
+        """Corre fn() con la escritura de SQLite tomada (serializa a las dos apps) y la memoria al día."""
+        with self._lock:
+            if self._db.in_transaction: return fn()  # anidada (p.ej. add_worksheet al traer)
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._refrescar()
+                res = fn()
+                self._db.execute("COMMIT")
+                return res
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                # la memoria pudo quedar a medias: se vuelve a lo que hay en disco
+                self._versiones.clear(); self._refrescar(forzar=True)
+                raise
+
+    def _anotar(self, hoja: str, metodo: str, args, kw):
+        if not self._entrante:
+            self._db.execute("INSERT INTO salida (hoja, metodo, args, ts) VALUES (?,?,?,?)",
+                             (hoja, metodo, json.dumps([list(args), kw], ensure_ascii=False, default=str), time.time()))
+        self._db.execute("UPDATE hojas SET version=version+1 WHERE titulo=?", (hoja,))
+        self._versiones[hoja] = self._versiones.get(hoja, 0)+1
+
+    def _escribir(self, ws: FakeWorksheet, metodo: str, args: tuple, kw: dict):
+        def aplicar():
+            hoja = self._hojas[ws.title]
+            res = getattr(FakeWorksheet, metodo)(hoja, *args, **kw)
+            self._persistir(hoja, metodo, args, kw, res)
+            self._anotar(hoja.title, metodo, args, kw)
+            return res
+        return self._transaccion(aplicar)
+
+    # ---- API de gspread ----
+    def _llamada(self, metodo: str, hoja: Optional[str], enviado=None):
+        with self._lock: self._refrescar()
+        super()._llamada(metodo, hoja, enviado)
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26, index=None):
+        self._llamada("add_worksheet", title)
+        def aplicar():
+            if title in self._hojas: return self._hojas[title]  # la creó el otro proceso
+            id_ = max([w.id for w in self._hojas.values()]+[0])+1
+            ws = self._hojas[title] = SqliteWorksheet(self, title, id_, rows, cols)
+            self._db.execute("INSERT INTO hojas (titulo, id, filas, cols) VALUES (?,?,?,?)", (title, id_, rows, cols))
+            self._versiones[title] = -1
+            self._anotar(title, "add_worksheet", [], {"rows": rows, "cols": cols})
+            return ws
+        return self._transaccion(aplicar)
+
+    def del_worksheet(self, ws):
+        self._llamada("del_worksheet", ws.title)
+        def aplicar():
+            self._hojas.pop(ws.title, None); self._versiones.pop(ws.title, None)
+            self._db.execute("DELETE FROM filas WHERE hoja=?", (ws.title,))
+            self._db.execute("DELETE FROM hojas WHERE titulo=?", (ws.title,))
+            if not self._entrante:
+                self._db.execute("INSERT INTO salida (hoja, metodo, args, ts) VALUES (?,?,?,?)",
+                                 (ws.title, "del_worksheet", "[[], {}]", time.time()))
+        self._transaccion(aplicar)
+
+    def batch_update(self, body, **kw):
+        """deleteDimension de filas (ver FakeSpreadsheet._borrados): en `salida` quedan como
+        `borrar_filas` por hoja, porque el sheetId de la hoja remota no es el local."""
+        self._llamada("batch_update", None, body)
+        def aplicar():
+            por_hoja: Dict[str, list] = {}
+            for ws, ini, fin in self._borrados(body):
+                ws._borrar(ini, fin); self._borrar_filas(ws.title, ini, fin)
+                por_hoja.setdefault(ws.title, []).append([ini, fin])
+            for t, tramos in por_hoja.items(): self._anotar(t, "borrar_filas", [tramos], {})
+            return {"replies": [{} for _ in body.get("requests", [])]}
+        return self._transaccion(aplicar)
+
+    # ---- consultas y sincronización ----
+    def consultar(self, hoja: str, **igual) -> List[list]:
+        """Filas de datos de `hoja` con columna == valor, resueltas con los índices de SQLite (sin
+        cargar DataFrames). Solo columnas de INDEXADAS."""
+        malas = [c for c in igual if c not in INDEXADAS]
+        if malas: raise ValueError(f"Columnas sin índice: {malas}")
+        sql = "SELECT datos FROM filas WHERE hoja=? AND fila>1"+"".join(f" AND {c}=?" for c in igual)+" ORDER BY fila"
+        with self._lock:
+            return [json.loads(d) for (d,) in self._db.execute(sql, (hoja, *[str(v) for v in igual.values()]))]
+
+    def pendientes(self) -> int:
+        """Operaciones que todavía no llegaron a la hoja."""
+        with self._lock: return self._db.execute("SELECT COUNT(*) FROM salida").fetchone()[0]
+
+    def tomar_turno(self, dueno: str, seg: float) -> bool:
+        """Un solo proceso sincroniza a la vez: el turno vence a los `seg` segundos si no se renueva."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                fila = self._db.execute("SELECT dueno, hasta FROM turno WHERE id=1").fetchone()
+                ok = fila is None or fila[0]==dueno or fila[1] < time.time()
+                if ok: self._db.execute("INSERT OR REPLACE INTO turno (id, dueno, hasta) VALUES (1,?,?)", (dueno, time.time()+seg))
+            finally:
+                self._db.execute("COMMIT")
+        return ok
+
+    def __repr__(self): return f"<SqliteSpreadsheet {self.ruta!r} hojas={list(self._hojas)}>"
+
+def _celda(v) -> str:
+    """Valor de la API (valueRenderOption=FORMULA) al texto que guarda la copia local."""
+    if isinstance(v, bool): return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer(): return str(int(v))
+    return "" if v is None else str(v)
+
+def _sin_colas(filas: List[list]) -> List[list]:
+    out = []
+    for r in filas:
+        r = list(r)
+        while r and r[-1]=="": r.pop()
+        out.append(r)
+    while out and not out[-1]: out.pop()
+    return out
+
+def _agrupar(ops: List[tuple]) -> List[tuple]:
+    """[(id, hoja, metodo, args)] -> [(ids, hoja, metodo, args, kw)]: las altas y ediciones
+    consecutivas de una hoja (con el mismo value_input_option) se juntan en una sola llamada."""
+    grupos: List[tuple] = []
+    for id_, hoja, metodo, crudo in ops:
+        args, kw = json.loads(crudo)
+        if metodo=="append_rows":
+            clave = ("append_rows", kw.get("value_input_option") or "RAW")
+            carga = args[0] if args else kw["values"]
+        elif metodo in ("update_cell", "update", "batch_update"):
+            if metodo=="update_cell":
+                fila, col, valor = (args+[None]*3)[:3] if args else (kw["row"], kw["col"], kw["value"])
+                clave, carga = ("batch_update", "USER_ENTERED"), [{"range": rowcol_to_a1(fila, col), "values": [[valor]]}]
+            elif metodo=="update":
+                values = kw.get("values", args[0] if args else None); rango = kw.get("range_name", args[1] if len(args) > 1 else None)
+                if isinstance(values, str) and not isinstance(rango, str): values, rango = rango, values
+                clave, carga = ("batch_update", kw.get("value_input_option") or "RAW"), [{"range": rango or "A1", "values": values}]
+            else:
+                clave, carga = ("batch_update", kw.get("value_input_option") or "RAW"), list(args[0] if args else kw["data"])
+        else:
+            grupos.append(([id_], hoja, metodo, args, kw)); continue
+        previo = grupos[-1] if grupos else None
+        if previo and previo[1]==hoja and previo[2]==clave[0] and previo[4].get("value_input_option")==clave[1]:
+            previo[0].append(id_); previo[3][0].extend(carga)
+        else:
+            grupos.append(([id_], hoja, clave[0], [list(carga)], {"value_input_option": clave[1]}))
+    return grupos
+
+class Sincronizador:
+    """Empuja `salida` a la hoja remota por lotes y trae lo que las personas editen en ella.
+    Las operaciones se borran de `salida` después de aplicarse (al menos una vez: si el proceso
+    muere entre la llamada y el borrado, ese lote se repite)."""
+    def __init__(self, local: SqliteSpreadsheet, remoto, cada: float = SYNC_SEG, traer_cada: float = TRAER_SEG,
+                 al_traer: Optional[Callable] = None):
+        self.local = local; self.remoto = remoto
+        self.cada = cada; self.traer_cada = traer_cada; self.al_traer = al_traer
+        self.dueno = uuid.uuid4().hex
+        self._hojas: Dict[str, object] = {}
+        self._parar = threading.Event(); self._hilo = None; self._ultimo_traer = 0.0
+
+    def _hoja(self, titulo: str):
+        if titulo not in self._hojas: self._hojas = {w.title: w for w in self.remoto.worksheets()}
+        if titulo not in self._hojas:
+            cols = max(len(self.local._hojas[titulo]._filas[0]) if titulo in self.local._hojas and self.local._hojas[titulo]._filas else 0, 12)
+            self._hojas[titulo] = self.remoto.add_worksheet(title=titulo, rows=2000, cols=cols)
+        return self._hojas[titulo]
+
+    def empujar(self, max_ops: int = LOTE_MAX) -> int:
+        """Aplica en la hoja lo pendiente, en orden. Si una llamada falla, lo demás queda para después."""
+        with self.local._lock:
+            ops = self.local._db.execute("SELECT id, hoja, metodo, args FROM salida ORDER BY id LIMIT ?", (max_ops,)).fetchall()
+        n = 0
+        for ids, hoja, metodo, args, kw in _agrupar(ops):
+            if metodo=="add_worksheet": self._hoja(hoja)
+            elif metodo=="borrar_filas":
+                id_ = self._hoja(hoja).id
+                self.remoto.batch_update({"requests": [
+                    {"deleteDimension": {"range": {"sheetId": id_, "dimension": "ROWS", "startIndex": ini-1, "endIndex": fin}}}
+                    for ini, fin in args[0]]})
+            elif metodo=="del_worksheet":
+                if hoja not in self._hojas: self._hojas = {w.title: w for w in self.remoto.worksheets()}
+                if hoja in self._hojas: self.remoto.del_worksheet(self._hojas.pop(hoja))
+            else:
+                getattr(self._hoja(hoja), metodo)(*args, **kw)
+            with self.local._lock:
+                self.local._db.execute(f"DELETE FROM salida WHERE id IN ({','.join('?'*len(ids))})", ids)
+            n += len(ids)
+        return n
+
+    def traer(self, titulos: Optional[List[str]] = None) -> List[str]:
+        """Reemplaza la copia local de las hojas que cambiaron en Sheets (un values_batch_get).
+        Se saltan las que tienen operaciones sin empujar o que se escribieron mientras se leía."""
+        self._hojas = {w.title: w for w in self.remoto.worksheets()}
+        with self.local._lock:
+            self.local._refrescar()
+            pend = {h for (h,) in self.local._db.execute("SELECT DISTINCT hoja FROM salida")}
+            titulos = [t for t in (titulos or list(self._hojas)) if t in self._hojas and t not in pend]
+            antes = {t: self.local._versiones.get(t) for t in titulos}
+        if not titulos: return []
+        rangos = [f"'{t}'!A1:{rowcol_to_a1(1, max(self._hojas[t].col_count, 1)).rstrip('0123456789')}" for t in titulos]
+        resp = self.remoto.values_batch_get(rangos, params={"valueRenderOption": "FORMULA",
+                                                            "dateTimeRenderOption": "FORMATTED_STRING"})
+        cambiadas = []
+        for t, vr in zip(titulos, resp.get("valueRanges", [])):
+            filas = _sin_colas([[_celda(v) for v in r] for r in vr.get("values", [])])
+            def aplicar(t=t, filas=filas):
+                ws = self.local._hojas.get(t)
+                if ws is not None and (self.local._versiones.get(t)!=antes[t] or
+                                       self.local._db.execute("SELECT 1 FROM salida WHERE hoja=? LIMIT 1", (t,)).fetchone()):
+                    return False  # se escribió localmente mientras tanto: en el próximo ciclo
+                if ws is not None and _sin_colas(ws._filas)==filas: return False
+                self.local._entrante = True
+                try:
+                    if ws is None: ws = self.local.add_worksheet(t, self._hojas[t].row_count, self._hojas[t].col_count)
+                    ws._filas, ws._formulas = [], {}
+                    ws._escribir_bloque(1, 1, filas, "USER_ENTERED")  # las fórmulas vuelven a ser fórmulas
+                    self.local._db.execute("DELETE FROM filas WHERE hoja=?", (t,))
+                    self.local._guardar_filas(ws, range(1, len(ws._filas)+1))
+                    self.local._anotar(t, "traer", [], {})
+                finally:
+                    self.local._entrante = False
+                return True
+            if self.local._transaccion(aplicar): cambiadas.append(t)
+        if cambiadas and self.al_traer: self.al_traer(self.local, cambiadas)
+        return cambiadas
+
+    def ciclo(self):
+        if not self.local.tomar_turno(self.dueno, 3*self.cada): return
+        self.empujar()
+        if time.monotonic()-self._ultimo_traer >= self.traer_cada:
+            self._ultimo_traer = time.monotonic(); self.traer()
+
+    def _bucle(self):
+        while not self._parar.wait(self.cada):
+            try: self.ciclo()
+            except Exception: pass  # sin red o sin cuota: se reintenta en el próximo ciclo
+
+    def arrancar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="rld-sqlite-sync", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+
+# Una instancia por archivo y proceso (las sesiones de Streamlit la comparten).
+_abiertos: Dict[str, SqliteSpreadsheet] = {}
+_abiertos_lock = threading.Lock()
+
+def abrir(ruta: str = RUTA, remoto=None, al_traer: Optional[Callable] = None) -> SqliteSpreadsheet:
+    """Abre (o crea) el almacén. Con `remoto` (Spreadsheet de gspread ya envuelto por rld_cuota),
+    si el archivo está vacío se importa la hoja completa y se arranca el sincronizador."""
+    with _abiertos_lock:
+        sh = _abiertos.get(os.path.abspath(ruta))
+        if sh is None: sh = _abiertos[os.path.abspath(ruta)] = SqliteSpreadsheet(ruta)
+    if remoto is not None and sh.sincronizador is None:
+        sh.sincronizador = Sincronizador(sh, remoto, al_traer=al_traer)
+        if not sh._hojas: sh.sincronizador.traer()
+        sh.sincronizador.arrancar()
+    return sh
@@ -0,0 +1,128 @@
+# =========================
+# RLD – 2025 – Traza por rerun: llamadas a Sheets y trabajo con DataFrames
+# =========================
+# Cada rerun abre una traza (iniciar/cerrar). La capa de cuota registra cada llamada a la API y
+# @medido registra helpers (get_ws, snapshot, escrituras). Al cerrar, la traza alimenta los
+# agregados por vista (p50/p95 de duración y de llamadas por rerun), que se pueden exportar a
+# JSONL o a un archivo de texto para Prometheus (node_exporter textfile collector).
+import collections, functools, json, os, threading, time
+from typing import Dict, List, Optional
+
+# Si está definido, cada rerun agrega una línea con su traza resumida.
+TRAZA_JSONL = os.environ.get("RLD_TRAZA_JSONL", "")
+# Destinos por defecto de la exportación de agregados.
+AGREGADOS_JSONL = os.environ.get("RLD_TRAZA_AGREGADOS", "rld_traza_agregados.jsonl")
+AGREGADOS_PROM  = os.environ.get("RLD_TRAZA_PROM", "rld_traza.prom")
+HISTORIAL_MAX = 500  # reruns guardados por vista para los percentiles
+
+_local = threading.local()
+# vista -> deque de {"seg", "api", "ts"}
+_historial: Dict[str, collections.deque] = collections.defaultdict(lambda: collections.deque(maxlen=HISTORIAL_MAX))
+_hist_lock = threading.Lock()
+
+def iniciar(vista: str):
+    _local.traza = {"vista": vista, "t0": time.perf_counter(), "eventos": []}
+
+def nombrar(vista: str):
+    t = getattr(_local, "traza", None)
+    if t is not None: t["vista"] = vista
+
+def actual() -> Optional[dict]: return getattr(_local, "traza", None)
+
+def registrar(tipo: str, nombre: str, hoja: str = "", filas: Optional[int] = None, seg: float = 0.0, **extra):
+    """Agrega un evento a la traza del rerun en curso (si no hay traza, p.ej. en un hilo de fondo, se ignora)."""
+    t = getattr(_local, "traza", None)
+    if t is None: return
+    t["eventos"].append({"tipo": tipo, "nombre": nombre, "hoja": hoja, "filas": filas,
+                         "ms": round(seg*1000, 2), **extra})
+
+def contar_filas(res) -> Optional[int]:
+    if hasattr(res, "shape"): return int(res.shape[0])
+    if isinstance(res, list): return len(res)
+    if isinstance(res, dict) and "valueRanges" in res:
+        return sum(len(vr.get("values", [])) for vr in res["valueRanges"])
+    return None
+
+def medido(tipo: str, hoja: str = ""):
+    """Decorador: registra duración, hoja (fija o el argumento `title`) y filas devueltas."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            if getattr(_local, "traza", None) is None: return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                res = fn(*args, **kwargs)
+            finally:
+                seg = time.perf_counter()-t0
+            h = hoja or kwargs.get("title") or next((a for a in args[1:2] if isinstance(a, str)), "")
+            registrar(tipo, fn.__name__, h, contar_filas(res), seg)
+            return res
+        return envoltura
+    return deco
+
+def cerrar() -> Optional[dict]:
+    """Cierra la traza del rerun y la suma al historial de su vista."""
+    t = getattr(_local, "traza", None)
+    if t is None: return None
+    _local.traza = None
+    seg = time.perf_counter()-t["t0"]
+    api = [e for e in t["eventos"] if e["tipo"]=="api"]
+    resumen = {"vista": t["vista"], "seg": round(seg, 4), "api": len(api),
+               "api_ms": round(sum(e["ms"] for e in api), 2), "ts": time.time()}
+    with _hist_lock: _historial[t["vista"]].append(resumen)
+    if TRAZA_JSONL:
+        with open(TRAZA_JSONL, "a", encoding="utf-8") as f:
+            f.write(json.dumps({**resumen, "eventos": t["eventos"]}, ensure_ascii=False)+"\n")
+    t["resumen"] = resumen
+    _local.ultima = t
+    return t
+
+def ultima() -> Optional[dict]: return getattr(_local, "ultima", None)
+
+def _percentil(xs: List[float], q: float) -> float:
+    if not xs: return 0.0
+    xs = sorted(xs); k = (len(xs)-1)*q
+    i = int(k); j = min(i+1, len(xs)-1)
+    return xs[i]+(xs[j]-xs[i])*(k-i)
+
+def agregados() -> List[dict]:
+    """Por vista: reruns, p50/p95 de segundos y de llamadas a la API por rerun."""
+    with _hist_lock: hist = {v: list(d) for v, d in _historial.items()}
+    out = []
+    for vista, reruns in sorted(hist.items()):
+        seg = [r["seg"] for r in reruns]; api = [r["api"] for r in reruns]
+        out.append({"vista": vista, "reruns": len(reruns),
+                    "seg_p50": round(_percentil(seg, .5), 4), "seg_p95": round(_percentil(seg, .95), 4),
+                    "api_p50": _percentil(api, .5), "api_p95": _percentil(api, .95),
+                    "api_media": round(sum(api)/len(api), 2) if api else 0})
+    return out
+
+def exportar_jsonl(path: str = "") -> int:
+    path = path or AGREGADOS_JSONL
+    aggs = agregados()
+    with open(path, "a", encoding="utf-8") as f:
+        for a in aggs: f.write(json.dumps({**a, "ts": time.time()}, ensure_ascii=False)+"\n")
+    return len(aggs)
+
+def exportar_prometheus(path: str = "") -> int:
+    """Formato de texto de Prometheus; se escribe a un temporal y se reemplaza (lectura atómica)."""
+    path = path or AGREGADOS_PROM
+    aggs = agregados()
+    lineas = ["# HELP rld_rerun_segundos Duración de un rerun por vista.",
+              "# TYPE rld_rerun_segundos summary"]
+    for a in aggs:
+        v = a["vista"].replace("\\", "\\\\").replace('"', '\\"')
+        lineas += [f'rld_rerun_segundos{{vista="{v}",quantile="0.5"}} {a["seg_p50"]}',
+                   f'rld_rerun_segundos{{vista="{v}",quantile="0.95"}} {a["seg_p95"]}',
+                   f'rld_rerun_segundos_count{{vista="{v}"}} {a["reruns"]}']
+    lineas += ["# HELP rld_llamadas_api_por_rerun Llamadas a la API de Sheets por rerun.",
+               "# TYPE rld_llamadas_api_por_rerun summary"]
+    for a in aggs:
+        v = a["vista"].replace("\\", "\\\\").replace('"', '\\"')
+        lineas += [f'rld_llamadas_api_por_rerun{{vista="{v}",quantile="0.5"}} {a["api_p50"]}',
+                   f'rld_llamadas_api_por_rerun{{vista="{v}",quantile="0.95"}} {a["api_p95"]}',
+                   f'rld_llamadas_api_por_rerun_count{{vista="{v}"}} {a["reruns"]}']
+    tmp = path+".tmp"
+    with open(tmp, "w", encoding="utf-8") as f: f.write("\n".join(lineas)+"\n")
+    os.replace(tmp, path)
+    return len(aggs)